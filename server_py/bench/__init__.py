@@ -0,0 +1,10 @@
+"""
+Search benchmark and query-plan checks — not part of the server.
+
+``corpus`` generates a deterministic synthetic lab DB (10k / 100k / 1M
+experiments); ``runner`` builds an engine over it and measures build time,
+peak memory, p50/p99 latency of plain, quoted and filtered queries and the
+cost of suggestion extraction; ``plans`` checks the query plans of the
+SQL in ``routes`` against the same corpus. See
+``python -m server_py.bench --help``.
+"""
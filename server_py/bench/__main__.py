@@ -0,0 +1,121 @@
+"""
+Command line for the search benchmark.
+
+    python -m server_py.bench run --scale 10k --engine tfidf --out before.json
+    python -m server_py.bench run --scale 10k --engine tfidf --out after.json
+    python -m server_py.bench compare before.json after.json
+    python -m server_py.bench plans --scale 10k
+
+``run`` and ``plans`` generate the corpus DB on first use (``--workdir``,
+reused after that); ``run`` prints the result JSON when ``--out`` is not
+given. ``plans`` exits 1 when a query fully scans a large table or its SQL
+cannot be resolved / prepared (see ``plans``).
+"""
+import argparse
+import json
+import os
+import sys
+import tempfile
+
+from .corpus import SCALES, generate
+from .plans import check, collect_statements, prepare
+from .runner import compare, run
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m server_py.bench", description="Search latency / index build benchmark")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    gen = sub.add_parser("generate", help="write a synthetic corpus DB")
+    _corpus_args(gen)
+
+    bench = sub.add_parser("run", help="benchmark one engine; writes result JSON")
+    _corpus_args(bench)
+    bench.add_argument("--engine", default="tfidf", choices=["tfidf", "sparse", "fts"])
+    bench.add_argument("--queries", type=int, default=200, help="queries per kind (plain / quoted / filtered)")
+    bench.add_argument("--top-k", type=int, default=10)
+    bench.add_argument("--no-memory", action="store_true", help="skip the second, traced build")
+    bench.add_argument("--out", help="result file (default: stdout)")
+
+    plans = sub.add_parser("plans", help="EXPLAIN QUERY PLAN every server query; fail on full scans of large tables")
+    _corpus_args(plans)
+    plans.add_argument("--min-rows", type=int, default=1000, help="tables with fewer rows may be scanned")
+    plans.add_argument("-v", "--verbose", action="store_true", help="print every plan, not only failures")
+
+    cmp = sub.add_parser("compare", help="diff two result files")
+    cmp.add_argument("old")
+    cmp.add_argument("new")
+
+    args = parser.parse_args(argv)
+
+    if args.command == "compare":
+        with open(args.old, encoding="utf-8") as f:
+            old = json.load(f)
+        with open(args.new, encoding="utf-8") as f:
+            new = json.load(f)
+        try:
+            rows = compare(old, new)
+        except ValueError as e:
+            print(e, file=sys.stderr)
+            return 2
+        width = max((len(r[0]) for r in rows), default=10)
+        for metric, a, b, change in rows:
+            change_text = "" if change is None else f"{change:+.1f}%"
+            print(f"{metric:<{width}}  {a:>12}  {b:>12}  {change_text:>8}")
+        return 0
+
+    db_path = args.db or os.path.join(args.workdir, f"bench-{args.scale}-s{args.seed}.db")
+    if args.command == "generate" or not os.path.exists(db_path):
+        os.makedirs(os.path.dirname(os.path.abspath(db_path)), exist_ok=True)
+        print(f"generating {args.scale} corpus → {db_path}", file=sys.stderr)
+        generate(db_path, SCALES[args.scale], args.seed)
+    if args.command == "generate":
+        return 0
+    if args.command == "plans":
+        return _plans(db_path, args.min_rows, args.verbose)
+
+    result = run(
+        db_path, engine=args.engine, n_queries=args.queries, top_k=args.top_k,
+        seed=args.seed, measure_memory=not args.no_memory,
+    )
+    result["meta"]["scale"] = args.scale
+    text = json.dumps(result, ensure_ascii=False, indent=2)
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            f.write(text + "\n")
+    else:
+        print(text)
+    return 0
+
+
+def _plans(db_path: str, min_rows: int, verbose: bool) -> int:
+    conn = prepare(db_path)
+    try:
+        results = check(conn, collect_statements(), min_rows)
+    finally:
+        conn.close()
+
+    counts: dict[str, int] = {}
+    for r in results:
+        counts[r["status"]] = counts.get(r["status"], 0) + 1
+        if verbose or r["status"] == "fail":
+            scans = f"  full scan: {', '.join(r['scans'])}" if r["scans"] else ""
+            print(f"{r['status'].upper():<9} {r['path']}:{r['line']} {r['function']}(){scans}")
+            print(f"          {(r['sql'] or '<unresolved>')[:160]}")
+            for detail in r["plan"]:
+                print(f"            {detail}")
+            if r.get("error"):
+                print(f"            ({r['error']})")
+    print(", ".join(f"{n} {status}" for status, n in sorted(counts.items())), file=sys.stderr)
+    return 1 if counts.get("fail") else 0
+
+
+def _corpus_args(parser: argparse.ArgumentParser):
+    parser.add_argument("--scale", default="10k", choices=list(SCALES), help="number of experiments")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--db", help="corpus DB path (default: <workdir>/bench-<scale>-s<seed>.db)")
+    parser.add_argument("--workdir", default=os.path.join(tempfile.gettempdir(), "lab-db-bench"))
+
+
+if __name__ == "__main__":
+    sys.exit(main())
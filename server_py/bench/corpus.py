@@ -0,0 +1,247 @@
+"""
+Synthetic lab corpus — projects, experiments, split_tables and line_lots rows.
+
+Everything is drawn from one ``random.Random(seed)`` in a fixed order, so a
+(scale, seed) pair always produces the same database and the same query
+set; result files from different versions are comparable only when both
+match. Text mixes Korean and English the way the real sheets do, oper_ids
+look like ``p301200b`` and every split row fills the 25 user_def columns
+(sparsely, like the uploaded sheets).
+"""
+import os
+import random
+import sqlite3
+from typing import Iterator
+
+from .. import database
+
+SCALES = {"10k": 10_000, "100k": 100_000, "1m": 1_000_000}
+
+# 한 번에 executemany 하는 행 수 — 1M 규모에서도 메모리를 일정하게
+_BATCH = 5_000
+
+MODULES = ["ETCH", "CMP", "PHOTO", "DIFF", "TF", "IMP", "CLN", "MI"]
+TEAMS = ["공정1팀", "공정2팀", "공정3팀", "소자팀", "통합팀", "수율팀"]
+STATUSES = ["Assign 전", "실험 진행 중", "실험 종료(결과 등록 전)", "실험 종료(결과 완료)"]
+FAB_STATUSES = ["진행", "Hold", "완료", None]
+FABS = ["r3", "m14", "m15", "m16", "p1"]
+TECHS = ["1a", "1b", "1c", "1d", "V9", "V10"]
+EVAL_PROCESSES = ["CMP", "Dry etch", "Wet clean", "CVD", "PVD", "ALD", "Photo", "Implant", "Anneal"]
+EVAL_CATEGORIES = ["신규", "개선", "재평가", "양산 적용"]
+TARGETS = [
+    "산화막", "질화막", "ESL", "barrier", "liner", "TiN", "W plug", "Cu seed",
+    "gate oxide", "spacer", "STI", "via", "contact", "metal line", "poly", "HKMG",
+]
+ACTIONS = [
+    "두께 개선", "균일도 개선", "dishing 감소", "저항 감소", "particle 저감",
+    "CD 산포 개선", "recipe 최적화", "조건 변경 평가", "신규 장비 평가",
+    "leakage 개선", "void 개선", "open 불량 개선", "erosion 감소", "edge 수율 개선",
+]
+GOALS = ["Rs 산포 3% 이내", "두께 산포 1.5% 이내", "불량률 0.1% 이하", "CD 3σ 1nm 이하", "수율 2% 향상"]
+CONDITIONS = ["RF", "Temp", "Time", "Pressure", "O2", "Ar", "N2", "CF4", "Slurry", "Down force"]
+UNITS = ["W", "C", "s", "mTorr", "sccm", "sccm", "sccm", "sccm", "ml/min", "psi"]
+EQP_KINDS = ["ECH", "CMP", "CVD", "PVD", "DIF", "IMP", "CLN"]
+SURNAMES = "김이박최정강조윤장임한오서신권황안송류홍"
+GIVEN = "민서지현준영수진우호성은하연재동경태"
+NOTES = ["", "", "", "edge 확인 필요", "재작업 lot", "Ref 동일", "장비 PM 후 진행", "HOLD 해제 대기"]
+
+
+def generate(path: str, n_experiments: int, seed: int = 1) -> None:
+    """Create ``path`` as a fresh lab DB holding ``n_experiments`` generated experiments.
+
+    Written under a temporary name and renamed when complete, so an
+    interrupted run never leaves a half-filled file that looks reusable.
+    """
+    tmp_path = path + ".tmp"
+    for p in (tmp_path, tmp_path + "-wal", tmp_path + "-shm"):
+        if os.path.exists(p):
+            os.remove(p)
+
+    saved_path = database.DB_PATH
+    database.DB_PATH = tmp_path
+    try:
+        database.init_db()
+        conn = database.get_connection()
+    finally:
+        database.DB_PATH = saved_path
+    try:
+        r = random.Random(seed)
+        n_projects = max(20, n_experiments // 40)
+        projects = list(_projects(r, n_projects))
+        _insert(conn, "projects", projects)
+        names = [p["iacpj_nm"] for p in projects]
+
+        # plan_id 는 실험 몇 개가 공유한다 — split 은 plan 당 한 번만 만든다
+        n_plans = max(1, int(n_experiments * 0.8))
+        batch, plans_done = [], set()
+        split_batch = []
+        for exp in _experiments(r, n_experiments, names, n_plans):
+            batch.append(exp)
+            plan_id = exp["plan_id"]
+            if plan_id is not None and plan_id not in plans_done:
+                plans_done.add(plan_id)
+                split_batch.extend(_splits(r, plan_id))
+            if len(batch) >= _BATCH:
+                _insert(conn, "experiments", batch)
+                _insert(conn, "split_tables", split_batch)
+                batch, split_batch = [], []
+        _insert(conn, "experiments", batch)
+        _insert(conn, "split_tables", split_batch)
+        # 마지막에 뽑는다 — 앞 테이블들의 내용은 이전 버전 코퍼스와 같다
+        _insert(conn, "line_lots", list(_line_lots(r, max(50, n_experiments // 10))))
+        conn.commit()
+    finally:
+        conn.close()
+    os.replace(tmp_path, path)
+
+
+def make_queries(n_per_kind: int, seed: int = 1) -> dict[str, list[tuple[str, dict | None]]]:
+    """``{kind: [(query, filters), ...]}`` for the plain, quoted and filtered query mixes."""
+    r = random.Random(seed * 7919 + 1)
+
+    def plain() -> str:
+        words = [r.choice(TARGETS), r.choice(ACTIONS).split()[0]]
+        if r.random() < 0.4:
+            words.append(r.choice(EVAL_PROCESSES + MODULES).lower())
+        if r.random() < 0.15:
+            words = [_step_id(r)]
+        return " ".join(words[:r.randint(1, len(words))])
+
+    def quoted() -> str:
+        phrase = r.choice(ACTIONS + [t for t in TARGETS if " " in t])
+        rest = r.choice(TARGETS) if r.random() < 0.6 else ""
+        return f'"{phrase}" {rest}'.strip()
+
+    def filters() -> dict:
+        kind = r.randrange(4)
+        if kind == 0:
+            return {"module": r.choice(MODULES)}
+        if kind == 1:
+            return {"status": r.sample(STATUSES, 2)}
+        if kind == 2:
+            year = r.choice([2024, 2025])
+            return {"request_date": {"from": f"{year}-01-01", "to": f"{year}-06-30"}}
+        return {"team": r.choice(TEAMS), "module": r.sample(MODULES, 3)}
+
+    return {
+        "plain": [(plain(), None) for _ in range(n_per_kind)],
+        "quoted": [(quoted(), None) for _ in range(n_per_kind)],
+        "filtered": [(plain(), filters()) for _ in range(n_per_kind)],
+    }
+
+
+# ── row generators ──
+
+def _projects(r: random.Random, n: int) -> Iterator[dict]:
+    for i in range(n):
+        module = r.choice(MODULES)
+        target, action = r.choice(TARGETS), r.choice(ACTIONS)
+        start = f"{r.randint(2022, 2025)}-{r.randint(1, 12):02d}-01"
+        yield {
+            "iacpj_nm": f"{r.choice(TECHS)}-{module}-{i:05d} {target} {action}",
+            "iacpj_tgt_n": r.choice(["양산", "선행", "개발"]),
+            "iacpj_level": r.choice(["L1", "L2", "L3"]),
+            "iacpj_tech_n": r.choice(TECHS),
+            "ia_tgt_htr_n": r.choice(["DRAM", "NAND", "Logic"]),
+            "iacpj_nud_n": r.choice(["New", "Upgrade", "Diff", "Dev"]),
+            "iacpj_mod_n": module,
+            "iacpj_itf_uno": f"ITF{r.randint(1000, 9999)}",
+            "iacpj_bgn_dy": start,
+            "iacpj_ch_n": _person(r),
+            "ia_ta_grd_n": r.choice(["A", "B", "C"]),
+            "project_purpose": f"{target} {action} 위한 {r.choice(EVAL_PROCESSES)} 공정 조건 확보",
+            "iacpj_ta_goa": f"{r.choice(GOALS)} 달성 및 {r.choice(TARGETS)} {r.choice(ACTIONS)}",
+            "iacpj_cur_stt": f"{r.choice(TARGETS)} {r.choice(ACTIONS)} 평가 {r.choice(['진행 중', '완료', '분석 중'])}",
+            "iacpj_ch_i": f"u{r.randint(10000, 99999)}",
+            "ia_ch_or_i": f"o{r.randint(100, 999)}",
+            "ia_ch_or_n": r.choice(TEAMS),
+            "ia_ch_or_path": f"/{r.choice(MODULES)}/{r.choice(TEAMS)}",
+            "iacpj_core_tec": f"{r.choice(TARGETS)} {r.choice(EVAL_PROCESSES)}",
+            "iacpj_end_dy": f"{r.randint(2025, 2027)}-{r.randint(1, 12):02d}-28",
+            "iacpj_reg_dy": start,
+        }
+
+
+def _experiments(r: random.Random, n: int, project_names: list[str], n_plans: int) -> Iterator[dict]:
+    for _ in range(n):
+        target, action = r.choice(TARGETS), r.choice(ACTIONS)
+        yield {
+            "team": r.choice(TEAMS),
+            "requester": _person(r),
+            "lot_code": f"RA{r.choice('BCDEFGH')}{r.randint(100, 999)}",
+            "iacpj_nm": r.choice(project_names),
+            "module": r.choice(MODULES),
+            "wf_direction": r.choice(["정방향", "역방향", None]),
+            "eval_process": r.choice(EVAL_PROCESSES),
+            "prev_eval": r.choice(["", "", f"{r.choice(TARGETS)} 1차 평가"]),
+            "cross_experiment": r.choice(["", "Y", "N"]),
+            "eval_category": r.choice(EVAL_CATEGORIES),
+            "eval_item": f"{target} {action} ({r.choice(EVAL_PROCESSES)}, {_step_id(r)})",
+            "lot_request": f"{r.randint(1, 4)} lot",
+            "reference": r.choice(["", "", f"REF-{r.randint(100, 999)}"]),
+            "volume_split": f"{r.randint(2, 12)} split",
+            "plan_id": f"PLN{r.randrange(n_plans):07d}" if r.random() > 0.03 else None,
+            "assign_wf": f"{r.randint(1, 25)}",
+            "refdata": "",
+            "refdata_url": "",
+            "request_date": f"{r.randint(2023, 2026)}-{r.randint(1, 12):02d}-{r.randint(1, 28):02d}",
+            "status": r.choice(STATUSES),
+            "split_completed": r.randint(0, 1),
+            "summary_completed": r.randint(0, 1),
+            "fab_status": r.choice(FAB_STATUSES),
+        }
+
+
+def _splits(r: random.Random, plan_id: str) -> Iterator[dict]:
+    fab = r.choice(FABS)
+    process = r.choice(EVAL_PROCESSES)
+    for sno in range(r.randint(0, 6)):
+        row = {
+            "sno": sno,
+            "fac_id": fab,
+            "plan_id": plan_id,
+            "oper_id": _step_id(r),
+            "oper_nm": f"{r.choice(TARGETS)} {process}",
+            "eps_lot_gbn_cd": "BASE" if sno == 0 else r.choice(["SPLIT", "REF"]),
+            "work_cond_desc": f"{r.choice(CONDITIONS)} {r.randint(1, 500)}{r.choice(UNITS)} {r.choice(['조건', '변경', 'base'])}",
+            "eqp_id": f"{r.choice(EQP_KINDS)}{r.randint(1, 60):02d}",
+            "recipe_id": f"RCP_{process.replace(' ', '').upper()}_{r.randint(1, 400):03d}",
+            "note": r.choice(NOTES),
+        }
+        for k in range(1, 26):
+            # 업로드 시트처럼 앞쪽 컬럼만 주로 채워진다
+            if r.random() < 0.9 / k:
+                i = r.randrange(len(CONDITIONS))
+                row[f"user_def_val_{k}"] = f"{CONDITIONS[i]} {r.randint(1, 500)}{UNITS[i]}"
+            else:
+                row[f"user_def_val_{k}"] = None
+        yield row
+
+
+def _line_lots(r: random.Random, n: int) -> Iterator[dict]:
+    for i in range(n):
+        yield {
+            "lot_id": f"RA{r.choice('BCDEFGH')}{i:06d}",
+            "current_step": _step_id(r),
+            "fac_id": r.choice(FABS),
+            "status": r.choice(["available", "available", "assigned", "hold"]),
+            "estimated_arrival": f"2026-{r.randint(1, 12):02d}-{r.randint(1, 28):02d} {r.randint(0, 23):02d}:00",
+        }
+
+
+def _step_id(r: random.Random) -> str:
+    return f"p{r.randint(100, 999)}{r.randrange(1000):03d}{r.choice('abcd')}"
+
+
+def _person(r: random.Random) -> str:
+    return r.choice(SURNAMES) + r.choice(GIVEN) + r.choice(GIVEN)
+
+
+def _insert(conn: sqlite3.Connection, table: str, rows: list[dict]) -> None:
+    if not rows:
+        return
+    columns = list(rows[0])
+    conn.executemany(
+        f"INSERT INTO {table} ({', '.join(columns)}) VALUES ({', '.join('?' * len(columns))})",
+        [tuple(row[c] for c in columns) for row in rows],
+    )
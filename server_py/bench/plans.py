@@ -0,0 +1,580 @@
+"""
+Query-plan regression check for the SQL the server runs.
+
+Every SQL string passed to ``.execute()`` / ``.executemany()`` in the route
+modules, ``search_corpus`` and ``search_fts`` is run through ``EXPLAIN QUERY
+PLAN`` against a populated DB (the benchmark corpus by default). A plain
+``SCAN`` — no index — of a table holding at least ``min_rows`` rows fails
+the check, unless the call site declares the scan intended in a comment
+directly above it::
+
+    # full-scan: experiments — 전체 목록
+    rows = conn.execute(base).fetchall()
+
+Strings are resolved statically: literals, ``+``, ``str.join`` over
+constant lists and comprehensions, local and module names (also imported
+from sibling modules), loop variables over constant tuples, names narrowed
+by ``if name not in (...): raise``, and calls to module functions / methods
+that build SQL from their arguments (``_sql_insert(...)``). A name with
+several possible values yields one statement per value; f-string fields
+that stay unknown become ``?``. A call whose SQL cannot be resolved, or
+resolves to something SQLite cannot prepare, fails too — unless the call
+site explains why in a comment::
+
+    # unchecked-sql: 사용자 정의 컬럼 목록
+"""
+import ast
+import itertools
+import os
+import re
+import sqlite3
+
+PACKAGE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+ROUTES_DIR = os.path.join(PACKAGE_DIR, "routes")
+SOURCES = (
+    ROUTES_DIR,
+    os.path.join(PACKAGE_DIR, "search_corpus.py"),
+    os.path.join(PACKAGE_DIR, "search_fts.py"),
+)
+
+_SQL_START = re.compile(r"^\s*(SELECT|WITH|INSERT|UPDATE|DELETE|REPLACE)\b", re.IGNORECASE)
+_MARKER = re.compile(r"#\s*full-scan:\s*([\w\s,]+?)\s*(?:[—-]|$)")
+_UNCHECKED = re.compile(r"#\s*unchecked-sql:\s*\S")
+_TABLE_REF = re.compile(r"\b(?:FROM|JOIN|UPDATE|INTO)\s+(\w+)(?:\s+(?:AS\s+)?(\w+))?", re.IGNORECASE)
+_FULL_SCAN = re.compile(r"^SCAN (\w+)$")
+
+# 한 식이 가질 수 있는 값 조합의 상한 — 넘으면 해석하지 않는다
+_MAX_ALTERNATIVES = 64
+# 함수 호출을 따라 들어가는 깊이
+_MAX_CALL_DEPTH = 4
+# 이름에 묶인 목록을 바꾸는 메서드 — 호출되면 그 이름은 모르는 값이 된다
+_MUTATORS = {"append", "extend", "insert", "remove", "pop", "clear", "update", "add", "setdefault"}
+
+
+def collect_statements(sources=SOURCES) -> list[dict]:
+    """``{path, line, function, sql, allowed, unchecked}`` for every execute call in ``sources``.
+
+    ``sql`` is None when the call's SQL could not be resolved.
+    """
+    statements, seen = [], set()
+    for path in _source_files(sources):
+        module = _Module.load(path)
+        for stmt in module.statements():
+            key = (stmt["path"], stmt["line"], stmt["sql"])
+            if key not in seen:
+                seen.add(key)
+                statements.append(stmt)
+    return statements
+
+
+def check(conn: sqlite3.Connection, statements: list[dict], min_rows: int = 1000) -> list[dict]:
+    """Explain every statement; adds ``status`` (ok / allowed / unchecked / fail), ``plan`` and ``scans``.
+
+    Unresolved and unpreparable statements fail (with ``error``) unless
+    marked ``unchecked-sql``.
+    """
+    tables = {
+        name for (name,) in conn.execute(
+            "SELECT name FROM sqlite_master WHERE type = 'table' AND name NOT LIKE 'sqlite_%'"
+        )
+    }
+    large = {t for t in tables if _row_count(conn, t) >= min_rows}
+    results = []
+    for stmt in statements:
+        result = dict(stmt, plan=[], scans=[])
+        results.append(result)
+        if stmt["sql"] is None:
+            result.update(status="unchecked" if stmt["unchecked"] else "fail", error="SQL not statically resolvable")
+            continue
+        try:
+            plan = [row[3] for row in conn.execute("EXPLAIN QUERY PLAN " + stmt["sql"], _null_params(stmt["sql"]))]
+        except sqlite3.Error as e:
+            result.update(status="unchecked" if stmt["unchecked"] else "fail", error=str(e))
+            continue
+        aliases = _aliases(stmt["sql"], tables)
+        scans = []
+        for detail in plan:
+            m = _FULL_SCAN.match(detail.strip())
+            if m:
+                table = aliases.get(m.group(1).lower(), m.group(1))
+                if table in large:
+                    scans.append(table)
+        unexpected = [t for t in scans if t not in stmt["allowed"]]
+        result.update(plan=plan, scans=scans, status="fail" if unexpected else ("allowed" if scans else "ok"))
+    return results
+
+
+def prepare(db_path: str) -> sqlite3.Connection:
+    """In-memory copy of ``db_path`` at the current schema (incl. FTS tables), analyzed for planning."""
+    from ..database import _connect
+    from ..migrations import analyze, migrate
+    from ..search_fts import ensure_schema, fts5_available
+
+    src = _connect(db_path, read_only=True)
+    conn = _connect(":memory:")
+    try:
+        src.backup(conn)
+    finally:
+        src.close()
+    migrate(conn)  # 이전 버전 코퍼스에도 현재 인덱스를 만든다
+    analyze(conn, full=True)
+    if fts5_available():
+        ensure_schema(conn)
+    return conn
+
+
+# ── source scanning ──
+
+def _source_files(sources) -> list[str]:
+    files = []
+    for source in sources:
+        if os.path.isdir(source):
+            files += [os.path.join(source, n) for n in sorted(os.listdir(source)) if n.endswith(".py")]
+        else:
+            files.append(source)
+    return files
+
+
+class _Unknown:
+    """Placeholder for a value inside a tuple that could not be resolved."""
+
+    def __repr__(self):
+        return "<unknown>"
+
+
+_UNKNOWN = _Unknown()
+
+
+class _Module:
+    """One parsed source file: module-level names, functions and classes, resolved lazily."""
+
+    _cache: dict[str, "_Module"] = {}
+
+    @classmethod
+    def load(cls, path: str) -> "_Module":
+        path = os.path.abspath(path)
+        if path not in cls._cache:
+            cls._cache[path] = cls(path)
+        return cls._cache[path]
+
+    def __init__(self, path: str):
+        self.path = path
+        with open(path, encoding="utf-8") as f:
+            source = f.read()
+        self.lines = source.splitlines()
+        self.tree = ast.parse(source, path)
+        self.functions: dict[str, ast.FunctionDef] = {}
+        self.classes: dict[str, dict[str, ast.FunctionDef]] = {}
+        self.imports: dict[str, tuple[str, str]] = {}
+        for node in self.tree.body:
+            if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef)):
+                self.functions[node.name] = node
+            elif isinstance(node, ast.ClassDef):
+                self.classes[node.name] = {
+                    n.name: n for n in node.body if isinstance(n, (ast.FunctionDef, ast.AsyncFunctionDef))
+                }
+            elif isinstance(node, ast.ImportFrom) and node.level:
+                base = os.path.dirname(path)
+                for _ in range(node.level - 1):
+                    base = os.path.dirname(base)
+                target = os.path.join(base, *(node.module or "").split(".")) + ".py"
+                if os.path.exists(target):
+                    for alias in node.names:
+                        self.imports[alias.asname or alias.name] = (target, alias.name)
+        self._names: dict[str, list] | None = None
+
+    @property
+    def names(self) -> dict[str, list]:
+        if self._names is None:
+            self._names = {}  # 순환 참조 방지 — 해석 중에는 빈 상태로 보인다
+            scope = _Scope(self, None, {})
+            _bind(self.tree.body, scope, walk=False)
+            self._names = scope.names
+        return self._names
+
+    def lookup(self, name: str):
+        """Values of a module-level or imported name, or a function definition ``(module, def, class)``."""
+        if name in self.names:
+            return self.names[name]
+        if name in self.functions:
+            return (self, self.functions[name], None)
+        if name in self.imports:
+            target, attr = self.imports[name]
+            return _Module.load(target).lookup(attr)
+        return None
+
+    def statements(self) -> list[dict]:
+        found = []
+        for node in self.tree.body:
+            if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef)):
+                found += self._function_statements(node, node.name, _Scope(self, None, dict(self.names)))
+            elif isinstance(node, ast.ClassDef):
+                for method in self.classes[node.name].values():
+                    scope = _Scope(self, node.name, dict(self.names))
+                    found += self._function_statements(method, f"{node.name}.{method.name}", scope)
+        return found
+
+    def _function_statements(self, func, qualname: str, scope: "_Scope") -> list[dict]:
+        """Statements in ``func``; nested functions (write jobs) are scanned afterwards with the outer names."""
+        _bind_defaults(func, scope)
+        found, nested = [], []
+        for node in _own_nodes(func):
+            if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef)):
+                nested.append(node)
+                continue
+            _bind_node(node, scope)
+            if not (
+                isinstance(node, ast.Call) and isinstance(node.func, ast.Attribute)
+                and node.func.attr in ("execute", "executemany") and node.args
+            ):
+                continue
+            values = _resolve(node.args[0], scope)
+            if values is not None and not all(isinstance(v, str) for v in values):
+                values = None
+            if values is not None and not any(_SQL_START.match(v) for v in values):
+                continue  # PRAGMA / DDL
+            for sql in values if values is not None else [None]:
+                if sql is not None and not _SQL_START.match(sql):
+                    continue
+                found.append({
+                    "path": os.path.relpath(self.path),
+                    "line": node.lineno,
+                    "function": qualname,
+                    "sql": " ".join(sql.split()) if sql is not None else None,
+                    "allowed": _allowed_scans(self.lines, node.lineno),
+                    "unchecked": _is_unchecked(self.lines, node.lineno),
+                })
+        for inner in nested:
+            found += self._function_statements(
+                inner, f"{qualname}.{inner.name}", _Scope(self, scope.cls, dict(scope.names)),
+            )
+        return found
+
+
+class _Scope:
+    """Resolved names visible at one point: ``name → list of possible values``."""
+
+    def __init__(self, module: _Module, cls: str | None, names: dict[str, list], depth: int = 0):
+        self.module = module
+        self.cls = cls
+        self.names = names
+        self.depth = depth
+
+    def lookup(self, name: str):
+        if name in self.names:
+            return self.names[name]
+        return self.module.lookup(name)
+
+
+def _own_nodes(func):
+    """Nodes of ``func`` in source order, stopping at (but yielding) nested function definitions."""
+    stack = list(reversed(func.body))
+    while stack:
+        node = stack.pop()
+        yield node
+        if not isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef, ast.Lambda, ast.ClassDef)):
+            stack.extend(reversed(list(ast.iter_child_nodes(node))))
+
+
+def _bind_defaults(func, scope: "_Scope"):
+    # 기본값이 있는 인자는 그 값으로 본다 (iter_documents(where="") 등)
+    args = func.args
+    positional = args.posonlyargs + args.args
+    for arg, default in zip(positional[len(positional) - len(args.defaults):], args.defaults):
+        values = _resolve(default, scope)
+        if values is not None:
+            scope.names[arg.arg] = values
+    for arg, default in zip(args.kwonlyargs, args.kw_defaults):
+        if default is not None:
+            values = _resolve(default, scope)
+            if values is not None:
+                scope.names[arg.arg] = values
+
+
+def _bind(nodes, scope: "_Scope", walk: bool = True):
+    for node in nodes:
+        _bind_node(node, scope)
+        if walk and not isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef, ast.Lambda, ast.ClassDef)):
+            _bind(ast.iter_child_nodes(node), scope)
+
+
+def _bind_node(node, scope: "_Scope"):
+    """Record what an assignment, loop or narrowing ``if`` tells about local names."""
+    names = scope.names
+    if isinstance(node, ast.Assign) and len(node.targets) == 1:
+        target = node.targets[0]
+        values = _resolve(node.value, scope)
+        if isinstance(target, ast.Name):
+            _set(names, target.id, values)
+        elif isinstance(target, ast.Tuple) and all(isinstance(e, ast.Name) for e in target.elts):
+            n = len(target.elts)
+            for i, elt in enumerate(target.elts):
+                parts = None
+                if values is not None and all(isinstance(v, tuple) and len(v) == n for v in values):
+                    parts = [v[i] for v in values]
+                    if any(p is _UNKNOWN for p in parts):
+                        parts = None
+                _set(names, elt.id, parts)
+    elif isinstance(node, ast.AugAssign) and isinstance(node.target, ast.Name) and isinstance(node.op, ast.Add):
+        _set(names, node.target.id, _combine(names.get(node.target.id), _resolve(node.value, scope), _add))
+    elif (
+        isinstance(node, ast.Call) and isinstance(node.func, ast.Attribute)
+        and isinstance(node.func.value, ast.Name) and node.func.attr in _MUTATORS
+    ):
+        names.pop(node.func.value.id, None)  # clauses.append(...) — 더는 상수가 아니다
+    elif isinstance(node, ast.For) and isinstance(node.target, ast.Name):
+        items = _sequence(node.iter, scope)
+        _set(names, node.target.id, list(dict.fromkeys(items)) if items is not None else None)
+    elif isinstance(node, ast.If):
+        # if name not in ("a", "b"): raise ... — 이후 name 은 그 값들 중 하나
+        test = node.test
+        if (
+            isinstance(test, ast.Compare) and isinstance(test.left, ast.Name)
+            and len(test.ops) == 1 and isinstance(test.ops[0], ast.NotIn)
+            and node.body and isinstance(node.body[-1], (ast.Raise, ast.Return))
+        ):
+            items = _sequence(test.comparators[0], scope)
+            if items is not None:
+                names[test.left.id] = list(dict.fromkeys(items))
+
+
+def _set(names: dict, name: str, values):
+    if values is None:
+        names.pop(name, None)
+    else:
+        names[name] = values
+
+
+def _sequence(node, scope: "_Scope") -> tuple | None:
+    """The one constant sequence ``node`` evaluates to, or None."""
+    values = _resolve(node, scope)
+    if values is None or len(values) != 1 or not isinstance(values[0], tuple) or _UNKNOWN in values[0]:
+        return None
+    return values[0]
+
+
+def _resolve(node, scope: "_Scope") -> list | None:
+    """Possible values of ``node`` (str / number / bool / None / tuple), or None when unknown."""
+    if isinstance(node, ast.Constant):
+        return [node.value]
+    if isinstance(node, ast.JoinedStr):
+        parts = []
+        for part in node.values:
+            if isinstance(part, ast.Constant):
+                parts.append([part.value])
+                continue
+            values = _resolve(part.value, scope)
+            if values is None or any(isinstance(v, tuple) for v in values):
+                values = ["?"]
+            parts.append([str(v) for v in values])
+        return _product(parts, "".join)
+    if isinstance(node, ast.BinOp):
+        op = {ast.Add: _add, ast.Mult: _mult}.get(type(node.op))
+        if op is None:
+            return None
+        return _combine(_resolve(node.left, scope), _resolve(node.right, scope), op)
+    if isinstance(node, ast.Name):
+        found = scope.lookup(node.id)
+        return list(found) if isinstance(found, list) else None
+    if isinstance(node, (ast.Tuple, ast.List, ast.Set)):
+        parts = []
+        for elt in node.elts:
+            if isinstance(elt, ast.Starred):
+                values = _resolve(elt.value, scope)
+                if values is None or not all(isinstance(v, tuple) for v in values):
+                    return None
+                parts.append(values)
+            else:
+                values = _resolve(elt, scope)
+                parts.append([(v,) for v in values] if values is not None else [(_UNKNOWN,)])
+        return _product(parts, lambda chunks: tuple(itertools.chain.from_iterable(chunks)))
+    if isinstance(node, (ast.ListComp, ast.GeneratorExp)) and len(node.generators) == 1:
+        gen = node.generators[0]
+        items = _sequence(gen.iter, scope)
+        if items is None or gen.ifs or not isinstance(gen.target, ast.Name):
+            return None
+        out = []
+        for item in items:
+            values = _resolve(node.elt, _Scope(scope.module, scope.cls, {**scope.names, gen.target.id: [item]}, scope.depth))
+            if values is None or len(values) != 1:
+                return None
+            out.append(values[0])
+        return [tuple(out)]
+    if isinstance(node, ast.IfExp):
+        test = _resolve(node.test, scope)
+        if test is not None and all(isinstance(v, (str, int, float, bool, tuple, type(None))) for v in test):
+            if all(test):
+                return _resolve(node.body, scope)
+            if not any(test):
+                return _resolve(node.orelse, scope)
+        return _combine(_resolve(node.body, scope), _resolve(node.orelse, scope), None)
+    if isinstance(node, ast.Call):
+        return _resolve_call(node, scope)
+    return None
+
+
+def _resolve_call(node: ast.Call, scope: "_Scope") -> list | None:
+    func = node.func
+    if isinstance(func, ast.Attribute) and func.attr == "join" and len(node.args) == 1 and not node.keywords:
+        seps, seqs = _resolve(func.value, scope), _resolve(node.args[0], scope)
+        if seps is None or seqs is None:
+            return None
+        out = []
+        for sep, seq in itertools.product(seps, seqs):
+            if isinstance(seq, str):
+                seq = tuple(seq)  # ", ".join("?" * n)
+            if not isinstance(sep, str) or not isinstance(seq, tuple) or not all(isinstance(s, str) for s in seq):
+                return None
+            out.append(sep.join(seq))
+        return _capped(out)
+    if isinstance(func, ast.Name) and func.id in ("len", "range") and not node.keywords:
+        args = [_resolve(a, scope) for a in node.args]
+        if any(a is None or len(a) != 1 for a in args):
+            return None
+        args = [a[0] for a in args]
+        if func.id == "len":
+            return [len(args[0])] if len(args) == 1 and isinstance(args[0], (str, tuple)) and _UNKNOWN not in args[0] else None
+        if all(isinstance(a, int) for a in args) and 1 <= len(args) <= 3:
+            return [tuple(range(*args))]
+        return None
+
+    # 같은 모듈(또는 가져온 모듈)의 함수, 같은 클래스의 메서드
+    target = None
+    if isinstance(func, ast.Name):
+        found = scope.lookup(func.id)
+        if isinstance(found, tuple):
+            target = found
+    elif (
+        isinstance(func, ast.Attribute) and isinstance(func.value, ast.Name)
+        and func.value.id in ("self", "cls") and scope.cls is not None
+    ):
+        method = scope.module.classes.get(scope.cls, {}).get(func.attr)
+        if method is not None:
+            target = (scope.module, method, scope.cls)
+    if target is None or scope.depth >= _MAX_CALL_DEPTH:
+        return None
+    module, definition, cls = target
+    return _call(module, definition, cls, node, scope)
+
+
+def _call(module: _Module, func, cls: str | None, call: ast.Call, caller: "_Scope") -> list | None:
+    """Union of the values ``func``'s return statements can produce for this call's arguments."""
+    scope = _Scope(module, cls, dict(module.names), caller.depth + 1)
+    _bind_defaults(func, scope)
+    params = [a.arg for a in func.args.posonlyargs + func.args.args]
+    is_static = any(isinstance(d, ast.Name) and d.id == "staticmethod" for d in func.decorator_list)
+    if cls is not None and not is_static and params:
+        params = params[1:]  # self / cls
+    for param, arg in zip(params, call.args):
+        if isinstance(arg, ast.Starred):
+            break
+        _set(scope.names, param, _resolve(arg, caller))
+    for keyword in call.keywords:
+        if keyword.arg is not None:
+            _set(scope.names, keyword.arg, _resolve(keyword.value, caller))
+    _bind(func.body, scope)
+    results = []
+    for node in _own_nodes(func):
+        if isinstance(node, ast.Return) and node.value is not None:
+            values = _resolve(node.value, scope)
+            if values is None:
+                return None
+            results += values
+    return _capped(list(dict.fromkeys(results))) if results else None
+
+
+def _add(a, b):
+    if isinstance(a, str) and isinstance(b, str) or isinstance(a, tuple) and isinstance(b, tuple):
+        return a + b
+    raise TypeError
+
+
+def _mult(a, b):
+    if isinstance(a, str) and isinstance(b, int) and not isinstance(b, bool):
+        return a * b
+    raise TypeError
+
+
+def _combine(left: list | None, right: list | None, op) -> list | None:
+    """``op`` over every pair of alternatives; ``op=None`` takes the union."""
+    if left is None or right is None:
+        return None
+    if op is None:
+        return _capped(list(dict.fromkeys(left + right)))
+    try:
+        return _capped(list(dict.fromkeys(op(a, b) for a, b in itertools.product(left, right))))
+    except TypeError:
+        return None
+
+
+def _product(parts: list[list], join) -> list | None:
+    count = 1
+    for values in parts:
+        count *= len(values)
+    if count > _MAX_ALTERNATIVES:
+        return None
+    return list(dict.fromkeys(join(combo) for combo in itertools.product(*parts)))
+
+
+def _capped(values: list) -> list | None:
+    return values if len(values) <= _MAX_ALTERNATIVES else None
+
+
+def _comment_block(lines: list[str], lineno: int):
+    i = lineno - 2
+    while i >= 0 and lines[i].strip().startswith("#"):
+        yield lines[i]
+        i -= 1
+
+
+def _allowed_scans(lines: list[str], lineno: int) -> set[str]:
+    """Tables named by ``# full-scan:`` comments in the comment block right above ``lineno``."""
+    allowed = set()
+    for line in _comment_block(lines, lineno):
+        m = _MARKER.search(line)
+        if m:
+            allowed.update(t.strip() for t in m.group(1).split(",") if t.strip())
+    return allowed
+
+
+def _is_unchecked(lines: list[str], lineno: int) -> bool:
+    return any(_UNCHECKED.search(line) for line in _comment_block(lines, lineno))
+
+
+# ── plan helpers ──
+
+def _null_params(sql: str):
+    # EXPLAIN 도 파라미터 개수가 맞아야 한다 — 값은 계획에 영향이 없으므로 NULL
+    bare = re.sub(r"'(?:[^']|'')*'", "", sql)
+    if re.search(r"(?<!:):\w+", bare):
+        return _NullMapping()
+    return (None,) * bare.count("?")
+
+
+class _NullMapping(dict):
+    def __missing__(self, key):
+        return None
+
+
+def _aliases(sql: str, tables: set[str]) -> dict[str, str]:
+    aliases = {}
+    for table, alias in _TABLE_REF.findall(sql):
+        if table not in tables:
+            continue
+        aliases[table.lower()] = table
+        if alias and alias.upper() not in _KEYWORDS:
+            aliases[alias.lower()] = table
+    return aliases
+
+
+_KEYWORDS = {
+    "ON", "WHERE", "JOIN", "LEFT", "INNER", "CROSS", "GROUP", "ORDER", "LIMIT",
+    "SET", "VALUES", "SELECT", "HAVING", "USING", "UNION", "AND", "OR",
+}
+
+
+def _row_count(conn: sqlite3.Connection, table: str) -> int:
+    try:
+        return conn.execute(f'SELECT COUNT(*) FROM "{table}"').fetchone()[0]
+    except sqlite3.Error:
+        return 0  # 가상 테이블 등
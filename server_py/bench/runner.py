@@ -0,0 +1,204 @@
+"""
+Benchmark runner — index build, memory, query latency and suggestion cost.
+
+Queries go through the same helpers as ``/api/search`` (``_find_candidates``,
+``load_enrichment``, ``_extract_suggestions``) against an engine built
+directly, without HTTP or the response cache in between.
+"""
+import gc
+import math
+import os
+import platform
+import subprocess
+import sys
+import time
+import tracemalloc
+from contextlib import closing
+from datetime import datetime, timezone
+
+try:
+    import resource
+except ImportError:  # Windows — peak RSS 는 생략
+    resource = None
+
+from .. import database
+from ..search_corpus import iter_documents, load_enrichment
+from ..search_engine import create_engine
+from .corpus import make_queries
+
+# 결과 JSON 의 구조가 바뀌면 올린다 (compare 는 같은 버전끼리만)
+RESULT_SCHEMA = 1
+
+
+def run(
+    db_path: str, engine: str = "tfidf", n_queries: int = 200, top_k: int = 10,
+    seed: int = 1, measure_memory: bool = True,
+) -> dict:
+    """Benchmark one engine over the DB at ``db_path``; returns the JSON-ready result."""
+    database.DB_PATH = db_path
+    os.environ["SEARCH_ENGINE"] = engine
+    # routes 는 DB_PATH 를 바꾼 뒤에 import (모듈 전역 index 를 만든다)
+    from ..routes import search as search_routes
+
+    built, build_seconds = _build()
+    result = {
+        "schema": RESULT_SCHEMA,
+        "meta": {
+            "createdAt": datetime.now(timezone.utc).isoformat(),
+            "gitRevision": _git_revision(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "engine": type(built).__name__,
+            "requestedEngine": engine,
+            "db": os.path.abspath(db_path),
+            "documents": built.doc_count,
+            "seed": seed,
+            "topK": top_k,
+            "queriesPerKind": n_queries,
+        },
+        "build": {"seconds": round(build_seconds, 3), "maxRssMb": _max_rss_mb()},
+    }
+    if measure_memory:
+        result["build"]["tracedPeakMb"] = _traced_build_peak_mb()
+
+    # 불용어 캐시는 index.generation 기준 — 벤치 엔진은 index 밖에서 만들었으므로 비운다
+    search_routes._stop_words_cache = None
+    queries = make_queries(n_queries, seed)
+    result["queries"] = {
+        kind: _time_queries(search_routes, built, items, top_k) for kind, items in queries.items()
+    }
+    result["suggestions"] = _time_suggestions(search_routes, built, queries["plain"], top_k)
+    return result
+
+
+# ── measurements ──
+
+def _build():
+    engine = create_engine()
+    with closing(database.get_connection()) as conn:
+        if getattr(engine, "STORED_IN_DB", False):
+            # FTS 색인은 DB 안에 남는다 — 이미 최신이면 build_index 는 할 일이 없으므로 전부 다시 채운다
+            from ..search_fts import ensure_schema
+            ensure_schema(conn)
+            start = time.perf_counter()
+            engine.rebuild()
+        else:
+            start = time.perf_counter()
+            engine.build_index(iter_documents(conn))
+        return engine, time.perf_counter() - start
+
+
+def _traced_build_peak_mb() -> float:
+    """Peak Python heap during a second, traced build (tracing slows it, so it is not timed)."""
+    gc.collect()
+    tracemalloc.start()
+    try:
+        engine, _ = _build()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    del engine
+    gc.collect()
+    return round(peak / 2**20, 1)
+
+
+def _time_queries(search_routes, engine, items: list, top_k: int) -> dict:
+    for query, filters in items[:5]:  # 워밍업 (fuzzy 색인, boost 통계 등 지연 초기화)
+        search_routes._find_candidates(engine, query, top_k, filters=filters)
+    latencies, hits = [], 0
+    for query, filters in items:
+        start = time.perf_counter()
+        results = search_routes._find_candidates(engine, query, top_k, filters=filters)
+        latencies.append(time.perf_counter() - start)
+        hits += len(results)
+    stats = _latency_stats(latencies)
+    stats["meanHits"] = round(hits / len(items), 2) if items else 0
+    return stats
+
+
+def _time_suggestions(search_routes, engine, items: list, top_k: int) -> dict:
+    """Cost of ``_extract_suggestions`` alone, over the enriched results of the plain queries."""
+    prepared = []
+    with closing(database.get_connection()) as conn:
+        for query, _ in items:
+            candidates = search_routes._find_candidates(engine, query, top_k)
+            projects, splits = load_enrichment(conn, [r["document"] for r in candidates])
+            enriched = [{
+                "score": r["score"],
+                "experiment": r["document"],
+                "project": projects.get(r["document"].get("iacpj_nm")),
+                "splits": splits.get(r["document"].get("plan_id"), []),
+            } for r in candidates]
+            prepared.append((query, enriched))
+    for query, enriched in prepared[:5]:
+        search_routes._extract_suggestions(engine, enriched, query)
+    latencies = []
+    for query, enriched in prepared:
+        start = time.perf_counter()
+        search_routes._extract_suggestions(engine, enriched, query)
+        latencies.append(time.perf_counter() - start)
+    return _latency_stats(latencies)
+
+
+def _latency_stats(seconds: list[float]) -> dict:
+    if not seconds:
+        return {"n": 0}
+    ordered = sorted(seconds)
+
+    def pct(p: int) -> float:
+        # nearest-rank
+        return round(ordered[max(0, math.ceil(p / 100 * len(ordered)) - 1)] * 1000, 3)
+
+    return {
+        "n": len(ordered),
+        "meanMs": round(sum(ordered) / len(ordered) * 1000, 3),
+        "p50Ms": pct(50),
+        "p90Ms": pct(90),
+        "p99Ms": pct(99),
+        "maxMs": round(ordered[-1] * 1000, 3),
+    }
+
+
+def _max_rss_mb() -> float | None:
+    if resource is None:
+        return None
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux 는 KB, macOS 는 byte
+    return round(rss / (2**20 if sys.platform == "darwin" else 2**10), 1)
+
+
+def _git_revision() -> str | None:
+    try:
+        out = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, timeout=5,
+            cwd=os.path.dirname(os.path.abspath(__file__)),
+        )
+    except (OSError, subprocess.SubprocessError):
+        return None
+    return out.stdout.strip() or None
+
+
+# ── comparison ──
+
+def compare(old: dict, new: dict) -> list[tuple[str, float, float, float | None]]:
+    """``(metric, old, new, change %)`` for every numeric metric present in both results."""
+    if old.get("schema") != new.get("schema"):
+        raise ValueError(f"result schema differs: {old.get('schema')} vs {new.get('schema')}")
+    a, b = _flatten(old), _flatten(new)
+    rows = []
+    for key in a:
+        if key == "schema" or key.startswith("meta.") or key not in b:
+            continue
+        change = (b[key] - a[key]) / a[key] * 100 if a[key] else None
+        rows.append((key, a[key], b[key], None if change is None else round(change, 1)))
+    return rows
+
+
+def _flatten(data: dict, prefix: str = "") -> dict[str, float]:
+    flat = {}
+    for key, value in data.items():
+        if isinstance(value, dict):
+            flat.update(_flatten(value, f"{prefix}{key}."))
+        elif isinstance(value, (int, float)) and not isinstance(value, bool):
+            flat[f"{prefix}{key}"] = value
+    return flat
@@ -0,0 +1,79 @@
+"""
+Aggregate counters behind the project / experiment list endpoints.
+
+``plan_split_counts``  split_tables rows per plan_id
+``project_counts``     experiments per project, and how many of those have a
+                       plan with two or more split rows (``split_count``)
+
+Triggers on experiments and split_tables keep both current (schema
+migration 4), so the list endpoints join them instead of grouping every
+split row on each request. ``rebuild`` recomputes them from the base tables
+— after writes made with triggers bypassed, or when ``verify`` finds drift.
+
+    python -m server_py.counters            # rebuild
+    python -m server_py.counters --verify   # compare with a fresh aggregate; exit 1 on drift
+"""
+import argparse
+import sqlite3
+import sys
+
+# 기준 집계 — list_projects / list_experiments 가 예전에 요청마다 하던 GROUP BY 와 같다
+_PLAN_SPLITS_SQL = "SELECT plan_id, COUNT(*) FROM split_tables GROUP BY plan_id"
+_PROJECTS_SQL = """
+    SELECT e.iacpj_nm, COUNT(*), COALESCE(SUM(s.cnt >= 2), 0)
+    FROM experiments e
+    LEFT JOIN (SELECT plan_id, COUNT(*) AS cnt FROM split_tables GROUP BY plan_id) s
+      ON s.plan_id = e.plan_id
+    GROUP BY e.iacpj_nm
+"""
+
+
+def rebuild(conn: sqlite3.Connection):
+    """Recompute both counter tables from experiments / split_tables (caller commits)."""
+    conn.execute("DELETE FROM plan_split_counts")
+    conn.execute("DELETE FROM project_counts")
+    conn.execute(f"INSERT INTO plan_split_counts (plan_id, split_count) {_PLAN_SPLITS_SQL}")
+    conn.execute(f"INSERT INTO project_counts (iacpj_nm, experiment_count, split_count) {_PROJECTS_SQL}")
+
+
+def verify(conn: sqlite3.Connection) -> list[str]:
+    """Differences between the stored counters and a fresh aggregate (empty when consistent)."""
+    problems = []
+    for label, stored_sql, expected_sql in (
+        ("plan", "SELECT plan_id, split_count FROM plan_split_counts", _PLAN_SPLITS_SQL),
+        ("project", "SELECT iacpj_nm, experiment_count, split_count FROM project_counts", _PROJECTS_SQL),
+    ):
+        stored = {row[0]: tuple(row[1:]) for row in conn.execute(stored_sql)}
+        expected = {row[0]: tuple(row[1:]) for row in conn.execute(expected_sql)}
+        for key in sorted(stored.keys() | expected.keys()):
+            if stored.get(key) != expected.get(key):
+                problems.append(f"{label} {key!r}: stored {stored.get(key)}, expected {expected.get(key)}")
+    return problems
+
+
+def main(argv=None) -> int:
+    from . import database
+
+    parser = argparse.ArgumentParser(prog="python -m server_py.counters", description="Rebuild or verify list counters")
+    parser.add_argument("--db", default=database.DB_PATH, help=f"database file (default: {database.DB_PATH})")
+    parser.add_argument("--verify", action="store_true", help="only compare; do not rebuild")
+    args = parser.parse_args(argv)
+
+    conn = database._connect(args.db)
+    try:
+        if args.verify:
+            problems = verify(conn)
+            for line in problems[:50]:
+                print(line)
+            print(f"{len(problems)} mismatches", file=sys.stderr)
+            return 1 if problems else 0
+        with conn:
+            rebuild(conn)
+        print("counters rebuilt", file=sys.stderr)
+    finally:
+        conn.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,35 +1,539 @@
 """
 Database module — SQLite connection, schema init, seed data.
 Mirrors server/db.js exactly.
+
+Request traffic reads through a pool of ``query_only`` connections
+(``get_db``); every write transaction goes through the single writer
+thread (``run_write``), which commits queued small writes together.
+``async def`` routes reach both through ``AsyncDatabase`` (``get_async_db``),
+which keeps the blocking calls off the event loop.
 """
+import asyncio
+import functools
 import sqlite3
 import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
 from contextlib import contextmanager
 
+from .migrations import migrate
+
 DB_PATH = os.path.join(os.path.dirname(__file__), "lab.db")
 
 # ──────────────────────────────────────────────
 # Connection helper
 # ──────────────────────────────────────────────
 
-def get_connection() -> sqlite3.Connection:
-    """Return a new connection with WAL mode and foreign keys enabled.
-    Row factory is set to sqlite3.Row for dict-like access."""
-    conn = sqlite3.connect(DB_PATH, check_same_thread=False)
+# 연결마다 한 번만 적용하는 설정 (풀 연결은 재사용되므로 요청마다 다시 실행하지 않는다)
+_PRAGMAS = (
+    "PRAGMA journal_mode = WAL",
+    "PRAGMA synchronous = NORMAL",   # WAL 에서는 커밋 순서가 보장된다 — 전원 장애 시 마지막 커밋만 잃을 수 있다
+    "PRAGMA foreign_keys = ON",
+    "PRAGMA cache_size = -16000",    # 연결당 ~16 MB 페이지 캐시
+    "PRAGMA mmap_size = 268435456",  # 256 MB — OS 페이지 캐시를 프로세스 간에 공유
+    "PRAGMA temp_store = MEMORY",
+)
+CACHED_STATEMENTS = 256
+
+POOL_SIZE = int(os.environ.get("DB_POOL_SIZE", "16"))
+POOL_TIMEOUT = 30.0          # 빈 연결을 기다리는 최대 시간 (초)
+POOL_MAX_LIFETIME = 3600.0   # 이보다 오래된 연결은 반납 시 닫고 새로 연다
+POOL_HEALTH_CHECK_IDLE = 60.0  # 이보다 오래 쉬던 연결은 꺼낼 때 SELECT 1 로 확인
+
+
+def _connect(path: str, read_only: bool = False) -> sqlite3.Connection:
+    conn = sqlite3.connect(path, check_same_thread=False, cached_statements=CACHED_STATEMENTS)
     conn.row_factory = sqlite3.Row
-    conn.execute("PRAGMA journal_mode = WAL")
-    conn.execute("PRAGMA foreign_keys = ON")
+    for pragma in _PRAGMAS:
+        conn.execute(pragma)
+    if read_only:
+        # mode=ro 대신 query_only — WAL 의 -shm 을 만들 수 있어야 하므로 파일은 쓰기 가능하게 연다
+        conn.execute("PRAGMA query_only = ON")
     return conn
 
 
+def get_connection() -> sqlite3.Connection:
+    """Return a new, fully configured read-write connection (WAL, foreign keys, caches).
+    Row factory is set to sqlite3.Row for dict-like access. The caller closes it;
+    request handlers read through ``get_db`` / ``pooled_connection`` and write
+    through ``run_write`` instead."""
+    return _connect(DB_PATH)
+
+
+class PoolTimeout(sqlite3.OperationalError):
+    """No pooled connection became free within the pool timeout."""
+
+
+class ConnectionPool:
+    """Bounded checkout/return pool of configured read-only connections to one DB file.
+
+    Idle connections are reused most-recently-returned first (warm page
+    cache). A connection is pinged before reuse after a long idle period,
+    rolled back if it comes back mid-transaction, and replaced once it is
+    older than ``max_lifetime``.
+    """
+
+    def __init__(
+        self, path: str, max_size: int = POOL_SIZE, timeout: float = POOL_TIMEOUT,
+        max_lifetime: float = POOL_MAX_LIFETIME, health_check_idle: float = POOL_HEALTH_CHECK_IDLE,
+    ):
+        self.path = path
+        self.max_size = max_size
+        self.timeout = timeout
+        self.max_lifetime = max_lifetime
+        self.health_check_idle = health_check_idle
+        self._cond = threading.Condition()
+        self._idle: list[tuple[sqlite3.Connection, float, float]] = []  # (conn, 생성 시각, 반납 시각)
+        self._created_at: dict[int, float] = {}  # 대여 중인 연결 id → 생성 시각
+        self._open = 0
+        self._closed = False
+        self._metrics = {
+            "checkouts": 0, "waits": 0, "waitSecondsTotal": 0.0, "waitSecondsMax": 0.0,
+            "timeouts": 0, "created": 0, "recycled": 0, "healthCheckFailures": 0,
+        }
+
+    @contextmanager
+    def connection(self):
+        conn = self.acquire()
+        try:
+            yield conn
+        finally:
+            self.release(conn)
+
+    def acquire(self) -> sqlite3.Connection:
+        start = time.monotonic()
+        deadline = start + self.timeout
+        waited = False
+        with self._cond:
+            while True:
+                if self._closed:
+                    raise sqlite3.ProgrammingError("connection pool is closed")
+                if self._idle:
+                    conn, created, returned = self._idle.pop()
+                    break
+                if self._open < self.max_size:
+                    self._open += 1
+                    conn, created, returned = None, 0.0, 0.0
+                    break
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    self._metrics["timeouts"] += 1
+                    raise PoolTimeout(f"no database connection free after {self.timeout:.0f}s")
+                waited = True
+                self._cond.wait(remaining)
+            wait = time.monotonic() - start
+            m = self._metrics
+            m["checkouts"] += 1
+            if waited:
+                m["waits"] += 1
+                m["waitSecondsTotal"] += wait
+                m["waitSecondsMax"] = max(m["waitSecondsMax"], wait)
+
+        now = time.monotonic()
+        if conn is not None and now - created > self.max_lifetime:
+            self._discard(conn, "recycled")
+            conn = None
+        elif conn is not None and now - returned > self.health_check_idle and not self._ping(conn):
+            self._discard(conn, "healthCheckFailures")
+            conn = None
+        if conn is None:
+            try:
+                conn = _connect(self.path, read_only=True)
+            except Exception:
+                with self._cond:
+                    self._open -= 1
+                    self._cond.notify()
+                raise
+            created = now
+            with self._cond:
+                self._metrics["created"] += 1
+        with self._cond:
+            self._created_at[id(conn)] = created
+        return conn
+
+    def release(self, conn: sqlite3.Connection):
+        with self._cond:
+            created = self._created_at.pop(id(conn))
+        healthy = True
+        if conn.in_transaction:
+            # 커밋 없이 끝난 요청 (예외 등) — 다음 사용자에게 열린 트랜잭션을 넘기지 않는다
+            try:
+                conn.rollback()
+            except sqlite3.Error:
+                healthy = False
+        now = time.monotonic()
+        with self._cond:
+            if healthy and not self._closed and now - created <= self.max_lifetime:
+                self._idle.append((conn, created, now))
+                self._cond.notify()
+                return
+            if healthy and not self._closed:
+                self._metrics["recycled"] += 1
+            self._open -= 1
+            self._cond.notify()
+        conn.close()
+
+    def close(self):
+        """Close idle connections now and checked-out ones as they are returned."""
+        with self._cond:
+            self._closed = True
+            idle, self._idle = self._idle, []
+            self._open -= len(idle)
+            self._cond.notify_all()
+        for conn, _, _ in idle:
+            conn.close()
+
+    def stats(self) -> dict:
+        with self._cond:
+            stats = dict(self._metrics)
+            stats.update({
+                "maxSize": self.max_size,
+                "open": self._open,
+                "idle": len(self._idle),
+                "inUse": self._open - len(self._idle),
+            })
+        stats["waitSecondsTotal"] = round(stats["waitSecondsTotal"], 3)
+        stats["waitSecondsMax"] = round(stats["waitSecondsMax"], 3)
+        return stats
+
+    # ── helpers ──
+    @staticmethod
+    def _ping(conn: sqlite3.Connection) -> bool:
+        try:
+            conn.execute("SELECT 1").fetchone()
+            return True
+        except sqlite3.Error:
+            return False
+
+    def _discard(self, conn: sqlite3.Connection, metric: str):
+        # 자리(_open)는 유지한다 — 호출자가 곧바로 새 연결을 연다
+        with self._cond:
+            self._metrics[metric] += 1
+        try:
+            conn.close()
+        except sqlite3.Error:
+            pass
+
+
+_pool: ConnectionPool | None = None
+_pool_lock = threading.Lock()
+
+
+def get_pool() -> ConnectionPool:
+    """The process-wide pool for the current ``DB_PATH`` (replaced if DB_PATH changes)."""
+    global _pool
+    pool = _pool
+    if pool is None or pool.path != DB_PATH:
+        with _pool_lock:
+            if _pool is None or _pool.path != DB_PATH:
+                if _pool is not None:
+                    _pool.close()
+                _pool = ConnectionPool(DB_PATH)
+            pool = _pool
+    return pool
+
+
+def pooled_connection():
+    """Context manager: check a read-only connection out of the pool and return it afterwards."""
+    return get_pool().connection()
+
+
+def pool_stats() -> dict:
+    return get_pool().stats()
+
+
 def get_db():
-    """FastAPI dependency — yields a connection then closes it."""
-    conn = get_connection()
-    try:
+    """FastAPI dependency — yields a pooled read-only connection, returned to the pool afterwards."""
+    with pooled_connection() as conn:
         yield conn
-    finally:
-        conn.close()
+
+
+# ──────────────────────────────────────────────
+# Single writer
+# ──────────────────────────────────────────────
+
+WRITE_BATCH_MAX = 32  # 한 트랜잭션으로 묶는 최대 쓰기 작업 수
+
+
+class _WriteJob:
+    __slots__ = ("fn", "args", "kwargs", "queued_at", "done", "result", "error")
+
+    def __init__(self, fn, args, kwargs):
+        self.fn, self.args, self.kwargs = fn, args, kwargs
+        self.queued_at = time.monotonic()
+        self.done = threading.Event()
+        self.result = None
+        self.error: BaseException | None = None
+
+
+class WriteQueue:
+    """One thread owning the only write connection; write transactions run serially.
+
+    ``submit(fn, ...)`` queues ``fn(conn, ...)`` and blocks until it has been
+    committed. Jobs waiting together are group-committed: one
+    ``BEGIN IMMEDIATE`` … ``COMMIT`` with each job in its own savepoint, so
+    a job that raises is rolled back alone and its exception re-raised to
+    its caller. ``fn`` must not commit, roll back or use ``executescript``.
+    """
+
+    def __init__(self, path: str, batch_max: int = WRITE_BATCH_MAX):
+        self.path = path
+        self.batch_max = batch_max
+        self._cond = threading.Condition()
+        self._queue: list[_WriteJob] = []
+        self._closed = False
+        self._conn: sqlite3.Connection | None = None
+        self._thread: threading.Thread | None = None
+        self._metrics = {
+            "jobs": 0, "failedJobs": 0, "batches": 0, "maxBatch": 0,
+            "queueWaitSecondsTotal": 0.0, "queueWaitSecondsMax": 0.0, "commitSecondsTotal": 0.0,
+        }
+
+    def submit(self, fn, *args, **kwargs):
+        if threading.current_thread() is self._thread:
+            raise RuntimeError("run_write called from inside a write job")
+        job = _WriteJob(fn, args, kwargs)
+        with self._cond:
+            if self._closed:
+                raise sqlite3.ProgrammingError("write queue is closed")
+            self._queue.append(job)
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="db-writer", daemon=True)
+                self._thread.start()
+            self._cond.notify()
+        job.done.wait()
+        if job.error is not None:
+            raise job.error
+        return job.result
+
+    def close(self):
+        """Stop after the queued jobs have run."""
+        with self._cond:
+            self._closed = True
+            self._cond.notify()
+
+    def stats(self) -> dict:
+        with self._cond:
+            stats = dict(self._metrics)
+            stats["queued"] = len(self._queue)
+        for key in ("queueWaitSecondsTotal", "queueWaitSecondsMax", "commitSecondsTotal"):
+            stats[key] = round(stats[key], 3)
+        return stats
+
+    # ── writer thread ──
+    def _run(self):
+        while True:
+            with self._cond:
+                while not self._queue and not self._closed:
+                    self._cond.wait()
+                if not self._queue:
+                    break
+                batch = self._queue[:self.batch_max]
+                del self._queue[:self.batch_max]
+            self._run_batch(batch)
+        if self._conn is not None:
+            self._conn.close()
+
+    def _run_batch(self, batch: list[_WriteJob]):
+        started = time.monotonic()
+        try:
+            conn = self._connection()
+            conn.execute("BEGIN IMMEDIATE")
+        except Exception as e:
+            self._reset_connection()
+            self._finish(batch, started, abort=e)
+            return
+
+        aborted = None
+        for job in batch:
+            try:
+                conn.execute("SAVEPOINT write_job")
+            except sqlite3.Error as e:
+                aborted = e
+                break
+            try:
+                job.result = job.fn(conn, *job.args, **job.kwargs)
+                conn.execute("RELEASE write_job")
+            except BaseException as e:
+                job.error = e
+                try:
+                    conn.execute("ROLLBACK TO write_job")
+                    conn.execute("RELEASE write_job")
+                except sqlite3.Error as rollback_error:
+                    # SQLite 가 트랜잭션 전체를 되돌렸다 (디스크 가득 참 등) — 앞선 작업도 무효
+                    aborted = rollback_error
+                    break
+
+        commit_start = time.monotonic()
+        if aborted is None:
+            try:
+                conn.execute("COMMIT")
+            except sqlite3.Error as e:
+                aborted = e
+        if aborted is not None and conn.in_transaction:
+            try:
+                conn.execute("ROLLBACK")
+            except sqlite3.Error:
+                self._reset_connection()
+        with self._cond:
+            self._metrics["commitSecondsTotal"] += time.monotonic() - commit_start
+        self._finish(batch, started, abort=aborted)
+
+    def _finish(self, batch: list[_WriteJob], started: float, abort: BaseException | None):
+        with self._cond:
+            m = self._metrics
+            m["batches"] += 1
+            m["maxBatch"] = max(m["maxBatch"], len(batch))
+            for job in batch:
+                if abort is not None and job.error is None:
+                    job.error = sqlite3.OperationalError(f"write transaction aborted: {abort}")
+                wait = started - job.queued_at
+                m["jobs"] += 1
+                m["failedJobs"] += job.error is not None
+                m["queueWaitSecondsTotal"] += wait
+                m["queueWaitSecondsMax"] = max(m["queueWaitSecondsMax"], wait)
+        for job in batch:
+            job.done.set()
+
+    def _connection(self) -> sqlite3.Connection:
+        if self._conn is None:
+            self._conn = _connect(self.path)
+            self._conn.isolation_level = None  # BEGIN / SAVEPOINT / COMMIT 는 직접 낸다
+        return self._conn
+
+    def _reset_connection(self):
+        conn, self._conn = self._conn, None
+        if conn is not None:
+            try:
+                conn.close()
+            except sqlite3.Error:
+                pass
+
+
+_writer: WriteQueue | None = None
+
+
+def get_writer() -> WriteQueue:
+    """The process-wide writer for the current ``DB_PATH`` (replaced if DB_PATH changes)."""
+    global _writer
+    writer = _writer
+    if writer is None or writer.path != DB_PATH:
+        with _pool_lock:
+            if _writer is None or _writer.path != DB_PATH:
+                if _writer is not None:
+                    _writer.close()
+                _writer = WriteQueue(DB_PATH)
+            writer = _writer
+    return writer
+
+
+def run_write(fn, *args, **kwargs):
+    """Run ``fn(conn, *args, **kwargs)`` in a write transaction on the writer thread; returns its result."""
+    return get_writer().submit(fn, *args, **kwargs)
+
+
+def writer_stats() -> dict:
+    return get_writer().stats()
+
+
+# ──────────────────────────────────────────────
+# Async facade (async def 라우트용)
+# ──────────────────────────────────────────────
+
+# 동시에 실행되는 블로킹 DB 작업 수 상한 — 풀 크기보다 크면 풀 대기만 늘어난다
+DB_EXECUTOR_WORKERS = int(os.environ.get("DB_EXECUTOR_WORKERS", "8"))
+
+
+class AsyncDatabase:
+    """Awaitable front for the read pool and the writer, for ``async def`` routes.
+
+    Every call runs on one dedicated executor of ``max_workers`` threads, so
+    at most that many blocking jobs (queries, index lookups, CSV parsing)
+    are in flight and the event loop never waits on SQLite. ``read`` holds a
+    pooled connection only while its job runs, not across the request's
+    other awaits (e.g. an LLM call).
+    """
+
+    def __init__(self, max_workers: int = DB_EXECUTOR_WORKERS):
+        self.max_workers = max_workers
+        self._executor = ThreadPoolExecutor(max_workers, thread_name_prefix="db-async")
+        self._lock = threading.Lock()
+        self._metrics = {
+            "calls": 0, "failedCalls": 0, "running": 0, "queued": 0,
+            "queueWaitSecondsTotal": 0.0, "queueWaitSecondsMax": 0.0, "runSecondsMax": 0.0,
+        }
+
+    async def read(self, fn, *args, **kwargs):
+        """``fn(conn, *args, **kwargs)`` on a pooled read-only connection."""
+        return await self.run(_call_pooled, fn, args, kwargs)
+
+    async def write(self, fn, *args, **kwargs):
+        """``fn(conn, *args, **kwargs)`` as a write job (see ``run_write``); resolves once committed."""
+        return await self.run(run_write, fn, *args, **kwargs)
+
+    async def run(self, fn, *args, **kwargs):
+        """Any other blocking ``fn(*args, **kwargs)`` on the same bounded executor."""
+        with self._lock:
+            self._metrics["queued"] += 1
+        loop = asyncio.get_running_loop()
+        call = functools.partial(self._call, time.monotonic(), fn, args, kwargs)
+        return await loop.run_in_executor(self._executor, call)
+
+    def stats(self) -> dict:
+        with self._lock:
+            stats = dict(self._metrics)
+        stats["maxWorkers"] = self.max_workers
+        for key in ("queueWaitSecondsTotal", "queueWaitSecondsMax", "runSecondsMax"):
+            stats[key] = round(stats[key], 3)
+        return stats
+
+    def _call(self, queued_at: float, fn, args, kwargs):
+        start = time.monotonic()
+        wait = start - queued_at
+        with self._lock:
+            m = self._metrics
+            m["queued"] -= 1
+            m["running"] += 1
+            m["calls"] += 1
+            m["queueWaitSecondsTotal"] += wait
+            m["queueWaitSecondsMax"] = max(m["queueWaitSecondsMax"], wait)
+        failed = True
+        try:
+            result = fn(*args, **kwargs)
+            failed = False
+            return result
+        finally:
+            with self._lock:
+                m["running"] -= 1
+                m["failedCalls"] += failed
+                m["runSecondsMax"] = max(m["runSecondsMax"], time.monotonic() - start)
+
+
+def _call_pooled(fn, args, kwargs):
+    with pooled_connection() as conn:
+        return fn(conn, *args, **kwargs)
+
+
+_async_db: AsyncDatabase | None = None
+
+
+def get_async_db() -> AsyncDatabase:
+    """FastAPI dependency for ``async def`` routes — the process-wide ``AsyncDatabase``.
+
+    Not tied to ``DB_PATH``: each call goes through ``get_pool()`` / ``run_write``.
+    """
+    global _async_db
+    if _async_db is None:
+        with _pool_lock:
+            if _async_db is None:
+                _async_db = AsyncDatabase()
+    return _async_db
+
+
+def async_db_stats() -> dict:
+    return get_async_db().stats()
 
 
 def dict_row(row: sqlite3.Row | None):
@@ -49,122 +553,10 @@ def dict_rows(rows):
 # ──────────────────────────────────────────────
 
 def init_db():
+    """Bring the schema up to date — see ``migrations``."""
     conn = get_connection()
     try:
-        conn.executescript("""
-            CREATE TABLE IF NOT EXISTS projects (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                iacpj_nm TEXT UNIQUE NOT NULL,
-                iacpj_tgt_n TEXT,
-                iacpj_level TEXT,
-                iacpj_tech_n TEXT,
-                ia_tgt_htr_n TEXT,
-                iacpj_nud_n TEXT,
-                iacpj_mod_n TEXT,
-                iacpj_itf_uno TEXT,
-                iacpj_bgn_dy TEXT,
-                iacpj_ch_n TEXT,
-                ia_ta_grd_n TEXT,
-                project_purpose TEXT,
-                iacpj_ta_goa TEXT,
-                iacpj_cur_stt TEXT,
-                iacpj_ch_i TEXT,
-                ia_ch_or_i TEXT,
-                ia_ch_or_n TEXT,
-                ia_ch_or_path TEXT,
-                iacpj_core_tec TEXT,
-                iacpj_end_dy TEXT,
-                iacpj_reg_dy TEXT
-            );
-
-            CREATE TABLE IF NOT EXISTS experiments (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                team TEXT,
-                requester TEXT,
-                lot_code TEXT,
-                iacpj_nm TEXT NOT NULL,
-                module TEXT,
-                wf_direction TEXT,
-                eval_process TEXT,
-                prev_eval TEXT,
-                cross_experiment TEXT,
-                eval_category TEXT,
-                eval_item TEXT,
-                lot_request TEXT,
-                reference TEXT,
-                volume_split TEXT,
-                plan_id TEXT,
-                assign_wf TEXT,
-                refdata TEXT,
-                refdata_url TEXT,
-                request_date TEXT,
-                status TEXT DEFAULT 'Assign 전',
-                split_completed INTEGER DEFAULT 0,
-                summary_completed INTEGER DEFAULT 0,
-                fab_status TEXT,
-                FOREIGN KEY (iacpj_nm) REFERENCES projects(iacpj_nm)
-            );
-
-            CREATE TABLE IF NOT EXISTS line_lots (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                lot_id TEXT NOT NULL,
-                current_step TEXT,
-                fac_id TEXT DEFAULT 'r3',
-                status TEXT DEFAULT 'available',
-                estimated_arrival TEXT
-            );
-
-            CREATE TABLE IF NOT EXISTS split_tables (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                sno INTEGER,
-                fac_id TEXT,
-                plan_id TEXT NOT NULL,
-                oper_id TEXT,
-                oper_nm TEXT,
-                eps_lot_gbn_cd TEXT,
-                work_cond_desc TEXT,
-                eqp_id TEXT,
-                recipe_id TEXT,
-                user_def_val_1 TEXT,
-                user_def_val_2 TEXT,
-                user_def_val_3 TEXT,
-                user_def_val_4 TEXT,
-                user_def_val_5 TEXT,
-                user_def_val_6 TEXT,
-                user_def_val_7 TEXT,
-                user_def_val_8 TEXT,
-                user_def_val_9 TEXT,
-                user_def_val_10 TEXT,
-                user_def_val_11 TEXT,
-                user_def_val_12 TEXT,
-                user_def_val_13 TEXT,
-                user_def_val_14 TEXT,
-                user_def_val_15 TEXT,
-                user_def_val_16 TEXT,
-                user_def_val_17 TEXT,
-                user_def_val_18 TEXT,
-                user_def_val_19 TEXT,
-                user_def_val_20 TEXT,
-                user_def_val_21 TEXT,
-                user_def_val_22 TEXT,
-                user_def_val_23 TEXT,
-                user_def_val_24 TEXT,
-                user_def_val_25 TEXT,
-                note TEXT
-            );
-
-            CREATE INDEX IF NOT EXISTS idx_experiments_project ON experiments(iacpj_nm);
-            CREATE INDEX IF NOT EXISTS idx_experiments_plan ON experiments(plan_id);
-            CREATE INDEX IF NOT EXISTS idx_splits_plan ON split_tables(plan_id);
-        """)
-
-        # Migration: summary_text column
-        try:
-            conn.execute("ALTER TABLE experiments ADD COLUMN summary_text TEXT")
-            conn.commit()
-        except Exception:
-            pass  # already exists
-
+        migrate(conn)
     finally:
         conn.close()
 
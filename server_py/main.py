@@ -2,10 +2,15 @@
 FastAPI main application — mirrors server/index.js
 Run:  uvicorn server_py.main:app --port 3001 --reload
 """
+from contextlib import closing
+
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 
-from .database import init_db, seed_data
+from .database import get_connection, init_db, seed_data, pool_stats, writer_stats, async_db_stats
+from .search_engine import engine_backend
+from .search_fts import drop_schema as drop_fts_schema
+from .search_index import index as search_index
 from .routes import projects, experiments, splits, search, upload, llm_search, line_lots, analysis
 
 # ── App ──
@@ -22,11 +27,19 @@ app.add_middleware(
 # ── Init DB ──
 init_db()
 seed_data()
+if engine_backend() != "fts":
+    # 다른 백엔드면 FTS 테이블과 트리거를 지운다 — 쓰기마다 dirty 대기열이 쌓이지 않게
+    with closing(get_connection()) as conn:
+        drop_fts_schema(conn)
+
+# ── Wire up index refresh / invalidation callbacks (shared search index) ──
+experiments.set_refresh_index(search_index.refresh)
+splits.set_refresh_index(search_index.refresh)
+projects.set_refresh_index(search_index.refresh)
+upload.set_index_fns(search_index.refresh, search_index.invalidate)
 
-# ── Wire up index invalidation callbacks ──
-experiments.set_invalidate_index(search.invalidate_index)
-splits.set_invalidate_index(search.invalidate_index)
-upload.set_invalidate_fns(search.invalidate_index, llm_search.invalidate_index)
+# ── Build the search index in the background ──
+search_index.invalidate()
 
 # ── Register routers ──
 app.include_router(projects.router)
@@ -39,6 +52,13 @@ app.include_router(line_lots.router)
 app.include_router(analysis.router)
 
 
+
+# ── Health (DB 읽기 풀 / 쓰기 큐 / async executor 지표 포함) ──
+@app.get("/api/health")
+def health():
+    return {"status": "ok", "dbPool": pool_stats(), "dbWriter": writer_stats(), "dbAsync": async_db_stats()}
+
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run("server_py.main:app", host="0.0.0.0", port=3001, reload=True)
@@ -0,0 +1,393 @@
+"""
+Schema migrations — ordered, versioned, each applied once per database.
+
+``migrate(conn)`` runs every migration newer than the highest version in
+``schema_version``, each in its own ``BEGIN IMMEDIATE`` transaction, then
+refreshes the query planner statistics. To change the schema append a new
+migration to ``MIGRATIONS``; never edit or reorder one that has shipped.
+
+Databases created before this table existed start at version 0 — the
+first migrations are written to be no-ops on them.
+
+    python -m server_py.migrations            # apply pending migrations
+    python -m server_py.migrations --status   # list applied / pending
+"""
+import argparse
+import sqlite3
+import sys
+from datetime import datetime, timezone
+
+from .counters import rebuild as rebuild_counters
+
+# ANALYZE 가 인덱스마다 읽는 최대 행 수 — 큰 DB 에서도 시작 시간이 일정하다
+ANALYSIS_LIMIT = 1000
+
+
+# ──────────────────────────────────────────────
+# Migrations
+# ──────────────────────────────────────────────
+
+def _initial_schema(conn: sqlite3.Connection):
+    _run_script(conn, """
+        CREATE TABLE IF NOT EXISTS projects (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            iacpj_nm TEXT UNIQUE NOT NULL,
+            iacpj_tgt_n TEXT,
+            iacpj_level TEXT,
+            iacpj_tech_n TEXT,
+            ia_tgt_htr_n TEXT,
+            iacpj_nud_n TEXT,
+            iacpj_mod_n TEXT,
+            iacpj_itf_uno TEXT,
+            iacpj_bgn_dy TEXT,
+            iacpj_ch_n TEXT,
+            ia_ta_grd_n TEXT,
+            project_purpose TEXT,
+            iacpj_ta_goa TEXT,
+            iacpj_cur_stt TEXT,
+            iacpj_ch_i TEXT,
+            ia_ch_or_i TEXT,
+            ia_ch_or_n TEXT,
+            ia_ch_or_path TEXT,
+            iacpj_core_tec TEXT,
+            iacpj_end_dy TEXT,
+            iacpj_reg_dy TEXT
+        );
+
+        CREATE TABLE IF NOT EXISTS experiments (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            team TEXT,
+            requester TEXT,
+            lot_code TEXT,
+            iacpj_nm TEXT NOT NULL,
+            module TEXT,
+            wf_direction TEXT,
+            eval_process TEXT,
+            prev_eval TEXT,
+            cross_experiment TEXT,
+            eval_category TEXT,
+            eval_item TEXT,
+            lot_request TEXT,
+            reference TEXT,
+            volume_split TEXT,
+            plan_id TEXT,
+            assign_wf TEXT,
+            refdata TEXT,
+            refdata_url TEXT,
+            request_date TEXT,
+            status TEXT DEFAULT 'Assign 전',
+            split_completed INTEGER DEFAULT 0,
+            summary_completed INTEGER DEFAULT 0,
+            fab_status TEXT,
+            FOREIGN KEY (iacpj_nm) REFERENCES projects(iacpj_nm)
+        );
+
+        CREATE TABLE IF NOT EXISTS line_lots (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            lot_id TEXT NOT NULL,
+            current_step TEXT,
+            fac_id TEXT DEFAULT 'r3',
+            status TEXT DEFAULT 'available',
+            estimated_arrival TEXT
+        );
+
+        CREATE TABLE IF NOT EXISTS split_tables (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            sno INTEGER,
+            fac_id TEXT,
+            plan_id TEXT NOT NULL,
+            oper_id TEXT,
+            oper_nm TEXT,
+            eps_lot_gbn_cd TEXT,
+            work_cond_desc TEXT,
+            eqp_id TEXT,
+            recipe_id TEXT,
+            user_def_val_1 TEXT,
+            user_def_val_2 TEXT,
+            user_def_val_3 TEXT,
+            user_def_val_4 TEXT,
+            user_def_val_5 TEXT,
+            user_def_val_6 TEXT,
+            user_def_val_7 TEXT,
+            user_def_val_8 TEXT,
+            user_def_val_9 TEXT,
+            user_def_val_10 TEXT,
+            user_def_val_11 TEXT,
+            user_def_val_12 TEXT,
+            user_def_val_13 TEXT,
+            user_def_val_14 TEXT,
+            user_def_val_15 TEXT,
+            user_def_val_16 TEXT,
+            user_def_val_17 TEXT,
+            user_def_val_18 TEXT,
+            user_def_val_19 TEXT,
+            user_def_val_20 TEXT,
+            user_def_val_21 TEXT,
+            user_def_val_22 TEXT,
+            user_def_val_23 TEXT,
+            user_def_val_24 TEXT,
+            user_def_val_25 TEXT,
+            note TEXT
+        );
+
+        CREATE INDEX IF NOT EXISTS idx_experiments_project ON experiments(iacpj_nm);
+        CREATE INDEX IF NOT EXISTS idx_experiments_plan ON experiments(plan_id);
+        CREATE INDEX IF NOT EXISTS idx_splits_plan ON split_tables(plan_id);
+
+        -- 검색 인덱스 스냅샷 키: 검색 대상 테이블이 바뀔 때마다 change_seq 증가
+        CREATE TABLE IF NOT EXISTS search_index_state (
+            id INTEGER PRIMARY KEY CHECK (id = 1),
+            db_uid TEXT NOT NULL,
+            change_seq INTEGER NOT NULL DEFAULT 0
+        );
+        INSERT OR IGNORE INTO search_index_state (id, db_uid, change_seq)
+            VALUES (1, lower(hex(randomblob(8))), 0);
+    """)
+
+    for table in ("experiments", "projects", "split_tables"):
+        for event in ("INSERT", "UPDATE", "DELETE"):
+            conn.execute(f"""
+                CREATE TRIGGER IF NOT EXISTS trg_{table}_{event.lower()}_search_seq
+                AFTER {event} ON {table}
+                BEGIN
+                    UPDATE search_index_state SET change_seq = change_seq + 1 WHERE id = 1;
+                END
+            """)
+
+
+def _summary_text(conn: sqlite3.Connection):
+    # 예전 init_db 가 이미 추가한 DB 가 있다
+    if "summary_text" not in _columns(conn, "experiments"):
+        conn.execute("ALTER TABLE experiments ADD COLUMN summary_text TEXT")
+
+
+def _query_indexes(conn: sqlite3.Connection):
+    _run_script(conn, """
+        -- plan 별 조회와 (plan_id, oper_id) 그룹핑 (analysis) 을 함께 — plan_id 단독 인덱스를 대체
+        CREATE INDEX IF NOT EXISTS idx_splits_plan_oper ON split_tables(plan_id, oper_id);
+        DROP INDEX IF EXISTS idx_splits_plan;
+
+        -- /api/line-lots/available: status 로 찾고 estimated_arrival 순서 그대로 읽는다
+        CREATE INDEX IF NOT EXISTS idx_line_lots_status_arrival ON line_lots(status, estimated_arrival);
+        -- assign 시 lot_id 로 갱신, 전체 목록은 lot_id 순
+        CREATE INDEX IF NOT EXISTS idx_line_lots_lot ON line_lots(lot_id);
+
+        -- 검색 status 필터 (FTS 엔진의 experiments 서브쿼리)
+        CREATE INDEX IF NOT EXISTS idx_experiments_status ON experiments(status);
+    """)
+
+
+def _aggregate_counters(conn: sqlite3.Connection):
+    # 목록 화면용 집계 (counters 참고) — 트리거가 행 단위로 갱신한다
+    _run_script(conn, """
+        CREATE TABLE IF NOT EXISTS plan_split_counts (
+            plan_id TEXT PRIMARY KEY,
+            split_count INTEGER NOT NULL
+        ) WITHOUT ROWID;
+
+        -- split_count: plan 의 split 행이 2개 이상인 실험 수
+        CREATE TABLE IF NOT EXISTS project_counts (
+            iacpj_nm TEXT PRIMARY KEY,
+            experiment_count INTEGER NOT NULL DEFAULT 0,
+            split_count INTEGER NOT NULL DEFAULT 0
+        ) WITHOUT ROWID;
+    """)
+
+    # plan 의 split 행 수가 2 를 넘나들면 그 plan 을 쓰는 실험들의 프로젝트 split_count 도 바뀐다
+    def split_added(plan):
+        return f"""
+            INSERT INTO plan_split_counts (plan_id, split_count) VALUES ({plan}, 1)
+                ON CONFLICT (plan_id) DO UPDATE SET split_count = split_count + 1;
+            UPDATE project_counts
+                SET split_count = split_count + (
+                    SELECT COUNT(*) FROM experiments e
+                    WHERE e.plan_id = {plan} AND e.iacpj_nm = project_counts.iacpj_nm)
+                WHERE (SELECT split_count FROM plan_split_counts WHERE plan_id = {plan}) = 2
+                  AND iacpj_nm IN (SELECT iacpj_nm FROM experiments WHERE plan_id = {plan});
+        """
+
+    def split_removed(plan):
+        return f"""
+            UPDATE project_counts
+                SET split_count = split_count - (
+                    SELECT COUNT(*) FROM experiments e
+                    WHERE e.plan_id = {plan} AND e.iacpj_nm = project_counts.iacpj_nm)
+                WHERE (SELECT split_count FROM plan_split_counts WHERE plan_id = {plan}) = 2
+                  AND iacpj_nm IN (SELECT iacpj_nm FROM experiments WHERE plan_id = {plan});
+            UPDATE plan_split_counts SET split_count = split_count - 1 WHERE plan_id = {plan};
+            DELETE FROM plan_split_counts WHERE plan_id = {plan} AND split_count <= 0;
+        """
+
+    def experiment_added(row):
+        return f"""
+            INSERT INTO project_counts (iacpj_nm, experiment_count, split_count)
+                VALUES ({row}.iacpj_nm, 1, COALESCE(
+                    (SELECT split_count >= 2 FROM plan_split_counts WHERE plan_id = {row}.plan_id), 0))
+                ON CONFLICT (iacpj_nm) DO UPDATE SET
+                    experiment_count = experiment_count + 1,
+                    split_count = split_count + excluded.split_count;
+        """
+
+    def experiment_removed(row):
+        return f"""
+            UPDATE project_counts SET
+                experiment_count = experiment_count - 1,
+                split_count = split_count - COALESCE(
+                    (SELECT split_count >= 2 FROM plan_split_counts WHERE plan_id = {row}.plan_id), 0)
+                WHERE iacpj_nm = {row}.iacpj_nm;
+            DELETE FROM project_counts WHERE iacpj_nm = {row}.iacpj_nm AND experiment_count <= 0;
+        """
+
+    triggers = {
+        "trg_split_tables_insert_counts": ("AFTER INSERT ON split_tables", split_added("new.plan_id")),
+        "trg_split_tables_delete_counts": ("AFTER DELETE ON split_tables", split_removed("old.plan_id")),
+        "trg_split_tables_update_counts": (
+            "AFTER UPDATE OF plan_id ON split_tables WHEN old.plan_id IS NOT new.plan_id",
+            split_removed("old.plan_id") + split_added("new.plan_id"),
+        ),
+        "trg_experiments_insert_counts": ("AFTER INSERT ON experiments", experiment_added("new")),
+        "trg_experiments_delete_counts": ("AFTER DELETE ON experiments", experiment_removed("old")),
+        "trg_experiments_update_counts": (
+            "AFTER UPDATE OF iacpj_nm, plan_id ON experiments"
+            " WHEN old.iacpj_nm IS NOT new.iacpj_nm OR old.plan_id IS NOT new.plan_id",
+            experiment_removed("old") + experiment_added("new"),
+        ),
+    }
+    for name, (event, body) in triggers.items():
+        conn.execute(f"CREATE TRIGGER IF NOT EXISTS {name} {event} BEGIN {body} END")
+
+    rebuild_counters(conn)
+
+
+# (version, name, apply) — version 은 1 부터 빈틈 없이 증가
+MIGRATIONS = (
+    (1, "initial schema", _initial_schema),
+    (2, "experiments.summary_text", _summary_text),
+    (3, "query indexes", _query_indexes),
+    (4, "list aggregate counters", _aggregate_counters),
+)
+
+
+# ──────────────────────────────────────────────
+# Runner
+# ──────────────────────────────────────────────
+
+def migrate(conn: sqlite3.Connection) -> list[int]:
+    """Apply pending migrations in order; returns the versions applied by this call."""
+    latest = MIGRATIONS[-1][0]
+    saved_isolation = conn.isolation_level
+    conn.isolation_level = None  # BEGIN / COMMIT 는 직접 낸다
+    applied = []
+    try:
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS schema_version (
+                version INTEGER PRIMARY KEY,
+                name TEXT NOT NULL,
+                applied_at TEXT NOT NULL
+            )
+        """)
+        current = current_version(conn)
+        if current > latest:
+            raise RuntimeError(f"database schema v{current} is newer than this server (v{latest})")
+
+        for version, name, apply in MIGRATIONS:
+            if version <= current:
+                continue
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                # 다른 프로세스가 먼저 적용했을 수 있다 — 쓰기 잠금을 잡은 뒤 다시 확인
+                if current_version(conn) >= version:
+                    conn.execute("COMMIT")
+                    continue
+                apply(conn)
+                conn.execute(
+                    "INSERT INTO schema_version (version, name, applied_at) VALUES (?, ?, ?)",
+                    (version, name, datetime.now(timezone.utc).isoformat(timespec="seconds")),
+                )
+                conn.execute("COMMIT")
+            except BaseException:
+                if conn.in_transaction:
+                    conn.execute("ROLLBACK")
+                raise
+            applied.append(version)
+
+        # 새 인덱스에는 통계가 없다 — 적용한 마이그레이션이 있으면 전체 ANALYZE
+        analyze(conn, full=bool(applied) or not _has_stats(conn))
+    finally:
+        conn.isolation_level = saved_isolation
+    return applied
+
+
+def analyze(conn: sqlite3.Connection, full: bool = False):
+    """Refresh planner statistics: ``ANALYZE`` when ``full``, else ``PRAGMA optimize``.
+
+    Both are bounded by ``ANALYSIS_LIMIT`` rows per index.
+    """
+    conn.execute(f"PRAGMA analysis_limit = {ANALYSIS_LIMIT}")
+    conn.execute("ANALYZE" if full else "PRAGMA optimize")
+    if conn.in_transaction:
+        conn.commit()
+
+
+def current_version(conn: sqlite3.Connection) -> int:
+    try:
+        return conn.execute("SELECT COALESCE(MAX(version), 0) FROM schema_version").fetchone()[0]
+    except sqlite3.OperationalError:
+        return 0  # schema_version 이전 DB
+
+
+def status(conn: sqlite3.Connection) -> list[dict]:
+    """Every known migration with its ``appliedAt`` time (None if pending)."""
+    try:
+        applied = dict(conn.execute("SELECT version, applied_at FROM schema_version"))
+    except sqlite3.OperationalError:
+        applied = {}
+    return [
+        {"version": version, "name": name, "appliedAt": applied.get(version)}
+        for version, name, _ in MIGRATIONS
+    ]
+
+
+# ── helpers ──
+def _run_script(conn: sqlite3.Connection, script: str):
+    """Execute ``;``-separated statements one by one (``executescript`` would commit)."""
+    statement = ""
+    for line in script.splitlines(keepends=True):
+        statement += line
+        if sqlite3.complete_statement(statement):
+            conn.execute(statement)
+            statement = ""
+    if statement.strip():
+        raise ValueError(f"incomplete SQL statement: {statement.strip()[:80]}")
+
+
+def _columns(conn: sqlite3.Connection, table: str) -> list[str]:
+    return [row[1] for row in conn.execute(f"PRAGMA table_info({table})")]
+
+
+def _has_stats(conn: sqlite3.Connection) -> bool:
+    return conn.execute("SELECT 1 FROM sqlite_master WHERE name = 'sqlite_stat1'").fetchone() is not None
+
+
+def main(argv=None) -> int:
+    from . import database
+
+    parser = argparse.ArgumentParser(prog="python -m server_py.migrations", description="Apply schema migrations")
+    parser.add_argument("--db", default=database.DB_PATH, help=f"database file (default: {database.DB_PATH})")
+    parser.add_argument("--status", action="store_true", help="only list applied / pending migrations")
+    args = parser.parse_args(argv)
+
+    conn = database._connect(args.db)
+    try:
+        if not args.status:
+            applied = migrate(conn)
+            print(f"applied {applied}" if applied else "schema is up to date", file=sys.stderr)
+        for m in status(conn):
+            print(f"{m['version']:>4}  {m['appliedAt'] or 'pending':<25}  {m['name']}")
+    finally:
+        conn.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -31,16 +31,15 @@ def analysis(conn: sqlite3.Connection = Depends(get_db)):
     # 1. Split Table 작성 불량 (0~1 row)
     split_poor = dict_rows(conn.execute("""
         SELECT e.iacpj_nm, e.plan_id, e.eval_item, e.eval_process, e.lot_code,
-               COALESCE(s.cnt, 0) AS split_row_count
+               COALESCE(s.split_count, 0) AS split_row_count
         FROM experiments e
-        LEFT JOIN (
-          SELECT plan_id, COUNT(*) AS cnt FROM split_tables GROUP BY plan_id
-        ) s ON e.plan_id = s.plan_id
-        WHERE COALESCE(s.cnt, 0) <= 1
+        LEFT JOIN plan_split_counts s ON e.plan_id = s.plan_id
+        WHERE COALESCE(s.split_count, 0) <= 1
         ORDER BY e.iacpj_nm, e.plan_id
     """).fetchall())
 
     # 2. 평가아이템 중복
+    # full-scan: experiments — 전체 실험 점검
     all_exp = dict_rows(conn.execute("""
         SELECT plan_id, iacpj_nm, eval_item, eval_process, lot_code
         FROM experiments
@@ -67,6 +66,7 @@ def analysis(conn: sqlite3.Connection = Depends(get_db)):
     dup_eval_item.sort(key=lambda x: x["iacpj_nm"])
 
     # 3. Note 누락
+    # full-scan: experiments — 전체 실험 점검 (split 은 plan_id 인덱스로)
     note_missing = dict_rows(conn.execute("""
         SELECT st.plan_id, st.oper_id,
                MAX(st.oper_nm) AS oper_nm,
@@ -81,6 +81,7 @@ def analysis(conn: sqlite3.Connection = Depends(get_db)):
     """).fetchall())
 
     # 4. 조건 누락
+    # full-scan: experiments — 전체 실험 점검 (split 은 plan_id 인덱스로)
     cond_missing = dict_rows(conn.execute("""
         SELECT st.plan_id, st.oper_id,
                MAX(st.oper_nm) AS oper_nm,
@@ -117,22 +118,20 @@ def analysis(conn: sqlite3.Connection = Depends(get_db)):
     """).fetchall())
 
     # Summary
+    # full-scan: plan_split_counts — 전체 요약 (split 행이 아닌 plan 단위)
     summary = dict(conn.execute("""
         SELECT
           (SELECT COUNT(*) FROM projects) AS total_projects,
           (SELECT COUNT(*) FROM experiments) AS total_experiments,
-          (SELECT COUNT(DISTINCT plan_id) FROM (
-            SELECT plan_id FROM split_tables GROUP BY plan_id HAVING COUNT(*) >= 2
-          )) AS experiments_with_split,
+          (SELECT COUNT(*) FROM plan_split_counts WHERE split_count >= 2) AS experiments_with_split,
           (SELECT COUNT(*) FROM split_tables) AS total_split_rows
     """).fetchone())
 
     # Project summary
     all_projects = dict_rows(conn.execute("""
-        SELECT p.iacpj_nm, COALESCE(e.cnt, 0) AS experiment_count
+        SELECT p.iacpj_nm, COALESCE(c.experiment_count, 0) AS experiment_count
         FROM projects p
-        LEFT JOIN (SELECT iacpj_nm, COUNT(*) AS cnt FROM experiments GROUP BY iacpj_nm) e
-          ON p.iacpj_nm = e.iacpj_nm
+        LEFT JOIN project_counts c ON p.iacpj_nm = c.iacpj_nm
         ORDER BY p.iacpj_nm
     """).fetchall())
 
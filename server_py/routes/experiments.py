@@ -3,20 +3,21 @@
 """
 import sqlite3
 from fastapi import APIRouter, Depends, HTTPException, Query
-from ..database import get_db, dict_row, dict_rows
+from ..database import get_db, dict_row, dict_rows, run_write
 
 router = APIRouter(prefix="/api/experiments", tags=["experiments"])
 
 # Will be set from main.py after search router is created
-_invalidate_index = None
+_refresh_index = None
 
-def set_invalidate_index(fn):
-    global _invalidate_index
-    _invalidate_index = fn
+def set_refresh_index(fn):
+    global _refresh_index
+    _refresh_index = fn
 
-def _invalidate():
-    if _invalidate_index:
-        _invalidate_index()
+def _refresh(conn, **changed):
+    # 쓰기 커밋 뒤, 500 을 돌려주는 try 밖에서 부른다 — 실패하면 refresh 가 로그를 남기고 재빌드한다
+    if _refresh_index:
+        _refresh_index(conn, **changed)
 
 SPLIT_COLS = [
     "sno", "plan_id", "fac_id", "oper_id", "oper_nm", "eps_lot_gbn_cd", "work_cond_desc",
@@ -31,18 +32,16 @@ def list_experiments(
     iacpj_nm: str | None = Query(None),
     conn: sqlite3.Connection = Depends(get_db),
 ):
+    # split 수는 트리거가 갱신하는 plan_split_counts 에서 (counters)
     base = """
         SELECT e.*, COALESCE(s.split_count, 0) AS split_count
         FROM experiments e
-        LEFT JOIN (
-          SELECT plan_id, COUNT(*) AS split_count
-          FROM split_tables
-          GROUP BY plan_id
-        ) s ON e.plan_id = s.plan_id
+        LEFT JOIN plan_split_counts s ON e.plan_id = s.plan_id
     """
     if iacpj_nm:
         rows = conn.execute(base + " WHERE e.iacpj_nm = ?", (iacpj_nm,)).fetchall()
     else:
+        # full-scan: experiments — 전체 목록
         rows = conn.execute(base).fetchall()
     return dict_rows(rows)
 
@@ -70,16 +69,16 @@ def create_experiment(body: dict, conn: sqlite3.Connection = Depends(get_db)):
     col_names = ", ".join(cols)
     placeholders = ", ".join(f":{c}" for c in cols)
 
-    try:
-        cursor = conn.execute(
+    def insert(wconn):
+        return wconn.execute(
             f"INSERT INTO experiments ({col_names}) VALUES ({placeholders})", params
-        )
-        conn.commit()
+        ).lastrowid
+
+    try:
+        exp_id = run_write(insert)
         created = conn.execute(
-            "SELECT * FROM experiments WHERE id = ?", (cursor.lastrowid,)
+            "SELECT * FROM experiments WHERE id = ?", (exp_id,)
         ).fetchone()
-        _invalidate()
-        return dict_row(created)
     except sqlite3.IntegrityError as e:
         if "FOREIGN KEY" in str(e):
             raise HTTPException(
@@ -87,6 +86,8 @@ def create_experiment(body: dict, conn: sqlite3.Connection = Depends(get_db)):
                 detail=f"과제 '{iacpj_nm}'이(가) 존재하지 않습니다. 과제를 먼저 등록해주세요.",
             )
         raise HTTPException(status_code=500, detail=f"실험 생성 중 오류 발생: {e}")
+    _refresh(conn, exp_ids=[exp_id])
+    return dict_row(created)
 
 
 @router.post("/{plan_id}/splits", status_code=201)
@@ -98,20 +99,23 @@ def create_splits(plan_id: str, body: dict, conn: sqlite3.Connection = Depends(g
     col_names = ", ".join(SPLIT_COLS)
     placeholders = ", ".join(f":{c}" for c in SPLIT_COLS)
 
-    try:
+    def insert(wconn):
         count = 0
         for row in splits:
             params = {c: row.get(c) or None for c in SPLIT_COLS}
             params["plan_id"] = plan_id
-            conn.execute(
+            wconn.execute(
                 f"INSERT INTO split_tables ({col_names}) VALUES ({placeholders})", params
             )
             count += 1
-        conn.commit()
-        return {"message": f"{count}건의 스플릿이 저장되었습니다.", "count": count}
+        return count
+
+    try:
+        count = run_write(insert)
     except Exception as e:
-        conn.rollback()
         raise HTTPException(status_code=500, detail=f"스플릿 저장 중 오류 발생: {e}")
+    _refresh(conn, plan_ids=[plan_id])
+    return {"message": f"{count}건의 스플릿이 저장되었습니다.", "count": count}
 
 
 @router.patch("/{exp_id}/assign-lot")
@@ -120,37 +124,38 @@ def assign_lot(exp_id: int, body: dict, conn: sqlite3.Connection = Depends(get_d
     if not lot_id:
         raise HTTPException(status_code=400, detail="lot_id는 필수입니다.")
 
-    try:
-        new_plan_id = lot_id
-        temp_plan_id = f"EXP-{exp_id}"
+    new_plan_id = lot_id
+    temp_plan_id = f"EXP-{exp_id}"
 
-        result = conn.execute(
+    def assign(wconn):
+        result = wconn.execute(
             "UPDATE experiments SET plan_id = ?, status = '실험 진행 중' WHERE id = ?",
             (new_plan_id, exp_id),
         )
         if result.rowcount == 0:
             raise HTTPException(status_code=404, detail="실험을 찾을 수 없습니다.")
 
-        conn.execute(
+        wconn.execute(
             "UPDATE split_tables SET plan_id = ? WHERE plan_id = ?",
             (new_plan_id, temp_plan_id),
         )
-        conn.execute(
+        wconn.execute(
             "UPDATE line_lots SET status = 'assigned' WHERE lot_id = ?",
             (new_plan_id,),
         )
-        conn.commit()
+
+    try:
+        run_write(assign)
 
         updated = conn.execute(
             "SELECT * FROM experiments WHERE id = ?", (exp_id,)
         ).fetchone()
-        _invalidate()
-        return dict_row(updated)
     except HTTPException:
         raise
     except Exception as e:
-        conn.rollback()
         raise HTTPException(status_code=500, detail="Lot 배정 중 오류 발생")
+    _refresh(conn, exp_ids=[exp_id], plan_ids=[new_plan_id, temp_plan_id])
+    return dict_row(updated)
 
 
 @router.patch("/{exp_id}/status")
@@ -160,12 +165,14 @@ def update_status(exp_id: int, body: dict, conn: sqlite3.Connection = Depends(ge
     if status not in valid:
         raise HTTPException(status_code=400, detail="유효하지 않은 상태입니다.")
 
-    result = conn.execute(
-        "UPDATE experiments SET status = ? WHERE id = ?", (status, exp_id)
-    )
-    conn.commit()
-    if result.rowcount == 0:
+    def update(wconn):
+        return wconn.execute(
+            "UPDATE experiments SET status = ? WHERE id = ?", (status, exp_id)
+        ).rowcount
+
+    if run_write(update) == 0:
         raise HTTPException(status_code=404, detail="실험을 찾을 수 없습니다.")
+    _refresh(conn, exp_ids=[exp_id])
     return {"message": "상태가 변경되었습니다.", "status": status}
 
 
@@ -177,23 +184,26 @@ def toggle_complete(exp_id: int, body: dict, conn: sqlite3.Connection = Depends(
         raise HTTPException(status_code=400, detail="유효하지 않은 필드입니다.")
 
     int_val = 1 if value else 0
-    result = conn.execute(
-        f"UPDATE experiments SET {field} = ? WHERE id = ?", (int_val, exp_id)
-    )
-    if result.rowcount == 0:
-        raise HTTPException(status_code=404, detail="실험을 찾을 수 없습니다.")
 
-    # Fab이 In Fab이 아닐 때 Status 자동 재계산
-    experiment = conn.execute(
-        "SELECT * FROM experiments WHERE id = ?", (exp_id,)
-    ).fetchone()
-    if experiment and experiment["fab_status"] and experiment["fab_status"] != "In Fab":
-        split_done = int_val if field == "split_completed" else experiment["split_completed"]
-        summary_done = int_val if field == "summary_completed" else experiment["summary_completed"]
-        new_status = "실험 종료(결과 완료)" if split_done and summary_done else "실험 종료(결과 등록 전)"
-        conn.execute("UPDATE experiments SET status = ? WHERE id = ?", (new_status, exp_id))
+    def update(wconn):
+        result = wconn.execute(
+            f"UPDATE experiments SET {field} = ? WHERE id = ?", (int_val, exp_id)
+        )
+        if result.rowcount == 0:
+            raise HTTPException(status_code=404, detail="실험을 찾을 수 없습니다.")
 
-    conn.commit()
+        # Fab이 In Fab이 아닐 때 Status 자동 재계산
+        experiment = wconn.execute(
+            "SELECT * FROM experiments WHERE id = ?", (exp_id,)
+        ).fetchone()
+        if experiment and experiment["fab_status"] and experiment["fab_status"] != "In Fab":
+            split_done = int_val if field == "split_completed" else experiment["split_completed"]
+            summary_done = int_val if field == "summary_completed" else experiment["summary_completed"]
+            new_status = "실험 종료(결과 완료)" if split_done and summary_done else "실험 종료(결과 등록 전)"
+            wconn.execute("UPDATE experiments SET status = ? WHERE id = ?", (new_status, exp_id))
+
+    run_write(update)
+    _refresh(conn, exp_ids=[exp_id])
     return {"message": "업데이트 완료", field: int_val}
 
 
@@ -201,24 +211,26 @@ def toggle_complete(exp_id: int, body: dict, conn: sqlite3.Connection = Depends(
 def save_summary(exp_id: int, body: dict, conn: sqlite3.Connection = Depends(get_db)):
     summary_text = body.get("summary_text")
 
-    result = conn.execute(
-        "UPDATE experiments SET summary_text = ?, summary_completed = 1 WHERE id = ?",
-        (summary_text, exp_id),
-    )
-    if result.rowcount == 0:
-        raise HTTPException(status_code=404, detail="실험을 찾을 수 없습니다.")
-
-    experiment = conn.execute(
-        "SELECT * FROM experiments WHERE id = ?", (exp_id,)
-    ).fetchone()
-    if experiment and experiment["fab_status"] and experiment["fab_status"] != "In Fab":
-        new_status = (
-            "실험 종료(결과 완료)" if experiment["split_completed"]
-            else "실험 종료(결과 등록 전)"
+    def update(wconn):
+        result = wconn.execute(
+            "UPDATE experiments SET summary_text = ?, summary_completed = 1 WHERE id = ?",
+            (summary_text, exp_id),
         )
-        conn.execute("UPDATE experiments SET status = ? WHERE id = ?", (new_status, exp_id))
+        if result.rowcount == 0:
+            raise HTTPException(status_code=404, detail="실험을 찾을 수 없습니다.")
+
+        experiment = wconn.execute(
+            "SELECT * FROM experiments WHERE id = ?", (exp_id,)
+        ).fetchone()
+        if experiment and experiment["fab_status"] and experiment["fab_status"] != "In Fab":
+            new_status = (
+                "실험 종료(결과 완료)" if experiment["split_completed"]
+                else "실험 종료(결과 등록 전)"
+            )
+            wconn.execute("UPDATE experiments SET status = ? WHERE id = ?", (new_status, exp_id))
 
-    conn.commit()
+    run_write(update)
+    _refresh(conn, exp_ids=[exp_id])
     return {"message": "Summary 저장 완료", "summary_completed": 1}
 
 
@@ -229,25 +241,29 @@ def update_fab_status(exp_id: int, body: dict, conn: sqlite3.Connection = Depend
     if fab_status and fab_status not in valid_fab:
         raise HTTPException(status_code=400, detail="유효하지 않은 Fab 상태입니다.")
 
-    experiment = conn.execute(
-        "SELECT * FROM experiments WHERE id = ?", (exp_id,)
-    ).fetchone()
-    if not experiment:
-        raise HTTPException(status_code=404, detail="실험을 찾을 수 없습니다.")
+    def update(wconn):
+        experiment = wconn.execute(
+            "SELECT * FROM experiments WHERE id = ?", (exp_id,)
+        ).fetchone()
+        if not experiment:
+            raise HTTPException(status_code=404, detail="실험을 찾을 수 없습니다.")
 
-    if fab_status == "In Fab":
-        new_status = "실험 진행 중"
-    else:
-        if experiment["split_completed"] and experiment["summary_completed"]:
-            new_status = "실험 종료(결과 완료)"
+        if fab_status == "In Fab":
+            new_status = "실험 진행 중"
         else:
-            new_status = "실험 종료(결과 등록 전)"
+            if experiment["split_completed"] and experiment["summary_completed"]:
+                new_status = "실험 종료(결과 완료)"
+            else:
+                new_status = "실험 종료(결과 등록 전)"
+
+        wconn.execute(
+            "UPDATE experiments SET fab_status = ?, status = ? WHERE id = ?",
+            (fab_status, new_status, exp_id),
+        )
+        return new_status
 
-    conn.execute(
-        "UPDATE experiments SET fab_status = ?, status = ? WHERE id = ?",
-        (fab_status, new_status, exp_id),
-    )
-    conn.commit()
+    new_status = run_write(update)
+    _refresh(conn, exp_ids=[exp_id])
     return {"message": "Fab 상태가 변경되었습니다.", "fab_status": fab_status, "status": new_status}
 
 
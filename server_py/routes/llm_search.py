@@ -4,16 +4,13 @@
 import re
 import json
 import os
-import sqlite3
 from fastapi import APIRouter, Depends, HTTPException
-from ..database import get_db, dict_row, dict_rows
-from ..search_engine import TfIdfSearchEngine
+from ..database import AsyncDatabase, get_async_db
+from ..search_corpus import load_enrichment
+from ..search_index import index
 
 router = APIRouter(prefix="/api/llm-search", tags=["llm-search"])
 
-engine = TfIdfSearchEngine()
-_indexed = False
-
 CONFIG_PATH = os.path.join(os.path.dirname(__file__), "..", "llm-config.json")
 
 def _load_config():
@@ -42,35 +39,6 @@ def _get_config():
         }
     return None
 
-def invalidate_index():
-    global _indexed
-    _indexed = False
-
-def _ensure_index(conn):
-    global _indexed
-    rows = conn.execute("""
-        SELECT e.*,
-          p.project_purpose, p.iacpj_ta_goa, p.iacpj_cur_stt,
-          p.iacpj_tech_n, p.iacpj_mod_n as project_module,
-          p.iacpj_tgt_n, p.iacpj_level,
-          p.ia_tgt_htr_n, p.iacpj_nud_n,
-          p.iacpj_itf_uno, p.iacpj_bgn_dy, p.iacpj_ch_n, p.ia_ta_grd_n,
-          p.iacpj_core_tec, p.ia_ch_or_n
-        FROM experiments e
-        LEFT JOIN projects p ON e.iacpj_nm = p.iacpj_nm
-    """).fetchall()
-    docs = []
-    for exp in rows:
-        d = dict(exp)
-        splits = conn.execute(
-            "SELECT fac_id,oper_id,oper_nm,eps_lot_gbn_cd,work_cond_desc,eqp_id,recipe_id,note FROM split_tables WHERE plan_id=?",
-            (d.get("plan_id"),),
-        ).fetchall()
-        d["_splits"] = [dict(s) for s in splits]
-        docs.append(d)
-    engine.build_index(docs)
-    _indexed = True
-
 def _exp_to_context(result, idx, total):
     exp = result["experiment"]
     proj = result.get("project")
@@ -190,49 +158,45 @@ async def test_config(body: dict):
         return {"success":False,"error":str(e)}
 
 # ── Main search ──
+def _load_candidates(conn, query, candidate_ids):
+    """Index lookup + enrichment — blocking, runs on the DB executor."""
+    with index.reader() as engine:
+        qt, nq = _parse_query(query)
+        candidates = []
+
+        if candidate_ids and len(candidate_ids) > 0:
+            id_set = set(candidate_ids)
+            all_r = engine.search(query, engine.doc_count)
+            filtered = [r for r in all_r if r["document"].get("id") in id_set]
+            if filtered:
+                candidates = filtered[:15]
+            else:
+                candidates = [{"score":0.5,"document":d} for d in engine.documents_by_id(id_set)]
+        elif qt:
+            candidates = engine.phrase_search(qt, nq, 15)
+        else:
+            pr = engine.search(query, 15)
+            tokens = engine.tokenize(query)
+            af = [r for r in pr if all(engine.doc_contains(r["document"], t) for t in tokens)]
+            candidates = af if af else pr
+
+    projects, splits = load_enrichment(conn, [r["document"] for r in candidates])
+    enriched = []
+    for r in candidates:
+        doc = r["document"]
+        enriched.append({"score":round(r["score"]*1000)/1000,"experiment":doc,"project":projects.get(doc.get("iacpj_nm")),"splits":splits.get(doc.get("plan_id"), [])})
+    return enriched
+
 @router.post("/")
-async def llm_search(body: dict, conn: sqlite3.Connection = Depends(get_db)):
+async def llm_search(body: dict, db: AsyncDatabase = Depends(get_async_db)):
     query = body.get("query")
     history = body.get("conversationHistory", [])
     candidate_ids = body.get("candidateIds")
     if not query:
         raise HTTPException(400,"query is required")
 
-    global _indexed
-    if not _indexed:
-        _ensure_index(conn)
-
-    qt, nq = _parse_query(query)
-    candidates = []
-
-    if candidate_ids and len(candidate_ids) > 0:
-        id_set = set(candidate_ids)
-        all_r = engine.search(query, len(engine.documents))
-        filtered = [r for r in all_r if r["document"].get("id") in id_set]
-        if filtered:
-            candidates = filtered[:15]
-        else:
-            candidates = [{"score":0.5,"document":d} for d in engine.documents if d.get("id") in id_set]
-    elif qt:
-        exact = [d for d in engine.documents if all(p.lower() in engine._doc_to_text(d).lower() for p in qt)]
-        if nq:
-            tr = engine.search(nq, len(engine.documents))
-            sm = {r["document"].get("id"):r["score"] for r in tr}
-            candidates = sorted([{"score":sm.get(d.get("id"),0),"document":d} for d in exact], key=lambda x:x["score"], reverse=True)[:15]
-        else:
-            candidates = [{"score":1,"document":d} for d in exact[:15]]
-    else:
-        pr = engine.search(query, 15)
-        tokens = engine.tokenize(query)
-        af = [r for r in pr if all(t in engine._doc_to_text(r["document"]).lower() for t in tokens)]
-        candidates = af if af else pr
-
-    enriched = []
-    for r in candidates:
-        doc = r["document"]
-        splits = conn.execute("SELECT * FROM split_tables WHERE plan_id=?", (doc.get("plan_id"),)).fetchall()
-        proj = conn.execute("SELECT * FROM projects WHERE iacpj_nm=?", (doc.get("iacpj_nm"),)).fetchone()
-        enriched.append({"score":round(r["score"]*1000)/1000,"experiment":doc,"project":dict_row(proj),"splits":dict_rows(splits)})
+    # 첫 인덱스 빌드 대기와 DB 조회는 executor 에서 — 연결은 LLM 호출 동안 잡고 있지 않는다
+    enriched = await db.read(_load_candidates, query, candidate_ids)
 
     config = _get_config()
     if not config:
@@ -4,10 +4,17 @@
 import sqlite3
 from fastapi import APIRouter, Depends, HTTPException
 from fastapi.responses import JSONResponse
-from ..database import get_db, dict_row, dict_rows
+from ..database import get_db, dict_row, dict_rows, run_write
 
 router = APIRouter(prefix="/api/projects", tags=["projects"])
 
+# Will be set from main.py
+_refresh_index = None
+
+def set_refresh_index(fn):
+    global _refresh_index
+    _refresh_index = fn
+
 PROJECT_COLS = [
     "iacpj_nm", "iacpj_tgt_n", "iacpj_level", "iacpj_tech_n",
     "ia_tgt_htr_n", "iacpj_nud_n", "iacpj_mod_n", "iacpj_itf_uno", "iacpj_bgn_dy",
@@ -19,27 +26,14 @@ PROJECT_COLS = [
 
 @router.get("/")
 def list_projects(conn: sqlite3.Connection = Depends(get_db)):
+    # 실험 수 / split 2행 이상 실험 수는 트리거가 갱신하는 project_counts 에서 (counters)
+    # full-scan: projects — 전체 목록
     rows = conn.execute("""
         SELECT p.*,
-          COALESCE(e.experiment_count, 0) AS experiment_count,
-          COALESCE(s.split_count, 0) AS split_count
+          COALESCE(c.experiment_count, 0) AS experiment_count,
+          COALESCE(c.split_count, 0) AS split_count
         FROM projects p
-        LEFT JOIN (
-          SELECT iacpj_nm, COUNT(*) AS experiment_count
-          FROM experiments
-          GROUP BY iacpj_nm
-        ) e ON p.iacpj_nm = e.iacpj_nm
-        LEFT JOIN (
-          SELECT ex.iacpj_nm, COUNT(*) AS split_count
-          FROM (
-            SELECT st.plan_id
-            FROM split_tables st
-            GROUP BY st.plan_id
-            HAVING COUNT(*) >= 2
-          ) valid_splits
-          JOIN experiments ex ON valid_splits.plan_id = ex.plan_id
-          GROUP BY ex.iacpj_nm
-        ) s ON p.iacpj_nm = s.iacpj_nm
+        LEFT JOIN project_counts c ON p.iacpj_nm = c.iacpj_nm
     """).fetchall()
     return dict_rows(rows)
 
@@ -69,13 +63,15 @@ def create_project(body: dict, conn: sqlite3.Connection = Depends(get_db)):
     placeholders = ", ".join(f":{col}" for col in PROJECT_COLS)
     col_names = ", ".join(PROJECT_COLS)
 
-    try:
-        cursor = conn.execute(
+    def insert(wconn):
+        return wconn.execute(
             f"INSERT INTO projects ({col_names}) VALUES ({placeholders})", params
-        )
-        conn.commit()
+        ).lastrowid
+
+    try:
+        project_id = run_write(insert)
         created = conn.execute(
-            "SELECT * FROM projects WHERE id = ?", (cursor.lastrowid,)
+            "SELECT * FROM projects WHERE id = ?", (project_id,)
         ).fetchone()
         return dict_row(created)
     except sqlite3.IntegrityError as e:
@@ -90,25 +86,29 @@ def delete_project(project_id: int, conn: sqlite3.Connection = Depends(get_db)):
     if not project:
         raise HTTPException(status_code=404, detail="Project not found")
 
-    try:
-        experiments = conn.execute(
-            "SELECT plan_id FROM experiments WHERE iacpj_nm = ?", (project["iacpj_nm"],)
+    def delete(wconn):
+        experiments = wconn.execute(
+            "SELECT id, plan_id FROM experiments WHERE iacpj_nm = ?", (project["iacpj_nm"],)
         ).fetchall()
         for exp in experiments:
-            conn.execute("DELETE FROM split_tables WHERE plan_id = ?", (exp["plan_id"],))
-        exp_result = conn.execute(
+            wconn.execute("DELETE FROM split_tables WHERE plan_id = ?", (exp["plan_id"],))
+        exp_result = wconn.execute(
             "DELETE FROM experiments WHERE iacpj_nm = ?", (project["iacpj_nm"],)
         )
-        conn.execute("DELETE FROM projects WHERE id = ?", (project_id,))
-        conn.commit()
-        return {
-            "message": "과제 삭제 완료",
-            "deleted": {
-                "project": project["iacpj_nm"],
-                "experiments": exp_result.rowcount,
-                "splits": len(experiments),
-            },
-        }
+        wconn.execute("DELETE FROM projects WHERE id = ?", (project_id,))
+        return experiments, exp_result.rowcount
+
+    try:
+        experiments, deleted_count = run_write(delete)
     except Exception as e:
-        conn.rollback()
         raise HTTPException(status_code=500, detail="과제 삭제 중 오류 발생")
+    if _refresh_index:
+        _refresh_index(conn, removed_ids=[exp["id"] for exp in experiments])
+    return {
+        "message": "과제 삭제 완료",
+        "deleted": {
+            "project": project["iacpj_nm"],
+            "experiments": deleted_count,
+            "splits": len(experiments),
+        },
+    }
@@ -2,79 +2,176 @@
 /api/search — exact port of server/routes/search.js
 TF-IDF search with suggestions and summary generation.
 """
+import base64
+import binascii
+import json
 import re
 import sqlite3
+import threading
+import time
+from array import array
+from collections import OrderedDict
 from fastapi import APIRouter, Depends, HTTPException
-from ..database import get_db, dict_row, dict_rows
-from ..search_engine import TfIdfSearchEngine
+from ..database import get_db
+from ..search_corpus import load_enrichment
+from ..search_engine import FIELD_GROUPS, FILTER_FIELDS, RANGE_FILTER_FIELDS
+from ..search_index import index
 
 router = APIRouter(prefix="/api/search", tags=["search"])
 
-engine = TfIdfSearchEngine()
-_indexed = False
 
+# ── Result cache ──
+
+class _ResultCache:
+    """LRU + TTL cache of search rankings, capped by entry count and approximate size.
+
+    Keys carry the index generation, so any indexed write makes older entries
+    unreachable; they age out through LRU eviction or the TTL. Entries hold
+    only what the index determines (ids, scores, facets) — project and split
+    rows are loaded per request, so writes that do not touch the index
+    (e.g. a new project) never show stale rows.
+    """
+
+    def __init__(self, max_entries: int = 256, max_bytes: int = 32 * 1024 * 1024, ttl: float = 300.0):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self._entries: OrderedDict[tuple, tuple[float, int, dict]] = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def get(self, key: tuple):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] < time.monotonic():
+                self._discard(key)
+                self.expirations += 1
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[2]
+
+    def put(self, key: tuple, value, size: int):
+        """Store ``value``; ``size`` is its approximate footprint in bytes (see _pack_ranking)."""
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            if key in self._entries:
+                self._discard(key)
+            self._entries[key] = (time.monotonic() + self.ttl, size, value)
+            self._bytes += size
+            while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+                self._discard(next(iter(self._entries)))
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "maxEntries": self.max_entries,
+                "maxBytes": self.max_bytes,
+                "ttlSeconds": self.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+            }
+
+    def _discard(self, key: tuple):
+        # caller holds self._lock
+        _, size, _ = self._entries.pop(key)
+        self._bytes -= size
+
+
+# top-k 요청의 랭킹 — 문서는 색인에서, 과제 / split 행은 요청마다 DB 에서 읽는다
+_cache = _ResultCache()
+
+# 페이지 요청용 전체 랭킹 — 문서는 요청한 페이지만 색인에서 읽는다
+_rankings = _ResultCache(max_entries=64, max_bytes=16 * 1024 * 1024)
+
+
+def _pack_ranking(hits: list[dict], facets: dict) -> tuple[tuple, int]:
+    """Cache entry for ranked ``hits`` — experiment id and score arrays, facets as JSON bytes — and its size."""
+    ids = array("q", (r["document"]["id"] for r in hits))
+    scores = array("d", (r["score"] for r in hits))
+    # 패싯은 직렬화한 바이트로 담아 크기를 그대로 센다
+    facets_json = json.dumps(facets, ensure_ascii=False).encode()
+    return (ids, scores, facets_json), (ids.itemsize + scores.itemsize) * len(ids) + len(facets_json)
 
-def invalidate_index():
-    global _indexed
-    _indexed = False
 
+# ── Suggestion extraction ──
 
-def _ensure_index(conn: sqlite3.Connection):
-    global _indexed
-    experiments = conn.execute("""
-        SELECT e.*,
-          p.project_purpose, p.iacpj_ta_goa, p.iacpj_cur_stt,
-          p.iacpj_tech_n, p.iacpj_mod_n as project_module,
-          p.iacpj_tgt_n, p.iacpj_level,
-          p.ia_tgt_htr_n, p.iacpj_nud_n,
-          p.iacpj_itf_uno, p.iacpj_bgn_dy, p.iacpj_ch_n, p.ia_ta_grd_n,
-          p.iacpj_core_tec, p.ia_ch_or_n
-        FROM experiments e
-        LEFT JOIN projects p ON e.iacpj_nm = p.iacpj_nm
-    """).fetchall()
-
-    docs = []
-    for exp in experiments:
-        d = dict(exp)
-        splits = conn.execute(
-            "SELECT fac_id, oper_id, oper_nm, eps_lot_gbn_cd, work_cond_desc, eqp_id, recipe_id, note "
-            "FROM split_tables WHERE plan_id = ?",
-            (d.get("plan_id"),),
-        ).fetchall()
-        d["_splits"] = [dict(s) for s in splits]
-        docs.append(d)
+GRAMMAR_STOPS = frozenset({
+    "향", "및", "위한", "통해", "기반", "위해", "후", "시", "내",
+    "의", "을", "를", "이", "가", "에", "는", "은", "로", "으로",
+    "과", "와", "도", "에서", "까지", "부터", "대한", "된", "한", "할",
+    "x", "o",
+})
 
-    engine.build_index(docs)
-    _indexed = True
+# (index generation, stop words) — df_map 전체 스캔은 인덱스가 바뀔 때만
+_stop_words_cache: tuple[int, frozenset] | None = None
 
 
-# ── Suggestion extraction ──
+def _stop_words(engine) -> frozenset:
+    """Grammar stops plus tokens in ≥40% of documents, computed once per index generation."""
+    global _stop_words_cache
+    generation = index.generation
+    cached = _stop_words_cache
+    if cached is not None and cached[0] == generation:
+        return cached[1]
 
-def _extract_suggestions(results: list[dict], original_query: str) -> list[dict]:
+    stop_words = set(GRAMMAR_STOPS)
+    df_map = engine.df_map
+    doc_count = engine.doc_count
+    if df_map and doc_count > 0:
+        threshold = doc_count * 0.4
+        stop_words.update(token for token, df in df_map.items() if df >= threshold)
+    _stop_words_cache = (generation, frozenset(stop_words))
+    return _stop_words_cache[1]
+
+
+def _keyword_hits(engine, docs: list[dict], keywords) -> dict[str, int]:
+    """Number of ``docs`` whose text contains each keyword, from their token sets.
+
+    Keywords are single tokens, so a keyword occurs in a text exactly when it
+    is a substring of one of the text's tokens — a result-local table of
+    token → docs answers every keyword without rescanning the texts.
+    """
+    token_docs: dict[str, set[int]] = {}
+    for i, doc in enumerate(docs):
+        for token in engine.doc_tokens(doc):
+            token_docs.setdefault(token, set()).add(i)
+
+    hit_docs: dict[str, set[int]] = {k: set() for k in keywords}
+    for token, doc_ids in token_docs.items():
+        for start in range(len(token)):
+            for end in range(start + 2, len(token) + 1):
+                found = hit_docs.get(token[start:end])
+                if found is not None:
+                    found |= doc_ids
+    return {k: len(found) for k, found in hit_docs.items()}
+
+
+def _extract_suggestions(engine, results: list[dict], original_query: str) -> list[dict]:
     if not results:
         return []
 
     N = len(results)
     query_tokens = set(engine.tokenize(original_query))
-
-    GRAMMAR_STOPS = {
-        "향", "및", "위한", "통해", "기반", "위해", "후", "시", "내",
-        "의", "을", "를", "이", "가", "에", "는", "은", "로", "으로",
-        "과", "와", "도", "에서", "까지", "부터", "대한", "된", "한", "할",
-        "x", "o",
-    }
-    stop_words = set(GRAMMAR_STOPS)
-    if engine.df_map and engine.doc_count > 0:
-        threshold = engine.doc_count * 0.4
-        for token, df in engine.df_map.items():
-            if df >= threshold:
-                stop_words.add(token)
-
-    # Pre-compute full doc texts
-    full_doc_texts = []
-    for r in results:
-        exp = r.get("experiment") or r.get("document")
-        full_doc_texts.append(engine._doc_to_text(exp).lower())
+    stop_words = _stop_words(engine)
 
     # Keyword map
     keyword_map: dict[str, dict] = {}
@@ -134,9 +231,10 @@ def _extract_suggestions(results: list[dict], original_query: str) -> list[dict]
                 keyword_map[token]["fields"].add(field)
 
     # Validate & score
+    hits = _keyword_hits(engine, [r.get("experiment") or r.get("document") for r in results], keyword_map)
     candidates = []
     for token, info in keyword_map.items():
-        actual_hit = sum(1 for text in full_doc_texts if token in text)
+        actual_hit = hits[token]
         if actual_hit >= N:
             continue
         if actual_hit == 0:
@@ -223,74 +321,290 @@ def _parse_query(raw_query: str):
     return quoted_terms, normal_query
 
 
-@router.post("/")
-def search(body: dict, conn: sqlite3.Connection = Depends(get_db)):
-    query = body.get("query")
-    top_k = body.get("topK", 10)
-    if not query:
-        raise HTTPException(status_code=400, detail="query is required")
-
-    global _indexed
-    if not _indexed:
-        _ensure_index(conn)
-
+def _find_candidates(
+    engine, query: str, top_k: int, boosts: dict | None = None, filters: dict | None = None,
+) -> list[dict]:
     quoted_terms, normal_query = _parse_query(query)
 
     if quoted_terms:
-        exact_matched = [
-            doc for doc in engine.documents
-            if all(phrase.lower() in engine._doc_to_text(doc).lower() for phrase in quoted_terms)
-        ]
-        if normal_query:
-            tfidf_results = engine.search(normal_query, len(engine.documents))
-            score_map = {id(r["document"]): r["score"] for r in tfidf_results}
-            doc_id_map = {id(doc): doc for doc in engine.documents}
-            # match by content
-            score_lookup = {}
-            for r in tfidf_results:
-                score_lookup[r["document"].get("id")] = r["score"]
-            candidates = []
-            for doc in exact_matched:
-                s = score_lookup.get(doc.get("id"), 0)
-                candidates.append({"score": s, "document": doc})
-            candidates.sort(key=lambda x: x["score"], reverse=True)
-            candidates = candidates[:top_k]
-        else:
-            candidates = [{"score": 1, "document": doc} for doc in exact_matched[:top_k]]
+        candidates = engine.phrase_search(quoted_terms, normal_query, top_k, boosts=boosts, filters=filters)
     else:
-        tfidf_results = engine.search(query, top_k)
+        tfidf_results = engine.search(query, top_k, boosts=boosts, filters=filters)
         query_tokens = engine.tokenize(query)
         and_filtered = [
             r for r in tfidf_results
-            if all(t in engine._doc_to_text(r["document"]).lower() for t in query_tokens)
+            if all(engine.doc_contains(r["document"], t) for t in query_tokens)
         ]
         candidates = and_filtered if and_filtered else tfidf_results
+    return candidates
+
+
+def _facet_counts(engine, query: str, filters: dict | None = None) -> dict:
+    """Facet counts over the query's whole match set (phrases when quoted)."""
+    quoted_terms, normal_query = _parse_query(query)
+    return engine.facet_counts(normal_query if quoted_terms else query, quoted_terms, filters)
+
+
+def _parse_boosts(body: dict) -> dict | None:
+    """Optional per-request field boosts, e.g. ``{"iacpj_ta_goa": 5}``."""
+    boosts = body.get("boosts")
+    if boosts is None:
+        return None
+    if not isinstance(boosts, dict) or not all(
+        isinstance(v, (int, float)) and not isinstance(v, bool) for v in boosts.values()
+    ):
+        raise HTTPException(
+            status_code=400,
+            detail=f"boosts must map field groups ({', '.join(FIELD_GROUPS)}) to numbers",
+        )
+    return boosts
+
+
+def _parse_filters(body: dict) -> dict | None:
+    """Optional structured filters, e.g. ``{"team": ["A", "B"], "request_date": {"from": "2024-01-01"}}``."""
+    filters = body.get("filters")
+    if not filters:
+        return None
+    if not isinstance(filters, dict):
+        raise HTTPException(status_code=400, detail="filters must be an object")
+    fields = FILTER_FIELDS + RANGE_FILTER_FIELDS
+    for field, wanted in filters.items():
+        if field not in fields:
+            raise HTTPException(
+                status_code=400,
+                detail=f"unknown filter field: {field} (allowed: {', '.join(fields)})",
+            )
+        if field in RANGE_FILTER_FIELDS:
+            ok = isinstance(wanted, dict) and set(wanted) <= {"from", "to"} and all(
+                v is None or isinstance(v, str) for v in wanted.values()
+            )
+        else:
+            values = wanted if isinstance(wanted, list) else [wanted]
+            ok = all(isinstance(v, (str, int)) and not isinstance(v, bool) for v in values)
+        if not ok:
+            raise HTTPException(status_code=400, detail=f"invalid value for filter {field}")
+    return filters
+
 
+# ── Pagination ──
+
+MAX_PAGE_SIZE = 100
+
+
+def _encode_cursor(state: dict) -> str:
+    raw = json.dumps(state, ensure_ascii=False, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def _decode_cursor(cursor) -> dict:
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        state = json.loads(raw)
+        if not (
+            isinstance(state, dict) and isinstance(state.get("q"), str)
+            and isinstance(state.get("g"), int) and isinstance(state.get("o"), int)
+            and isinstance(state.get("n"), int) and 0 <= state["o"] and 0 < state["n"] <= MAX_PAGE_SIZE
+        ):
+            raise ValueError(cursor)
+        return state
+    except (TypeError, ValueError, binascii.Error):
+        raise HTTPException(status_code=400, detail="invalid cursor")
+
+
+def _parse_top_k(body: dict) -> int:
+    top_k = body.get("topK", 10)
+    if isinstance(top_k, bool) or not isinstance(top_k, int) or top_k < 1:
+        raise HTTPException(status_code=400, detail="topK must be a positive integer")
+    return top_k
+
+
+def _parse_page_size(body: dict) -> int:
+    page_size = body.get("pageSize", 10)
+    if isinstance(page_size, bool) or not isinstance(page_size, int) or not 0 < page_size <= MAX_PAGE_SIZE:
+        raise HTTPException(status_code=400, detail=f"pageSize must be an integer between 1 and {MAX_PAGE_SIZE}")
+    return page_size
+
+
+def _ranking(generation: int, query: str, boosts: dict | None, filters: dict | None) -> tuple[array, array, dict]:
+    """Experiment ids and scores of every hit, ranked as of ``generation``, and its facets.
+
+    Later pages reuse all three. A cursor whose generation is no longer
+    current can only be served from the ranking cache — recomputing would
+    rank a different index.
+    """
+    key = (
+        generation, query,
+        tuple(sorted(boosts.items())) if boosts else None,
+        json.dumps(filters, sort_keys=True, ensure_ascii=False) if filters else None,
+    )
+    ranking = _rankings.get(key)
+    if ranking is not None:
+        ids, scores, facets_json = ranking
+        return ids, scores, json.loads(facets_json)
+    if generation != index.generation:
+        raise HTTPException(status_code=410, detail="cursor expired: the index changed since the first page, search again")
+    with index.reader() as engine:
+        try:
+            hits = _find_candidates(engine, query, max(engine.doc_count, 1), boosts, filters)
+            facets = _facet_counts(engine, query, filters)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+    entry, size = _pack_ranking(hits, facets)
+    _rankings.put(key, entry, size=size)
+    ids, scores, _ = entry
+    return ids, scores, facets
+
+
+def _page_hits(ids: array, scores: array) -> list[dict]:
+    """Hits for one page of a ranking, with documents read from the current index.
+
+    Experiments deleted since the ranking was made are left out of the page.
+    """
+    with index.reader() as engine:
+        by_id = {doc["id"]: doc for doc in engine.documents_by_id(ids)}
+    return [
+        {"score": score, "document": by_id[exp_id]}
+        for exp_id, score in zip(ids, scores) if exp_id in by_id
+    ]
+
+
+def _search_page(body: dict, conn: sqlite3.Connection) -> dict:
+    """One page of results plus the hit total; only the page is enriched."""
+    cursor = body.get("cursor")
+    if cursor is not None:
+        state = _decode_cursor(cursor)
+    else:
+        query = body.get("query")
+        if not query:
+            raise HTTPException(status_code=400, detail="query is required")
+        state = {
+            "g": index.generation,
+            "q": " ".join(str(query).split()),
+            "b": _parse_boosts(body),
+            "f": _parse_filters(body),
+            "o": 0,
+            "n": _parse_page_size(body),
+        }
+    boosts = _parse_boosts({"boosts": state.get("b")})
+    filters = _parse_filters({"filters": state.get("f")})
+
+    ids, scores, facets = _ranking(state["g"], state["q"], boosts, filters)
+    offset, page_size = state["o"], state["n"]
+    page = _page_hits(ids[offset:offset + page_size], scores[offset:offset + page_size])
+    next_offset = offset + page_size
+    response = _render(conn, page, state["q"])
+    response.update({
+        "facets": facets,
+        "total": len(ids),
+        "offset": offset,
+        "pageSize": page_size,
+        "generation": state["g"],
+        "nextCursor": _encode_cursor({**state, "o": next_offset}) if next_offset < len(ids) else None,
+    })
+    return response
+
+
+def _render(conn: sqlite3.Connection, candidates: list[dict], query: str) -> dict:
+    projects, splits = load_enrichment(conn, [r["document"] for r in candidates])
     enriched = []
     for r in candidates:
         doc = r["document"]
-        splits = conn.execute(
-            "SELECT * FROM split_tables WHERE plan_id = ?", (doc.get("plan_id"),)
-        ).fetchall()
-        project = conn.execute(
-            "SELECT * FROM projects WHERE iacpj_nm = ?", (doc.get("iacpj_nm"),)
-        ).fetchone()
         enriched.append({
             "score": round(r["score"] * 1000) / 1000,
             "experiment": doc,
-            "project": dict_row(project),
-            "splits": dict_rows(splits),
+            "project": projects.get(doc.get("iacpj_nm")),
+            "splits": splits.get(doc.get("plan_id"), []),
         })
 
     summary = _generate_summary(enriched, query)
-    suggestions = _extract_suggestions(enriched, query)
-
+    with index.reader() as engine:
+        suggestions = _extract_suggestions(engine, enriched, query)
     return {"summary": summary, "suggestions": suggestions, "results": enriched}
 
 
+@router.post("/")
+def search(body: dict, conn: sqlite3.Connection = Depends(get_db)):
+    """Top-k search; with ``pageSize`` or ``cursor`` the paged form (``nextCursor``, ``total``)."""
+    if "pageSize" in body or "cursor" in body:
+        return _search_page(body, conn)
+
+    query = body.get("query")
+    if not query:
+        raise HTTPException(status_code=400, detail="query is required")
+    top_k = _parse_top_k(body)
+    boosts = _parse_boosts(body)
+    filters = _parse_filters(body)
+
+    # 공백만 다른 쿼리는 같은 결과 — 정규화한 쿼리로 검색하고 캐시한다
+    query = " ".join(str(query).split())
+    cache_key = (
+        index.generation, query, top_k,
+        tuple(sorted(boosts.items())) if boosts else None,
+        json.dumps(filters, sort_keys=True, ensure_ascii=False) if filters else None,
+    )
+    cached = _cache.get(cache_key)
+    if cached is not None:
+        ids, scores, facets_json = cached
+        candidates, facets = _page_hits(ids, scores), json.loads(facets_json)
+    else:
+        with index.reader() as engine:
+            try:
+                candidates = _find_candidates(engine, query, top_k, boosts, filters)
+                facets = _facet_counts(engine, query, filters)
+            except ValueError as e:
+                raise HTTPException(status_code=400, detail=str(e))
+        entry, size = _pack_ranking(candidates, facets)
+        _cache.put(cache_key, entry, size=size)
+
+    response = _render(conn, candidates, query)
+    response["facets"] = facets
+    return response
+
+
+# 배치 1회에 받는 질의 수 상한 — 한 요청이 읽기 잠금을 오래 잡지 않도록
+MAX_BATCH_QUERIES = 100
+
+
+@router.post("/batch")
+def search_batch(body: dict):
+    """Rank many queries in one call (report jobs); no enrichment, summary or suggestions."""
+    queries = body.get("queries")
+    if not queries or not isinstance(queries, list):
+        raise HTTPException(status_code=400, detail="queries array required")
+    if len(queries) > MAX_BATCH_QUERIES:
+        raise HTTPException(status_code=400, detail=f"at most {MAX_BATCH_QUERIES} queries per batch")
+    if not all(isinstance(query, str) and query.strip() for query in queries):
+        raise HTTPException(status_code=400, detail="queries must be non-empty strings")
+    top_k = _parse_top_k(body)
+    boosts = _parse_boosts(body)
+    filters = _parse_filters(body)
+
+    with index.reader() as engine:
+        try:
+            ranked = engine.search_many(queries, top_k, boosts=boosts, filters=filters)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+    return {
+        "results": [
+            {
+                "query": query,
+                "results": [
+                    {"score": round(r["score"] * 1000) / 1000, "experiment": r["document"]}
+                    for r in results
+                ],
+            }
+            for query, results in zip(queries, ranked)
+        ]
+    }
+
+
 @router.post("/reindex")
-def reindex(conn: sqlite3.Connection = Depends(get_db)):
-    global _indexed
-    _indexed = False
-    _ensure_index(conn)
-    return {"message": "Reindexed", "documentCount": len(engine.documents)}
+def reindex():
+    index.invalidate(wait=True)
+    stats = index.stats()
+    return {"message": "Reindexed", "documentCount": stats["documentCount"], "index": stats}
+
+
+@router.get("/status")
+def index_status():
+    return {**index.stats(), "cache": _cache.stats(), "rankings": _rankings.stats()}
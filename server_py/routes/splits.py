@@ -3,16 +3,16 @@
 """
 import sqlite3
 from fastapi import APIRouter, Depends, HTTPException, Query
-from ..database import get_db, dict_rows
+from ..database import get_db, dict_rows, run_write
 
 router = APIRouter(prefix="/api/splits", tags=["splits"])
 
 # Will be set from main.py
-_invalidate_index = None
+_refresh_index = None
 
-def set_invalidate_index(fn):
-    global _invalidate_index
-    _invalidate_index = fn
+def set_refresh_index(fn):
+    global _refresh_index
+    _refresh_index = fn
 
 SPLIT_COLS = [
     "sno", "plan_id", "fac_id", "oper_id", "oper_nm", "eps_lot_gbn_cd", "work_cond_desc",
@@ -32,6 +32,7 @@ def list_splits(
             "SELECT * FROM split_tables WHERE plan_id = ?", (plan_id,)
         ).fetchall()
     else:
+        # full-scan: split_tables — 전체 목록
         rows = conn.execute("SELECT * FROM split_tables").fetchall()
     return dict_rows(rows)
 
@@ -45,20 +46,21 @@ def replace_splits(plan_id: str, body: dict, conn: sqlite3.Connection = Depends(
     col_names = ", ".join(SPLIT_COLS)
     placeholders = ", ".join(f":{c}" for c in SPLIT_COLS)
 
-    try:
-        conn.execute("DELETE FROM split_tables WHERE plan_id = ?", (plan_id,))
+    def replace(wconn):
+        wconn.execute("DELETE FROM split_tables WHERE plan_id = ?", (plan_id,))
         for row in splits:
             params = {c: row.get(c) or None for c in SPLIT_COLS}
             params["plan_id"] = plan_id
-            conn.execute(
+            wconn.execute(
                 f"INSERT INTO split_tables ({col_names}) VALUES ({placeholders})", params
             )
-        conn.commit()
-
-        if _invalidate_index:
-            _invalidate_index()
 
-        return {"count": len(splits)}
+    try:
+        run_write(replace)
     except Exception as e:
-        conn.rollback()
         raise HTTPException(status_code=500, detail=f"Split 저장 중 오류 발생: {e}")
+
+    # 커밋 뒤 — 인덱스 반영 실패는 refresh 가 재빌드로 돌린다 (요청은 실패시키지 않는다)
+    if _refresh_index:
+        _refresh_index(conn, plan_ids=[plan_id])
+    return {"count": len(splits)}
@@ -5,17 +5,17 @@ import csv
 import io
 import sqlite3
 from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, Form
-from ..database import get_db
+from ..database import AsyncDatabase, get_async_db, get_db, run_write
 
 router = APIRouter(prefix="/api/upload", tags=["upload"])
 
-_invalidate_search = None
-_invalidate_llm = None
+_refresh_index = None
+_invalidate_index = None
 
-def set_invalidate_fns(search_fn, llm_fn):
-    global _invalidate_search, _invalidate_llm
-    _invalidate_search = search_fn
-    _invalidate_llm = llm_fn
+def set_index_fns(refresh_fn, invalidate_fn):
+    global _refresh_index, _invalidate_index
+    _refresh_index = refresh_fn
+    _invalidate_index = invalidate_fn
 
 PROJECT_COLS = [
     "iacpj_nm","iacpj_tgt_n","iacpj_level","iacpj_tech_n",
@@ -46,16 +46,7 @@ def _sql_insert(table, cols, ignore=False):
     ph = ", ".join(f":{c}" for c in cols)
     return f"INSERT{ig} INTO {table} ({cn}) VALUES ({ph})"
 
-@router.post("")
-async def upload_csv(
-    file: UploadFile = File(...),
-    type: str = Form("all"),
-    conn: sqlite3.Connection = Depends(get_db),
-):
-    if not file:
-        raise HTTPException(400, "No file uploaded")
-    content = await file.read()
-
+def _parse_csv(content: bytes) -> list[dict]:
     # 인코딩 자동 감지 (UTF-8 → EUC-KR → CP949)
     text = None
     for encoding in ("utf-8-sig", "utf-8", "euc-kr", "cp949"):
@@ -68,38 +59,60 @@ async def upload_csv(
         raise HTTPException(400, "파일 인코딩을 인식할 수 없습니다. UTF-8로 저장 후 다시 시도해주세요.")
 
     reader = csv.DictReader(io.StringIO(text))
-    results = [{k.lower().strip(): v for k, v in row.items()} for row in reader]
+    return [{k.lower().strip(): v for k, v in row.items()} for row in reader]
+
+@router.post("")
+async def upload_csv(
+    file: UploadFile = File(...),
+    type: str = Form("all"),
+    db: AsyncDatabase = Depends(get_async_db),
+):
+    if not file:
+        raise HTTPException(400, "No file uploaded")
+    content = await file.read()
+    # 디코딩 / 파싱 / 삽입 / 인덱스 반영은 모두 DB executor 에서 — 이벤트 루프를 막지 않는다
+    results = await db.run(_parse_csv, content)
 
-    pc = ec = sc = 0
+    changed_projects: set[str] = set()
+    changed_plans: set[str] = set()
     sql_p = _sql_insert("projects", PROJECT_COLS, True)
     sql_e = _sql_insert("experiments", EXPERIMENT_COLS, False)
     sql_s = _sql_insert("split_tables", SPLIT_COLS, True)
 
-    try:
+    # 전체 파일이 하나의 쓰기 트랜잭션 — 읽기는 WAL 읽기 풀에서 계속 진행된다
+    def insert_rows(wconn):
+        pc = ec = sc = 0
         for row in results:
             if type == "project":
                 if not row.get("iacpj_nm"): continue
-                if conn.execute(sql_p, _mk(row, PROJECT_COLS)).rowcount > 0: pc += 1
+                if wconn.execute(sql_p, _mk(row, PROJECT_COLS)).rowcount > 0:
+                    pc += 1; changed_projects.add(row["iacpj_nm"])
             elif type == "experiment":
                 if not row.get("plan_id") or not row.get("iacpj_nm"): continue
-                if conn.execute(sql_e, _mk(row, EXPERIMENT_COLS)).rowcount > 0: ec += 1
+                if wconn.execute(sql_e, _mk(row, EXPERIMENT_COLS)).rowcount > 0:
+                    ec += 1; changed_plans.add(row["plan_id"])
             elif type == "split":
                 if not row.get("plan_id"): continue
-                if conn.execute(sql_s, _mk(row, SPLIT_COLS)).rowcount > 0: sc += 1
+                if wconn.execute(sql_s, _mk(row, SPLIT_COLS)).rowcount > 0:
+                    sc += 1; changed_plans.add(row["plan_id"])
             elif type == "all":
                 if row.get("iacpj_nm"):
-                    if conn.execute(sql_p, _mk(row, PROJECT_COLS)).rowcount > 0: pc += 1
+                    if wconn.execute(sql_p, _mk(row, PROJECT_COLS)).rowcount > 0:
+                        pc += 1; changed_projects.add(row["iacpj_nm"])
                 if row.get("plan_id") and row.get("iacpj_nm"):
-                    if conn.execute(sql_e, _mk(row, EXPERIMENT_COLS)).rowcount > 0: ec += 1
+                    if wconn.execute(sql_e, _mk(row, EXPERIMENT_COLS)).rowcount > 0:
+                        ec += 1; changed_plans.add(row["plan_id"])
                 if row.get("plan_id"):
-                    if conn.execute(sql_s, _mk(row, SPLIT_COLS)).rowcount > 0: sc += 1
-        conn.commit()
+                    if wconn.execute(sql_s, _mk(row, SPLIT_COLS)).rowcount > 0:
+                        sc += 1; changed_plans.add(row["plan_id"])
+        return pc, ec, sc
+
+    try:
+        pc, ec, sc = await db.write(insert_rows)
     except Exception as e:
-        conn.rollback()
         raise HTTPException(500, f"Database error: {e}")
 
-    if _invalidate_search: _invalidate_search()
-    if _invalidate_llm: _invalidate_llm()
+    if _refresh_index: await db.read(_refresh_index, plan_ids=changed_plans, project_names=changed_projects)
 
     return {"message":"Process completed","details":{"projectCount":pc,"experimentCount":ec,"splitCount":sc},"totalRows":len(results)}
 
@@ -112,11 +125,14 @@ def get_stats(conn: sqlite3.Connection = Depends(get_db)):
 
 @router.post("/clear")
 def clear_db(conn: sqlite3.Connection = Depends(get_db)):
-    try:
+    def clear(wconn):
         for t in ("split_tables","experiments","projects","line_lots"):
-            conn.execute(f"DELETE FROM {t}")
-        conn.commit()
+            # full-scan: split_tables, experiments, projects, line_lots — 전체 삭제
+            wconn.execute(f"DELETE FROM {t}")
+
+    try:
+        run_write(clear)
+        if _invalidate_index: _invalidate_index()
         return {"message": "DB 초기화 완료"}
     except Exception as e:
-        conn.rollback()
         raise HTTPException(500, str(e))
@@ -0,0 +1,90 @@
+"""
+Search corpus loader — streams experiment documents for the TF-IDF index.
+
+Experiments are read joined with their project and split rows in one query
+ordered by experiment id and grouped in a single pass, instead of one split
+query per experiment. ``load_enrichment`` fetches the full project / split
+rows attached to search results with one ``IN (...)`` query per table.
+"""
+import sqlite3
+from typing import Iterator
+
+SPLIT_FIELDS = (
+    "fac_id", "oper_id", "oper_nm", "eps_lot_gbn_cd",
+    "work_cond_desc", "eqp_id", "recipe_id", "note",
+)
+
+# 실험 1건당 split 행 수만큼 행이 나온다 — s.id 가 NULL 이면 split 없는 실험
+_DOCUMENT_SQL = f"""
+    SELECT e.*,
+      p.project_purpose, p.iacpj_ta_goa, p.iacpj_cur_stt,
+      p.iacpj_tech_n, p.iacpj_mod_n as project_module,
+      p.iacpj_tgt_n, p.iacpj_level,
+      p.ia_tgt_htr_n, p.iacpj_nud_n,
+      p.iacpj_itf_uno, p.iacpj_bgn_dy, p.iacpj_ch_n, p.ia_ta_grd_n,
+      p.iacpj_core_tec, p.ia_ch_or_n,
+      s.id, {", ".join(f"s.{field}" for field in SPLIT_FIELDS)}
+    FROM experiments e
+    LEFT JOIN projects p ON e.iacpj_nm = p.iacpj_nm
+    LEFT JOIN split_tables s ON s.plan_id = e.plan_id
+"""
+
+# SQLite 바인딩 변수 한도 안쪽으로 IN (...) 을 나눈다
+_IN_CHUNK = 500
+
+
+def iter_documents(conn: sqlite3.Connection, where: str = "", params=()) -> Iterator[dict]:
+    """Yield one dict per experiment with its project columns and ``_splits``.
+
+    ``where`` optionally restricts the experiments (alias ``e``). Documents
+    come out in ``id`` order — index positions, and with them the order of
+    equal-score and quote-only results, follow experiment ids.
+    """
+    # full-scan: experiments — 색인 빌드는 실험 전체를 id 순으로 읽는다
+    cursor = conn.execute(_DOCUMENT_SQL + where + " ORDER BY e.id, s.id", params)
+    n_split = len(SPLIT_FIELDS) + 1
+    columns = [d[0] for d in cursor.description][:-n_split]
+    id_pos = columns.index("id")
+    doc = None
+    for row in cursor:
+        values = tuple(row)
+        if doc is None or doc["id"] != values[id_pos]:
+            if doc is not None:
+                yield doc
+            doc = dict(zip(columns, values))
+            doc["_splits"] = []
+        if values[-n_split] is not None:
+            doc["_splits"].append(dict(zip(SPLIT_FIELDS, values[1 - n_split:])))
+    if doc is not None:
+        yield doc
+
+
+def load_enrichment(conn: sqlite3.Connection, docs: list[dict]) -> tuple[dict, dict]:
+    """Full project rows by ``iacpj_nm`` and split rows by ``plan_id`` for ``docs``.
+
+    One ``IN (...)`` query per table (chunked) instead of two per result;
+    projects shared by several results are fetched once.
+    """
+    names = list(dict.fromkeys(d.get("iacpj_nm") for d in docs if d.get("iacpj_nm") is not None))
+    plans = list(dict.fromkeys(d.get("plan_id") for d in docs if d.get("plan_id") is not None))
+
+    projects: dict = {}
+    for i in range(0, len(names), _IN_CHUNK):
+        chunk = names[i:i + _IN_CHUNK]
+        rows = conn.execute(
+            f"SELECT * FROM projects WHERE iacpj_nm IN ({', '.join('?' * len(chunk))})", chunk
+        )
+        for row in rows:
+            projects[row["iacpj_nm"]] = dict(row)
+
+    splits: dict = {}
+    for i in range(0, len(plans), _IN_CHUNK):
+        chunk = plans[i:i + _IN_CHUNK]
+        rows = conn.execute(
+            f"SELECT * FROM split_tables WHERE plan_id IN ({', '.join('?' * len(chunk))})"
+            " ORDER BY plan_id, id",
+            chunk,
+        )
+        for row in rows:
+            splits.setdefault(row["plan_id"], []).append(dict(row))
+    return projects, splits
@@ -1,18 +1,163 @@
 """
 TF-IDF search engine — exact port of server/search-engine.js
 """
+import os
 import re
 import math
+import heapq
+import threading
+from array import array
+from bisect import bisect_left, bisect_right
 from typing import Any
 
+from .search_facets import FACET_LIMIT, FacetTable
+from .search_store import DocumentStore, Posting, TermDictionary
+
+# 필드 그룹 — 그룹별 가중치(boost)로 점수를 조정한다. 요청별 boosts 도 이 이름을 쓴다
+FIELD_GROUPS = (
+    "experiment", "project_purpose", "iacpj_ta_goa", "iacpj_cur_stt", "project", "split",
+)
+
+# (group, doc key) — 색인 텍스트 순서 그대로
+_DOC_FIELDS = (
+    # 실험 필드
+    *(("experiment", key) for key in (
+        "iacpj_nm", "module", "eval_item", "eval_process", "eval_category",
+        "requester", "lot_code", "plan_id", "team", "wf_direction", "prev_eval",
+        "cross_experiment", "lot_request", "reference", "volume_split",
+        "assign_wf", "refdata", "request_date",
+    )),
+    # 과제 필드
+    ("project_purpose", "project_purpose"),
+    ("iacpj_ta_goa", "iacpj_ta_goa"),
+    ("iacpj_cur_stt", "iacpj_cur_stt"),
+    *(("project", key) for key in (
+        "iacpj_tech_n", "project_module", "iacpj_tgt_n", "iacpj_ch_n",
+        "ia_ta_grd_n", "iacpj_level", "iacpj_nud_n", "iacpj_core_tec", "ia_ch_or_n",
+    )),
+)
+
+# 구조화 필터 — 값 일치 컬럼과 범위 컬럼 (문자열 비교, ISO 날짜)
+FILTER_FIELDS = ("module", "team", "status", "fab_status", "iacpj_nm")
+RANGE_FILTER_FIELDS = ("request_date",)
+
+# 스플릿 필드 (스플릿마다 반복)
+_SPLIT_KEYS = (
+    "fac_id", "oper_id", "oper_nm", "eps_lot_gbn_cd",
+    "work_cond_desc", "eqp_id", "recipe_id", "note",
+)
+
+
+# ── fuzzy matching helpers ──
+def _jamo_key(term: str) -> str:
+    """``term`` with Hangul syllables decomposed into jamo, so one wrong jamo is one edit."""
+    out = []
+    for ch in term:
+        code = ord(ch) - 0xAC00
+        if 0 <= code < 11172:
+            out.append(chr(0x1100 + code // 588))
+            out.append(chr(0x1161 + code % 588 // 28))
+            if code % 28:
+                out.append(chr(0x11A7 + code % 28))
+        else:
+            out.append(ch)
+    return "".join(out)
+
+
+def _trigrams(key: str) -> set[str]:
+    padded = f"\x00{key}\x00"
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def _edit_distance(a: str, b: str, limit: int) -> int:
+    """Optimal-string-alignment distance (adjacent swaps cost 1); ``limit + 1`` once it exceeds ``limit``."""
+    if abs(len(a) - len(b)) > limit:
+        return limit + 1
+    prev2: list[int] = []
+    prev = list(range(len(b) + 1))
+    for i in range(1, len(a) + 1):
+        cur = [i] + [0] * len(b)
+        for j in range(1, len(b) + 1):
+            cost = 0 if a[i - 1] == b[j - 1] else 1
+            cur[j] = min(prev[j] + 1, cur[j - 1] + 1, prev[j - 1] + cost)
+            if i > 1 and j > 1 and a[i - 1] == b[j - 2] and a[i - 2] == b[j - 1]:
+                cur[j] = min(cur[j], prev2[j - 2] + 1)
+        if min(cur) > limit:
+            return limit + 1
+        prev2, prev = prev, cur
+    return min(prev[-1], limit + 1)
+
+
+def engine_backend() -> str:
+    """The backend create_engine builds: ``SEARCH_ENGINE`` = ``tfidf`` (default) | ``sparse`` | ``fts``."""
+    backend = os.environ.get("SEARCH_ENGINE", "tfidf")
+    if backend == "sparse":
+        from .search_sparse import np
+        if np is not None:  # numpy 미설치 시 기본 엔진으로
+            return "sparse"
+    elif backend == "fts":
+        from .search_fts import fts5_available
+        if fts5_available():  # FTS5 없이 빌드된 SQLite 면 기본 엔진으로
+            return "fts"
+    return "tfidf"
+
+
+def create_engine() -> "TfIdfSearchEngine":
+    """Engine for the configured backend (see engine_backend)."""
+    backend = engine_backend()
+    if backend == "sparse":
+        from .search_sparse import SparseTfIdfSearchEngine
+        return SparseTfIdfSearchEngine()
+    if backend == "fts":
+        from .search_fts import FtsSearchEngine
+        return FtsSearchEngine()
+    return TfIdfSearchEngine()
+
 
 class TfIdfSearchEngine:
+    # 누적 변경(upsert/remove)이 이 값과 문서 수 × COMPACT_RATIO 중 큰 값을 넘으면 compact()
+    COMPACT_MIN_CHANGES = 64
+    COMPACT_RATIO = 0.1
+    # 기본 필드 가중치 — 예전에 _doc_to_text 가 필드를 반복해 주던 가중치와 같다 (나머지 그룹 1)
+    FIELD_BOOSTS = {"project_purpose": 2.0, "iacpj_ta_goa": 3.0, "iacpj_cur_stt": 2.0}
+    # 요청별 boosts 조합마다 캐시하는 문서 통계 수
+    BOOST_CACHE_SIZE = 8
+    # 오타 허용 — 색인에 없는 쿼리 토큰을 편집 거리 안의 색인 term 으로 확장 (0 이면 끔)
+    FUZZY_MAX_EXPANSIONS = 3
+    # 확장 term 의 쿼리 가중치 감쇠 (편집 거리 1 당)
+    FUZZY_PENALTY = 0.5
+
     def __init__(self):
-        self.documents: list[dict] = []
+        # 삭제된 문서 자리는 compact() 전까지 None으로 남는다 (search_store.DocumentStore)
+        self.documents: DocumentStore = DocumentStore()
         self.idf_cache: dict[str, float] = {}
-        self.tfidf_cache: list[dict[str, float]] = []
+        # 색인 term ↔ 정수 id — 문서 토큰 스트림이 이 id 를 쓴다
+        self.terms = TermDictionary()
+        # 문서별 토큰 스트림 (텍스트 순서의 term id) — 구문 검색 위치와 문서 토큰 집합
+        self.doc_terms: list[array | None] = []
+        # 문서별 위치 색인 — 스트림 위치를 (term id, 위치) 순으로 정렬; term 의 위치는 bisect 한 번
+        self.doc_positions: list[array | None] = []
+        # 문서별 소문자 텍스트 (doc_text / doc_contains) — 스냅샷 복원 뒤에는 처음 읽을 때 채운다
+        self.doc_texts: list[str | None] = []
         self.df_map: dict[str, int] = {}
+        # 살아있는 문서 수
         self.doc_count: int = 0
+        # Inverted index: term → Posting (doc_idx → normalised tf, 필드 그룹별 count)
+        self.postings: dict[str, Posting] = {}
+        # L2 norm of each document's tf-idf vector (same order as documents)
+        self.doc_norms: list[float] = []
+        self._id_to_idx: dict[Any, int] = {}
+        self._changes = 0
+        # boosts → (문서별 가중 max count, 문서별 norm); 색인이 바뀌면 비운다
+        self._boost_cache: dict[tuple, tuple[list[float], list[float]]] = {}
+        self._boost_lock = threading.Lock()
+        # Structured filters: column → value → doc bitset (int, bit i = doc idx)
+        self.filter_bits: dict[str, dict[Any, int]] | None = None
+        # Facet columns (search_facets) — integer-coded values per doc slot
+        self.facets: FacetTable | None = None
+        # Fuzzy lookup: jamo-key trigram → vocabulary terms (첫 오타 쿼리 때 생성, 이후 증분 유지)
+        self._gram_index: dict[str, set[str]] | None = None
+        self._gram_lock = threading.Lock()
 
     # ── tokenize ──
     def tokenize(self, text: str | None) -> list[str]:
@@ -35,46 +180,417 @@ class TfIdfSearchEngine:
 
     # ── build index ──
     def build_index(self, documents: list[dict]):
-        self.documents = documents
-        self.idf_cache = {}
-        self.tfidf_cache = []
-
-        N = len(documents)
-        all_token_sets = []
+        self.documents = DocumentStore()
+        self.terms = TermDictionary()
+        self.doc_terms = []
+        self.doc_positions = []
+        self.doc_texts = []
+        self.postings = {}
+        self.df_map = {}
+        self.doc_count = 0
+        self._id_to_idx = {}
+        self._gram_index = None
+        self.filter_bits = None  # 문서별 OR 대신 끝에서 한 번에 만든다
+        self.facets = None
         for doc in documents:
-            text = self._doc_to_text(doc)
-            all_token_sets.append(set(self.tokenize(text)))
+            self._append(doc)
+        self._recompute_weights()
+        self._rebuild_columns()
 
-        # Compute DF
-        self.df_map = {}
-        for token_set in all_token_sets:
-            for token in token_set:
-                self.df_map[token] = self.df_map.get(token, 0) + 1
+    def _after_load(self):
+        """Hook run after search_snapshot restored a persisted index into this engine."""
+        self._rebuild_columns()
+
+    # ── incremental updates ──
+    def upsert(self, doc: dict, compact: bool = True):
+        """Add a document, replacing any indexed document with the same id.
+
+        With ``compact=False`` the change is only counted; the caller runs
+        ``compact_if_due()`` once after a batch.
+        """
+        old_idx = self._id_to_idx.get(doc.get("id"))
+        touched = self._term_set(old_idx) if old_idx is not None else set()
+        if old_idx is not None:
+            self._drop(old_idx)
+        idx = self._append(doc)
+        tf = self.doc_tf(idx)
+        touched.update(tf)
+        self._refresh_idf(touched)
+        self.doc_norms.append(self._norm(tf))
+        self._record_change(compact)
+
+    def remove(self, doc_id: Any, compact: bool = True) -> bool:
+        idx = self._id_to_idx.get(doc_id)
+        if idx is None:
+            return False
+        touched = self._term_set(idx)
+        self._drop(idx)
+        self._refresh_idf(touched)
+        self._record_change(compact)
+        return True
 
-        # Compute IDF
-        for token, df in self.df_map.items():
-            self.idf_cache[token] = math.log(N / (1 + df)) + 1
+    def compact(self):
+        """Drop removed slots and dead terms, and recompute every IDF / norm from the stored TFs.
+
+        Between compactions only the IDF of touched terms is refreshed, so norms
+        of untouched documents drift slightly as the corpus size changes.
+        """
+        live = self.documents.live_indices()
+        remap = {old: new for new, old in enumerate(live)}
+        self.documents = self.documents.select(live)
+        self.doc_terms = [self.doc_terms[idx] for idx in live]
+        self.doc_positions = [self.doc_positions[idx] for idx in live]
+        self.doc_texts = [self.doc_texts[idx] for idx in live]
+        self._id_to_idx = {doc_id: remap[idx] for doc_id, idx in self._id_to_idx.items()}
+        self.postings = {t: posting.remapped(remap) for t, posting in self.postings.items()}
+        if len(self.terms) != len(self.postings):
+            # 사라진 term 의 id 를 비우고 스트림을 새 id 로 다시 쓴다 — 순서를 지키므로 위치 색인은 그대로 유효
+            old_terms = self.terms.terms
+            self.terms = TermDictionary(t for t in old_terms if t in self.postings)
+            term_remap = [self.terms.ids.get(t, -1) for t in old_terms]
+            self.doc_terms = [array("i", [term_remap[tid] for tid in stream]) for stream in self.doc_terms]
+        self._recompute_weights()
+        self._rebuild_columns()
+
+    def _append(self, doc: dict) -> int:
+        terms = self.terms
+        stream = array("i")
+        field_counts: dict[str, dict[str, int]] = {}
+        fields = self._doc_fields(doc)
+        for group, value in fields:
+            counts = field_counts.setdefault(group, {})
+            for t in self.tokenize(value):
+                tid = terms.intern(t)
+                t = terms.terms[tid]  # 색인 전체가 같은 문자열 객체를 공유
+                counts[t] = counts.get(t, 0) + 1
+                stream.append(tid)
+        tf = self._weighted_tf(field_counts, self.FIELD_BOOSTS)
+
+        idx = len(self.documents)
+        self.documents.append(doc)
+        self.doc_terms.append(stream)
+        self.doc_positions.append(array("i", sorted(range(len(stream)), key=stream.__getitem__)))
+        self.doc_texts.append(" ".join(value for _, value in fields).lower())
+        group_counts = [field_counts.get(g, {}) for g in FIELD_GROUPS]
+        for t, w in tf.items():
+            posting = self.postings.get(t)
+            if posting is None:
+                posting = self.postings[t] = Posting(len(FIELD_GROUPS))
+            posting.add(idx, w, [counts.get(t, 0) for counts in group_counts])
+            self.df_map[t] = self.df_map.get(t, 0) + 1
+            if self.df_map[t] == 1 and self._gram_index is not None:
+                self._index_grams(t)
+        self._id_to_idx[doc.get("id")] = idx
+        self.doc_count += 1
+        if self.filter_bits is not None:
+            for field, by_value in self.filter_bits.items():
+                value = doc.get(field)
+                if value is not None:
+                    by_value[value] = by_value.get(value, 0) | (1 << idx)
+        if self.facets is not None:
+            self.facets.add(idx, doc)
+        return idx
+
+    def _drop(self, idx: int):
+        for t in self._term_set(idx):
+            del self.postings[t][idx]
+            self.df_map[t] -= 1
+            if self.df_map[t] == 0:
+                del self.postings[t]
+                del self.df_map[t]
+                self.idf_cache.pop(t, None)
+                if self._gram_index is not None:
+                    self._unindex_grams(t)
+        doc = self.documents[idx]
+        if self.filter_bits is not None:
+            for field, by_value in self.filter_bits.items():
+                value = doc.get(field)
+                if value in by_value:
+                    by_value[value] &= ~(1 << idx)
+                    if not by_value[value]:
+                        del by_value[value]
+        self._id_to_idx.pop(doc.get("id"), None)
+        self.documents[idx] = None
+        self.doc_terms[idx] = None
+        self.doc_positions[idx] = None
+        self.doc_texts[idx] = None
+        self.doc_norms[idx] = 0.0
+        self.doc_count -= 1
+
+    def _refresh_idf(self, terms):
+        N = self.doc_count
+        for t in terms:
+            df = self.df_map.get(t)
+            if df:
+                self.idf_cache[t] = math.log(N / (1 + df)) + 1
+
+    def _recompute_weights(self):
+        N = len(self.documents.live_indices())
         self.doc_count = N
+        self.idf_cache = {t: math.log(N / (1 + df)) + 1 for t, df in self.df_map.items()}
+        # term 순으로 postings 를 한 번 훑어 문서별 제곱합을 모은다
+        squares = [0.0] * len(self.documents)
+        for t, posting in self.postings.items():
+            idf = self.idf_cache[t]
+            for idx, w in posting.items():
+                squares[idx] += (w * idf) ** 2
+        self.doc_norms = [math.sqrt(sq) for sq in squares]
+        self._changes = 0
+        self._boost_cache = {}
 
-        # Compute TF-IDF vectors
-        self.tfidf_cache = []
-        for doc in documents:
-            text = self._doc_to_text(doc)
-            tokens = self.tokenize(text)
-            tf: dict[str, int] = {}
-            for t in tokens:
-                tf[t] = tf.get(t, 0) + 1
-            max_tf = max(tf.values()) if tf else 1
-            vec: dict[str, float] = {}
-            for t, count in tf.items():
-                vec[t] = (count / max_tf) * self.idf_cache.get(t, 0)
-            self.tfidf_cache.append(vec)
+    def _norm(self, tf: dict[str, float]) -> float:
+        idf = self.idf_cache
+        return math.sqrt(sum((w * idf[t]) ** 2 for t, w in tf.items()))
+
+    # ── per-document terms ──
+    def _term_set(self, idx: int) -> set[str]:
+        terms = self.terms.terms
+        return {terms[tid] for tid in set(self.doc_terms[idx])}
+
+    def doc_tf(self, idx: int) -> dict[str, float]:
+        """Normalised tf of document ``idx`` (term → weight), read back from the postings."""
+        terms = self.terms.terms
+        return {terms[tid]: self.postings[terms[tid]][idx] for tid in dict.fromkeys(self.doc_terms[idx])}
+
+    def _record_change(self, compact: bool = True):
+        self._boost_cache = {}
+        self._changes += 1
+        if compact:
+            self.compact_if_due()
+
+    def compact_if_due(self):
+        if self._changes >= max(self.COMPACT_MIN_CHANGES, self.doc_count * self.COMPACT_RATIO):
+            self.compact()
 
     # ── search ──
-    def search(self, query: str, top_k: int = 10) -> list[dict]:
+    def search(
+        self,
+        query: str,
+        top_k: int = 10,
+        candidates: set[int] | None = None,
+        boosts: dict[str, float] | None = None,
+        filters: dict | None = None,
+    ) -> list[dict]:
+        """Top-k documents by cosine similarity.
+
+        ``candidates`` limits scoring to those doc indices and ``filters`` to
+        the documents matching them (see filter_candidates); ``boosts``
+        overrides FIELD_BOOSTS per field group for this query only (no rebuild).
+        """
+        candidates = self._restrict(candidates, filters)
+        query_vec, query_norm = self._query_vector(query)
+        if query_norm == 0 or candidates is not None and not candidates:
+            return []
+        boosts = self._resolve_boosts(boosts)
+        if boosts is None:
+            doc_norms = self.doc_norms
+        else:
+            max_counts, doc_norms = self._boost_stats(boosts)
+
+        dots: dict[int, float] = {}
+        for t, qw in query_vec.items():
+            posting = self.postings.get(t)
+            if not posting:
+                continue
+            idf = self.idf_cache[t]
+            if candidates is not None and len(candidates) < len(posting):
+                hits = ((idx, posting[idx]) for idx in candidates if idx in posting)
+            elif candidates is not None:
+                hits = ((idx, w) for idx, w in posting.items() if idx in candidates)
+            else:
+                hits = posting.items()
+            for idx, w in hits:
+                if boosts is not None:
+                    w = self._weighted_count(idx, t, boosts) / max_counts[idx]
+                dots[idx] = dots.get(idx, 0.0) + qw * (w * idf)
+
+        scored = []
+        for idx, dot in dots.items():
+            doc_norm = doc_norms[idx]
+            if doc_norm == 0:
+                continue
+            score = dot / (query_norm * doc_norm)
+            if score > 0:
+                scored.append((score, idx))
+
+        # 동점은 문서 순서대로 (기존 stable sort와 동일)
+        top = heapq.nlargest(top_k, scored, key=lambda item: (item[0], -item[1]))
+        return [
+            {"index": idx, "score": score, "document": self.documents[idx]}
+            for score, idx in top
+        ]
+
+    def search_many(
+        self, queries: list[str], top_k: int = 10,
+        boosts: dict[str, float] | None = None, filters: dict | None = None,
+    ) -> list[list[dict]]:
+        """``search`` for each query; vectorised backends score the batch at once."""
+        return [self.search(query, top_k, boosts=boosts, filters=filters) for query in queries]
+
+    # ── structured filters ──
+    def filter_candidates(self, filters: dict) -> set[int]:
+        """Doc indices matching every filter (see filter_mask)."""
+        mask = self.filter_mask(filters)
+        # 비트 문자열을 한 번 훑어 위치를 꺼낸다
+        return {idx for idx, bit in enumerate(reversed(bin(mask)[2:])) if bit == "1"}
+
+    def filter_mask(self, filters: dict) -> int:
+        """Bitset (bit i = doc idx) of the documents matching every filter.
+
+        ``FILTER_FIELDS`` take a value or a list of values (any of them);
+        ``RANGE_FILTER_FIELDS`` take ``{"from": ..., "to": ...}`` (inclusive,
+        either end optional). Fields are combined with AND.
+        """
+        if self.filter_bits is None:
+            self._rebuild_columns()
+        mask = None
+        for field, wanted in filters.items():
+            by_value = self.filter_bits.get(field)
+            if by_value is None:
+                raise ValueError(f"unknown filter field: {field}")
+            if field in RANGE_FILTER_FIELDS:
+                if not isinstance(wanted, dict):
+                    raise ValueError(f'{field} filter must be {{"from": ..., "to": ...}}')
+                values = sorted(by_value)
+                lo = bisect_left(values, wanted["from"]) if wanted.get("from") is not None else 0
+                hi = bisect_right(values, wanted["to"]) if wanted.get("to") is not None else len(values)
+                selected = values[lo:hi]
+            else:
+                selected = wanted if isinstance(wanted, list) else [wanted]
+            bits = 0
+            for value in selected:
+                bits |= by_value.get(value, 0)
+            mask = bits if mask is None else mask & bits
+            if not mask:
+                return 0
+        if mask is None:
+            mask = self._bitset(self._id_to_idx.values())
+        return mask
+
+    # ── facets ──
+    def match_set(self, query: str, phrases: list[str] = (), filters: dict | None = None) -> set[int]:
+        """Every doc index the query matches: all ``phrases`` if given, else any query term."""
+        if phrases:
+            matched = set.intersection(*(self.match_phrase(p) for p in phrases))
+        else:
+            query_vec, _ = self._query_vector(query)
+            matched = set()
+            for t in query_vec:
+                matched.update(self.postings.get(t, ()))
+        if filters:
+            matched &= self.filter_candidates(filters)
+        return matched
+
+    def facet_counts(
+        self, query: str, phrases: list[str] = (), filters: dict | None = None, limit: int = FACET_LIMIT,
+    ) -> dict[str, list[dict]]:
+        """Facet value counts over the whole match set (see match_set), not just the top-k."""
+        if self.facets is None:
+            self._rebuild_columns()
+        return self.facets.counts(self.match_set(query, phrases, filters), limit)
+
+    def _restrict(self, candidates: set[int] | None, filters: dict | None) -> set[int] | None:
+        if not filters:
+            return candidates
+        allowed = self.filter_candidates(filters)
+        return allowed if candidates is None else candidates & allowed
+
+    def _rebuild_columns(self):
+        """Filter bitsets and facet columns, in one pass over the documents."""
+        positions: dict[str, dict[Any, list[int]]] = {
+            field: {} for field in FILTER_FIELDS + RANGE_FILTER_FIELDS
+        }
+        facets = FacetTable()
+        for idx, doc in enumerate(self.documents):
+            facets.add(idx, doc)
+            if doc is None:
+                continue
+            for field, by_value in positions.items():
+                value = doc.get(field)
+                if value is not None:
+                    by_value.setdefault(value, []).append(idx)
+
+        self.filter_bits = {
+            field: {value: self._bitset(idxs) for value, idxs in by_value.items()}
+            for field, by_value in positions.items()
+        }
+        self.facets = facets
+
+    def _bitset(self, idxs) -> int:
+        # 1 << idx 를 반복해 OR 하면 O(N²) — 바이트 배열에 찍고 한 번에 변환
+        bits = bytearray((len(self.documents) + 7) // 8)
+        for idx in idxs:
+            bits[idx >> 3] |= 1 << (idx & 7)
+        return int.from_bytes(bits, "little")
+
+    # ── field boosts ──
+    def _resolve_boosts(self, boosts: dict[str, float] | None) -> dict[str, float] | None:
+        """Complete group → boost map for a request, or None when it equals FIELD_BOOSTS."""
+        if not boosts:
+            return None
+        unknown = set(boosts) - set(FIELD_GROUPS)
+        if unknown:
+            raise ValueError(f"unknown field group: {', '.join(sorted(unknown))}")
+        defaults = {g: float(self.FIELD_BOOSTS.get(g, 1.0)) for g in FIELD_GROUPS}
+        resolved = {g: float(boosts.get(g, defaults[g])) for g in FIELD_GROUPS}
+        if any(b < 0 or not math.isfinite(b) for b in resolved.values()):
+            raise ValueError("field boosts must be non-negative numbers")
+        return None if resolved == defaults else resolved
+
+    @staticmethod
+    def _weighted_tf(field_counts: dict[str, dict[str, int]], boosts: dict[str, float]) -> dict[str, float]:
+        counts: dict[str, float] = {}
+        for group, terms in field_counts.items():
+            boost = boosts.get(group, 1.0)
+            if not boost:
+                continue
+            for t, count in terms.items():
+                counts[t] = counts.get(t, 0) + boost * count
+        max_tf = max(counts.values()) if counts else 1
+        return {t: count / max_tf for t, count in counts.items()}
+
+    def _weighted_count(self, idx: int, term: str, boosts: dict[str, float]) -> float:
+        counts = self.postings[term].group_counts(idx)
+        return sum(boosts[g] * c for g, c in zip(FIELD_GROUPS, counts) if c)
+
+    def _boost_stats(self, boosts: dict[str, float]) -> tuple[list[float], list[float]]:
+        """Per-document max weighted count and tf-idf norm under ``boosts`` (cached)."""
+        key = tuple(boosts[g] for g in FIELD_GROUPS)
+        with self._boost_lock:
+            stats = self._boost_cache.get(key)
+            if stats is not None:
+                return stats
+            weights = [boosts[g] for g in FIELD_GROUPS]
+            stride = len(weights)
+            n = len(self.documents)
+            # postings 의 그룹별 count 로 문서별 가중 count 를 두 번 훑는다 (max, 그 다음 norm)
+            weighted: dict[str, list[float]] = {}
+            max_counts = [0.0] * n
+            for t, posting in self.postings.items():
+                counts = posting.counts
+                values = weighted[t] = [
+                    sum(w * c for w, c in zip(weights, counts[k * stride:(k + 1) * stride]))
+                    for k in range(len(posting))
+                ]
+                for idx, value in zip(posting.docs, values):
+                    if value > max_counts[idx]:
+                        max_counts[idx] = value
+            max_counts = [m or 1.0 for m in max_counts]
+            squares = [0.0] * n
+            for t, posting in self.postings.items():
+                idf = self.idf_cache[t]
+                for idx, value in zip(posting.docs, weighted[t]):
+                    squares[idx] += (value / max_counts[idx] * idf) ** 2
+            norms = [math.sqrt(sq) for sq in squares]
+            if len(self._boost_cache) >= self.BOOST_CACHE_SIZE:
+                del self._boost_cache[next(iter(self._boost_cache))]
+            stats = self._boost_cache[key] = (max_counts, norms)
+            return stats
+
+    def _query_vector(self, query: str) -> tuple[dict[str, float], float]:
         query_tokens = self.tokenize(query)
         if not query_tokens:
-            return []
+            return {}, 0.0
 
         query_tf: dict[str, int] = {}
         for t in query_tokens:
@@ -82,87 +598,239 @@ class TfIdfSearchEngine:
         max_tf = max(query_tf.values()) if query_tf else 1
         query_vec: dict[str, float] = {}
         for t, count in query_tf.items():
-            query_vec[t] = (count / max_tf) * self.idf_cache.get(t, 1)
+            if t in self.idf_cache or not self.FUZZY_MAX_EXPANSIONS:
+                query_vec[t] = (count / max_tf) * self.idf_cache.get(t, 1)
+                continue
+            expansions = self.fuzzy_terms(t)
+            if not expansions:
+                query_vec[t] = count / max_tf  # 색인에 없는 토큰 (idf=1)
+            for term, distance in expansions:
+                w = (count / max_tf) * self.idf_cache[term] * self.FUZZY_PENALTY ** distance
+                query_vec[term] = max(query_vec.get(term, 0.0), w)
 
-        results = []
-        for idx, doc_vec in enumerate(self.tfidf_cache):
-            score = self._cosine_similarity(query_vec, doc_vec)
-            if score > 0:
-                results.append({
-                    "index": idx,
-                    "score": score,
-                    "document": self.documents[idx],
-                })
+        # 쿼리 크기는 색인에 없는 토큰(idf=1)까지 포함 — 기존 cosine과 동일
+        query_norm = math.sqrt(sum(w * w for w in query_vec.values()))
+        return query_vec, query_norm
 
-        results.sort(key=lambda r: r["score"], reverse=True)
-        return results[:top_k]
+    # ── fuzzy vocabulary lookup ──
+    def fuzzy_terms(self, token: str) -> list[tuple[str, int]]:
+        """Nearest vocabulary terms to ``token`` as ``(term, edit distance)``, closest first.
 
-    # ── doc → text ──
-    def _doc_to_text(self, doc: dict) -> str:
-        splits = doc.get("_splits", [])
-        split_parts: list[str] = []
-        for s in splits:
-            for key in ("fac_id", "oper_id", "oper_nm", "eps_lot_gbn_cd",
-                         "work_cond_desc", "eqp_id", "recipe_id", "note"):
-                val = s.get(key)
-                if val:
-                    split_parts.append(val)
-
-        parts = [
-            # 실험 필드
-            doc.get("iacpj_nm"),
-            doc.get("module"),
-            doc.get("eval_item"),
-            doc.get("eval_process"),
-            doc.get("eval_category"),
-            doc.get("requester"),
-            doc.get("lot_code"),
-            doc.get("plan_id"),
-            doc.get("team"),
-            doc.get("wf_direction"),
-            doc.get("prev_eval"),
-            doc.get("cross_experiment"),
-            doc.get("lot_request"),
-            doc.get("reference"),
-            doc.get("volume_split"),
-            doc.get("assign_wf"),
-            doc.get("refdata"),
-            doc.get("request_date"),
-            # 과제 필드 (가중치 부여 — 반복)
-            doc.get("project_purpose"),
-            doc.get("project_purpose"),
-            doc.get("iacpj_ta_goa"),
-            doc.get("iacpj_ta_goa"),
-            doc.get("iacpj_ta_goa"),
-            doc.get("iacpj_cur_stt"),
-            doc.get("iacpj_cur_stt"),
-            doc.get("iacpj_tech_n"),
-            doc.get("project_module"),
-            doc.get("iacpj_tgt_n"),
-            doc.get("iacpj_ch_n"),
-            doc.get("ia_ta_grd_n"),
-            doc.get("iacpj_level"),
-            doc.get("iacpj_nud_n"),
-            doc.get("iacpj_core_tec"),
-            doc.get("ia_ch_or_n"),
-            # 스플릿 필드
-            *split_parts,
-        ]
-        return " ".join(p for p in parts if p)
+        Distances are counted on jamo-decomposed keys (1 edit up to 7 jamo /
+        characters, 2 beyond, none below 4). Candidates come from the trigram
+        index, so only terms sharing a trigram with ``token`` are compared.
+        """
+        key = _jamo_key(token)
+        limit = 0 if len(key) < 4 else 1 if len(key) <= 7 else 2
+        if not limit:
+            return []
+        grams = _trigrams(key)
+        gram_index = self._gram_index if self._gram_index is not None else self._build_gram_index()
+
+        shared: dict[str, int] = {}
+        for gram in grams:
+            for term in gram_index.get(gram, ()):
+                shared[term] = shared.get(term, 0) + 1
+        # 편집 1번은 trigram 을 최대 4개까지 깨뜨린다
+        min_shared = max(1, len(grams) - 4 * limit)
+        matches = []
+        for term, count in shared.items():
+            if count < min_shared:
+                continue
+            distance = _edit_distance(key, _jamo_key(term), limit)
+            if distance <= limit:
+                matches.append((distance, -self.df_map.get(term, 0), term))
+        matches.sort()
+        return [(term, distance) for distance, _, term in matches[:self.FUZZY_MAX_EXPANSIONS]]
+
+    def _build_gram_index(self) -> dict[str, set[str]]:
+        with self._gram_lock:
+            if self._gram_index is None:
+                gram_index: dict[str, set[str]] = {}
+                for term in self.df_map:
+                    for gram in _trigrams(_jamo_key(term)):
+                        gram_index.setdefault(gram, set()).add(term)
+                self._gram_index = gram_index
+            return self._gram_index
+
+    def _index_grams(self, term: str):
+        for gram in _trigrams(_jamo_key(term)):
+            self._gram_index.setdefault(gram, set()).add(term)
+
+    def _unindex_grams(self, term: str):
+        for gram in _trigrams(_jamo_key(term)):
+            terms = self._gram_index.get(gram)
+            if terms is not None:
+                terms.discard(term)
+                if not terms:
+                    del self._gram_index[gram]
+
+    # ── phrase matching ──
+    def match_phrase(self, phrase: str) -> set[int]:
+        """Doc indices whose lower-cased text contains ``phrase`` as a substring.
+
+        The postings and positional index pick the candidates at token
+        granularity — the first phrase token may be the tail of a document
+        token, the last one its head (a single token may sit anywhere inside
+        one), and the tokens must be consecutive. That drops punctuation and
+        spacing, so every candidate is then checked with the substring test
+        itself: ``"3%"`` must not match "30s" nor ``"w plug"`` "W-plug".
+        """
+        needle = phrase.lower()
+        tokens = self.tokenize(phrase)
+        if not tokens:
+            return {
+                idx for idx in self.documents.live_indices()
+                if needle in self._cached_text(idx)
+            }
+
+        if len(tokens) == 1:
+            candidates: set[int] = set()
+            for term in self._vocab_matching(tokens[0], "in"):
+                candidates.update(self.postings[term])
+            return {idx for idx in candidates if needle in self._cached_text(idx)}
+
+        # 위치별로 허용되는 색인 term 집합
+        slots = [self._vocab_matching(tokens[0], "suffix")]
+        slots += [[t] if t in self.postings else [] for t in tokens[1:-1]]
+        slots.append(self._vocab_matching(tokens[-1], "prefix"))
+        if not all(slots):
+            return set()
+
+        # 문서 후보는 위치별 문서 집합의 교집합 — 작은 집합부터
+        doc_sets = []
+        for terms in slots:
+            docs: set[int] = set()
+            for term in terms:
+                docs.update(self.postings[term])
+            doc_sets.append(docs)
+        doc_sets_sorted = sorted(doc_sets, key=len)
+        candidates = doc_sets_sorted[0].intersection(*doc_sets_sorted[1:])
+
+        # 위치별 허용 term id — 허용 id 가 가장 적은 위치를 기준으로, 위치 색인에서 그 id 의
+        # 출현 위치를 찾고 나머지 위치는 토큰 스트림에서 바로 확인한다
+        slot_ids = [{self.terms.ids[t] for t in terms} for terms in slots]
+        anchor = min(range(len(slot_ids)), key=lambda k: len(slot_ids[k]))
+        others = [(k - anchor, ids) for k, ids in enumerate(slot_ids) if k != anchor]
+        matched = set()
+        for idx in candidates:
+            stream = self.doc_terms[idx]
+            lo, hi = anchor, len(stream) - len(slot_ids) + anchor
+            if (
+                self._phrase_at(stream, self.doc_positions[idx], slot_ids[anchor], others, lo, hi)
+                and needle in self._cached_text(idx)
+            ):
+                matched.add(idx)
+        return matched
 
-    # ── cosine similarity ──
     @staticmethod
-    def _cosine_similarity(vec_a: dict[str, float], vec_b: dict[str, float]) -> float:
-        dot = 0.0
-        mag_a = 0.0
-        mag_b = 0.0
-        all_keys = set(vec_a.keys()) | set(vec_b.keys())
-        for key in all_keys:
-            a = vec_a.get(key, 0)
-            b = vec_b.get(key, 0)
-            dot += a * b
-            mag_a += a * a
-            mag_b += b * b
-        if mag_a == 0 or mag_b == 0:
-            return 0
-        return dot / (math.sqrt(mag_a) * math.sqrt(mag_b))
+    def _phrase_at(stream, positions, anchor_ids: set[int], others: list, lo: int, hi: int) -> bool:
+        """True if some ``pos`` in [lo, hi] holds an anchor id with every other slot matching around it."""
+        key = stream.__getitem__
+        for tid in anchor_ids:
+            start = bisect_left(positions, tid, key=key)
+            for k in range(start, len(positions)):
+                pos = positions[k]
+                if stream[pos] != tid or pos > hi:
+                    break
+                if pos >= lo and all(stream[pos + offset] in ids for offset, ids in others):
+                    return True
+        return False
+
+    def phrase_search(
+        self, phrases: list[str], query: str, top_k: int,
+        boosts: dict[str, float] | None = None, filters: dict | None = None,
+    ) -> list[dict]:
+        """Documents containing every phrase (and matching ``filters``); ranked by ``query`` when given.
+
+        Phrase matches that ``query`` does not score come after the ranked ones
+        with score 0; without a query every match scores 1, in document order.
+        """
+        matched = set.intersection(*(self.match_phrase(p) for p in phrases))
+        if filters:
+            matched &= self.filter_candidates(filters)
+        if not query:
+            return [
+                {"index": idx, "score": 1, "document": self.documents[idx]}
+                for idx in sorted(matched)[:top_k]
+            ]
+        results = self.search(query, top_k, candidates=matched, boosts=boosts)
+        if len(results) < top_k:
+            ranked = {r["index"] for r in results}
+            for idx in sorted(matched - ranked)[:top_k - len(results)]:
+                results.append({"index": idx, "score": 0, "document": self.documents[idx]})
+        return results
+
+    def _vocab_matching(self, token: str, mode: str) -> list[str]:
+        """Vocabulary terms containing ``token`` (``in``), ending with it (``suffix``) or starting with it.
+
+        Candidates come from the trigram index: every trigram of ``token`` (with
+        the word-boundary pad on the anchored side) occurs in a matching term,
+        so only the terms under the rarest such trigram are tested.
+        """
+        key = _jamo_key(token)
+        padded = ("\x00" if mode == "prefix" else "") + key + ("\x00" if mode == "suffix" else "")
+        grams = {padded[i:i + 3] for i in range(len(padded) - 2)}
+        if grams:
+            gram_index = self._gram_index if self._gram_index is not None else self._build_gram_index()
+            pool = min((gram_index.get(g, ()) for g in grams), key=len)
+        else:
+            pool = self.postings  # 한두 글자 영문·숫자 토큰 — 어휘 전체
+        if mode == "in":
+            return [t for t in pool if token in t]
+        if mode == "suffix":
+            return [t for t in pool if t.endswith(token)]
+        return [t for t in pool if t.startswith(token)]
+
+    # ── per-document text and tokens ──
+    def _cached_idx(self, doc: dict) -> int | None:
+        # documents 에서 읽은 dict 는 저장된 행을 가리킨다 — 그 행이 아직 현재 것일 때만
+        idx = self._id_to_idx.get(doc.get("id"))
+        if idx is not None and getattr(doc, "row", None) is self.documents.row(idx):
+            return idx
+        return None
+
+    def _cached_text(self, idx: int) -> str:
+        text = self.doc_texts[idx]
+        if text is None:
+            text = self.doc_texts[idx] = self._doc_to_text(self.documents[idx]).lower()
+        return text
+
+    def doc_text(self, doc: dict) -> str:
+        """Lower-cased indexed text of ``doc`` (cached when ``doc`` came from this index)."""
+        idx = self._cached_idx(doc)
+        if idx is not None:
+            return self._cached_text(idx)
+        return self._doc_to_text(doc).lower()
+
+    def documents_by_id(self, ids) -> list[dict]:
+        """Indexed documents with the given ids, in index order."""
+        found = sorted(self._id_to_idx[i] for i in set(ids) if i in self._id_to_idx)
+        return [self.documents[idx] for idx in found]
+
+    def doc_tokens(self, doc: dict):
+        """Token set of ``doc`` (from its token stream when ``doc`` came from this index)."""
+        idx = self._cached_idx(doc)
+        if idx is not None:
+            return self._term_set(idx)
+        return set(self.tokenize(self._doc_to_text(doc)))
+
+    def doc_contains(self, doc: dict, term: str) -> bool:
+        """Substring test against the doc text, answered from the token set when possible."""
+        idx = self._cached_idx(doc)
+        if idx is not None:
+            tid = self.terms.ids.get(term)
+            if tid is not None and tid in self.doc_terms[idx]:
+                return True
+        return term in self.doc_text(doc)
+
+    # ── doc → text ──
+    def _doc_fields(self, doc: dict) -> list[tuple[str, str]]:
+        """Non-empty ``(field group, value)`` pairs of ``doc`` in index order."""
+        fields = [(group, doc.get(key)) for group, key in _DOC_FIELDS]
+        for s in doc.get("_splits", []):
+            fields += [("split", s.get(key)) for key in _SPLIT_KEYS]
+        return [(group, value) for group, value in fields if value]
+
+    def _doc_to_text(self, doc: dict) -> str:
+        return " ".join(value for _, value in self._doc_fields(doc))
@@ -0,0 +1,106 @@
+"""
+Facet columns — integer-coded per-document values for counting a match set.
+
+Each facet field interns its values (value → code) and keeps one code per
+document slot in an ``array('i')`` column (-1 = no value). Split fields are
+multi-valued, so they are stored as (doc_idx, code) pairs with each value
+listed once per document. Counting a match set is a gather plus bincount
+with NumPy, or a plain loop over the same arrays without it.
+
+Slots of removed documents keep their codes until the engine compacts;
+they are never part of a match set, so they are never counted.
+"""
+from array import array
+from typing import Iterable
+
+try:
+    import numpy as np
+except ImportError:  # optional dependency — pure-Python counting
+    np = None
+
+FACET_FIELDS = ("module", "iacpj_nm", "team", "status", "eval_category")
+SPLIT_FACET_FIELDS = ("fac_id", "eqp_id")
+FACET_LIMIT = 20
+
+
+class FacetTable:
+    """Columnar facet codes for every document slot of an engine."""
+
+    def __init__(self):
+        self.values: dict[str, list] = {f: [] for f in FACET_FIELDS + SPLIT_FACET_FIELDS}
+        self._codes: dict[str, dict] = {f: {} for f in self.values}
+        self.columns: dict[str, array] = {f: array("i") for f in FACET_FIELDS}
+        # 스플릿 필드: (doc_idx, code) 쌍 — 문서당 값마다 한 번
+        self.pair_rows: dict[str, array] = {f: array("i") for f in SPLIT_FACET_FIELDS}
+        self.pair_codes: dict[str, array] = {f: array("i") for f in SPLIT_FACET_FIELDS}
+
+    def add(self, idx: int, doc: dict | None):
+        """Record ``doc`` at slot ``idx`` (slots are appended in order)."""
+        for field, column in self.columns.items():
+            value = doc.get(field) if doc is not None else None
+            column.append(self._code(field, value) if value is not None else -1)
+        if doc is None:
+            return
+        splits = doc.get("_splits") or ()
+        for field in SPLIT_FACET_FIELDS:
+            seen = set()
+            for s in splits:
+                value = s.get(field)
+                if value is None or value == "" or value in seen:
+                    continue
+                seen.add(value)
+                self.pair_rows[field].append(idx)
+                self.pair_codes[field].append(self._code(field, value))
+
+    def counts(self, idxs: Iterable[int], limit: int = FACET_LIMIT) -> dict[str, list[dict]]:
+        """``{field: [{"value", "count"}, ...]}`` over the documents in ``idxs``, most frequent first."""
+        idxs = list(idxs)
+        result = {}
+        if np is not None:
+            rows = np.fromiter(idxs, dtype=np.int64, count=len(idxs))
+            n_slots = len(next(iter(self.columns.values()))) if self.columns else 0
+            member = np.zeros(n_slots, dtype=bool)
+            member[rows] = True
+            for field, column in self.columns.items():
+                codes = np.frombuffer(column, dtype=np.int32)[rows] if len(column) else np.zeros(0, np.int32)
+                result[field] = np.bincount(codes[codes >= 0], minlength=len(self.values[field]))
+            for field in SPLIT_FACET_FIELDS:
+                pair_rows = np.frombuffer(self.pair_rows[field], dtype=np.int32)
+                pair_codes = np.frombuffer(self.pair_codes[field], dtype=np.int32)
+                result[field] = np.bincount(
+                    pair_codes[member[pair_rows]], minlength=len(self.values[field])
+                )
+        else:
+            for field, column in self.columns.items():
+                tally = [0] * len(self.values[field])
+                for idx in idxs:
+                    code = column[idx]
+                    if code >= 0:
+                        tally[code] += 1
+                result[field] = tally
+            member = set(idxs)
+            for field in SPLIT_FACET_FIELDS:
+                tally = [0] * len(self.values[field])
+                for idx, code in zip(self.pair_rows[field], self.pair_codes[field]):
+                    if idx in member:
+                        tally[code] += 1
+                result[field] = tally
+        return {field: self._top(field, tally, limit) for field, tally in result.items()}
+
+    def _top(self, field: str, tally, limit: int) -> list[dict]:
+        values = self.values[field]
+        return ranked_counts(((values[code], int(n)) for code, n in enumerate(tally) if n), limit)
+
+    def _code(self, field: str, value) -> int:
+        codes = self._codes[field]
+        code = codes.get(value)
+        if code is None:
+            code = codes[value] = len(self.values[field])
+            self.values[field].append(value)
+        return code
+
+
+def ranked_counts(pairs: Iterable[tuple], limit: int = FACET_LIMIT) -> list[dict]:
+    """``(value, count)`` pairs as facet entries — most frequent first, ties by value."""
+    ordered = sorted(pairs, key=lambda item: (-item[1], str(item[0])))
+    return [{"value": value, "count": count} for value, count in ordered[:limit]]
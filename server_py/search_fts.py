@@ -0,0 +1,464 @@
+"""
+FTS5 search backend — BM25 ranking from an SQLite full-text table.
+
+Selected with ``SEARCH_ENGINE=fts`` (see search_engine.create_engine).
+``search_fts`` holds one row per experiment (rowid = experiments.id) with
+one column per field group (search_engine.FIELD_GROUPS); each column is the
+token stream produced by the same Python tokenizer as TfIdfSearchEngine, so
+queries and documents split identically. Field boosts are bm25() column
+weights.
+
+Triggers on experiments / projects / split_tables record affected
+experiment ids in ``search_fts_dirty`` inside the writing transaction; the
+write path (``upsert`` / ``remove`` / ``compact_if_due``, called from
+search_index.refresh after the commit) re-renders those rows through the
+database writer, so searches only read and no worker keeps an index in
+memory. ``search_fts_grams`` maps jamo trigrams to vocabulary terms for
+fuzzy expansion, like TfIdfSearchEngine's in-memory gram index.
+
+With another backend the tables and triggers are dropped (``drop_schema``)
+so writes do not keep filling the dirty queue.
+"""
+import json
+import sqlite3
+from contextlib import closing
+
+from .database import get_connection, pooled_connection, run_write
+from .search_corpus import iter_documents
+from .search_facets import FACET_FIELDS, FACET_LIMIT, SPLIT_FACET_FIELDS, ranked_counts
+from .search_engine import (
+    FIELD_GROUPS, FILTER_FIELDS, RANGE_FILTER_FIELDS, TfIdfSearchEngine, _edit_distance, _jamo_key, _trigrams,
+)
+
+# SQLite 바인딩 변수 한도 안쪽으로 IN (...) 을 나눈다
+_IN_CHUNK = 500
+
+_DIRTY_TRIGGERS = {
+    "experiments": {
+        "INSERT": "VALUES (NEW.id)",
+        "UPDATE": "VALUES (OLD.id), (NEW.id)",
+        "DELETE": "VALUES (OLD.id)",
+    },
+    "projects": {
+        "INSERT": "SELECT id FROM experiments WHERE iacpj_nm = NEW.iacpj_nm",
+        "UPDATE": "SELECT id FROM experiments WHERE iacpj_nm IN (OLD.iacpj_nm, NEW.iacpj_nm)",
+        "DELETE": "SELECT id FROM experiments WHERE iacpj_nm = OLD.iacpj_nm",
+    },
+    "split_tables": {
+        "INSERT": "SELECT id FROM experiments WHERE plan_id = NEW.plan_id",
+        "UPDATE": "SELECT id FROM experiments WHERE plan_id IN (OLD.plan_id, NEW.plan_id)",
+        "DELETE": "SELECT id FROM experiments WHERE plan_id = OLD.plan_id",
+    },
+}
+
+
+def fts5_available() -> bool:
+    try:
+        with closing(sqlite3.connect(":memory:")) as conn:
+            conn.execute("CREATE VIRTUAL TABLE t USING fts5(body)")
+        return True
+    except sqlite3.OperationalError:
+        return False
+
+
+def ensure_schema(conn: sqlite3.Connection):
+    """Create the FTS table, its vocab view, gram index, dirty queue and triggers (idempotent)."""
+    columns = [row[1] for row in conn.execute("PRAGMA table_info(search_fts)")]
+    exists = bool(columns)
+    grams_exist = bool(conn.execute("PRAGMA table_info(search_fts_grams)").fetchall())
+    if exists and tuple(columns) != FIELD_GROUPS:
+        # 필드 그룹이 바뀐 이전 스키마 — 새로 만들고 전부 다시 채운다
+        conn.executescript("DROP TABLE IF EXISTS search_fts_vocab; DROP TABLE search_fts;")
+        exists = False
+    conn.executescript(f"""
+        CREATE VIRTUAL TABLE IF NOT EXISTS search_fts
+            USING fts5({", ".join(FIELD_GROUPS)}, tokenize = 'unicode61');
+        CREATE VIRTUAL TABLE IF NOT EXISTS search_fts_vocab USING fts5vocab(search_fts, 'row');
+        CREATE TABLE IF NOT EXISTS search_fts_dirty (exp_id INTEGER PRIMARY KEY);
+        CREATE TABLE IF NOT EXISTS search_fts_grams (
+            gram TEXT NOT NULL, term TEXT NOT NULL, PRIMARY KEY (gram, term)
+        ) WITHOUT ROWID;
+    """)
+    for table, events in _DIRTY_TRIGGERS.items():
+        for event, source in events.items():
+            conn.execute(f"""
+                CREATE TRIGGER IF NOT EXISTS trg_{table}_{event.lower()}_search_fts
+                AFTER {event} ON {table}
+                BEGIN
+                    INSERT OR IGNORE INTO search_fts_dirty (exp_id) {source};
+                END
+            """)
+    if not exists:
+        # 새 테이블 — 기존 실험 전부를 다음 sync 에서 채운다
+        conn.execute("INSERT OR IGNORE INTO search_fts_dirty (exp_id) SELECT id FROM experiments")
+    elif not grams_exist:
+        # gram 색인 이전에 만든 FTS 테이블 — 지금 어휘로 채운다
+        _index_grams(conn, [row[0] for row in conn.execute("SELECT term FROM search_fts_vocab")])
+    conn.commit()
+
+
+def drop_schema(conn: sqlite3.Connection):
+    """Remove the triggers, dirty queue, gram index and FTS tables (idempotent)."""
+    for table, events in _DIRTY_TRIGGERS.items():
+        for event in events:
+            conn.execute(f"DROP TRIGGER IF EXISTS trg_{table}_{event.lower()}_search_fts")
+    conn.execute("DROP TABLE IF EXISTS search_fts_dirty")
+    conn.execute("DROP TABLE IF EXISTS search_fts_grams")
+    if fts5_available():  # FTS5 없는 빌드에는 가상 테이블이 있을 수 없다
+        conn.execute("DROP TABLE IF EXISTS search_fts_vocab")
+        conn.execute("DROP TABLE IF EXISTS search_fts")
+    conn.commit()
+
+
+def _index_grams(conn: sqlite3.Connection, terms):
+    # 지운 문서에만 있던 term 의 gram 은 남는다 — fuzzy_terms 가 어휘에 있는 term 만 돌려준다
+    conn.executemany(
+        "INSERT OR IGNORE INTO search_fts_grams (gram, term) VALUES (?, ?)",
+        ((gram, term) for term in terms for gram in _trigrams(_jamo_key(term))),
+    )
+
+
+class FtsSearchEngine:
+    """Same search contract as TfIdfSearchEngine, answered by SQLite FTS5.
+
+    Scores are ``-bm25()`` with FIELD_BOOSTS (or per-request ``boosts``) as
+    column weights — higher is better, not bounded to 1. Quoted phrases use
+    FTS5 phrase queries: every token matches a whole document token except
+    the last, which matches as a prefix. Query tokens missing from the
+    vocabulary expand to their nearest terms (see fuzzy_terms); BM25 has no
+    per-term weights, so expansions match without FUZZY_PENALTY.
+    """
+
+    # 인덱스는 DB 안에 있다 — 스냅샷 파일로 저장하지 않는다 (search_index)
+    STORED_IN_DB = True
+    FIELD_BOOSTS = TfIdfSearchEngine.FIELD_BOOSTS
+    FUZZY_MAX_EXPANSIONS = TfIdfSearchEngine.FUZZY_MAX_EXPANSIONS
+
+    tokenize = TfIdfSearchEngine.tokenize
+    _resolve_boosts = TfIdfSearchEngine._resolve_boosts
+    _doc_fields = TfIdfSearchEngine._doc_fields
+    _doc_to_text = TfIdfSearchEngine._doc_to_text
+
+    # ── maintenance ──
+    def build_index(self, documents=()):
+        """Make sure the FTS schema exists and is current; ``documents`` is not needed."""
+        # executescript 는 스스로 커밋하므로 쓰기 큐 작업이 될 수 없다 — 스키마만 별도 연결로
+        with closing(get_connection()) as conn:
+            ensure_schema(conn)
+        self.sync()
+
+    def rebuild(self):
+        """Re-render every experiment."""
+        def mark_all(conn):
+            conn.execute("INSERT OR IGNORE INTO search_fts_dirty (exp_id) SELECT id FROM experiments")
+            self._apply_dirty(conn)
+        run_write(mark_all)
+
+    def upsert(self, doc: dict, compact: bool = True):
+        # 트리거가 이미 dirty 로 기록했다 — compact=False 면 배치 끝의 compact_if_due 가 한 번에 반영
+        if compact:
+            self.sync()
+
+    def remove(self, doc_id, compact: bool = True) -> bool:
+        if compact:
+            self.sync()
+        return True
+
+    def compact_if_due(self):
+        # 세그먼트 병합은 FTS5 가 스스로 한다 — 여기서는 배치의 dirty 행만 반영
+        self.sync()
+
+    def compact(self):
+        def optimize(conn):
+            conn.execute("INSERT INTO search_fts (search_fts) VALUES ('optimize')")
+        run_write(optimize)
+
+    def sync(self):
+        with pooled_connection() as conn:
+            # full-scan: search_fts_dirty — 대기열이 비었는지만 본다 (첫 행에서 멈춘다)
+            pending = conn.execute("SELECT 1 FROM search_fts_dirty LIMIT 1").fetchone() is not None
+        if pending:
+            run_write(self._apply_dirty)
+
+    def _apply_dirty(self, conn: sqlite3.Connection):
+        # 쓰기 큐의 트랜잭션 (BEGIN IMMEDIATE) 안 — 읽은 dirty 목록과 지우는 목록 사이에 새 쓰기가 끼지 않는다
+        # full-scan: search_fts_dirty — 대기열 전체를 한 번에 비운다
+        ids = [row[0] for row in conn.execute("SELECT exp_id FROM search_fts_dirty")]
+        for i in range(0, len(ids), _IN_CHUNK):
+            chunk = ids[i:i + _IN_CHUNK]
+            marks = ", ".join("?" * len(chunk))
+            rows = [
+                (doc["id"], *self._field_columns(doc))
+                for doc in iter_documents(conn, f" WHERE e.id IN ({marks})", chunk)
+            ]
+            # 어휘에 처음 들어오는 term 만 gram 색인에 더한다
+            tokens = {t for row in rows for column in row[1:] for t in column.split()}
+            _index_grams(conn, tokens - self._known_terms(conn, tokens))
+            conn.execute(f"DELETE FROM search_fts WHERE rowid IN ({marks})", chunk)
+            conn.executemany(
+                f"INSERT INTO search_fts (rowid, {', '.join(FIELD_GROUPS)})"
+                f" VALUES (?, {', '.join('?' * len(FIELD_GROUPS))})",
+                rows,
+            )
+            conn.execute(f"DELETE FROM search_fts_dirty WHERE exp_id IN ({marks})", chunk)
+
+    @staticmethod
+    def _known_terms(conn: sqlite3.Connection, terms) -> set[str]:
+        """The subset of ``terms`` in the FTS vocabulary."""
+        terms = list(terms)
+        known = set()
+        for i in range(0, len(terms), _IN_CHUNK):
+            chunk = terms[i:i + _IN_CHUNK]
+            known.update(
+                row[0] for row in conn.execute(
+                    f"SELECT term FROM search_fts_vocab WHERE term IN ({', '.join('?' * len(chunk))})", chunk
+                )
+            )
+        return known
+
+    def _field_columns(self, doc: dict) -> list[str]:
+        columns: dict[str, list[str]] = {group: [] for group in FIELD_GROUPS}
+        for group, value in self._doc_fields(doc):
+            columns[group] += self.tokenize(value)
+        return [" ".join(tokens) for tokens in columns.values()]
+
+    # ── corpus stats ──
+    @property
+    def doc_count(self) -> int:
+        with pooled_connection() as conn:
+            return conn.execute("SELECT COUNT(*) FROM experiments").fetchone()[0]
+
+    @property
+    def df_map(self) -> dict[str, int]:
+        with pooled_connection() as conn:
+            return dict(conn.execute("SELECT term, doc FROM search_fts_vocab").fetchall())
+
+    # ── search ──
+    def search(
+        self,
+        query: str,
+        top_k: int = 10,
+        candidates: set[int] | None = None,
+        boosts: dict[str, float] | None = None,
+        filters: dict | None = None,
+    ) -> list[dict]:
+        """Top-k experiments matching any query token (and ``filters``), by field-weighted BM25.
+
+        ``candidates`` limits the match to those experiment ids — this engine
+        has no doc indices, the FTS rowid is the experiment id.
+        """
+        if top_k <= 0 or candidates is not None and not candidates:
+            return []
+        bm25 = self._bm25(boosts)
+        where, params = self._filter_sql(filters)
+        if candidates is not None:
+            # 후보 수가 바인딩 변수 한도를 넘을 수 있다 — JSON 배열 하나로 넘긴다
+            where += " AND +rowid IN (SELECT value FROM json_each(?))"
+            params.append(json.dumps(sorted(candidates)))
+        with pooled_connection() as conn:
+            expr = self._any_token(conn, query)
+            if expr is None:
+                return []
+            rows = conn.execute(
+                f"SELECT rowid, -{bm25} FROM search_fts WHERE search_fts MATCH ?{where}"
+                f" ORDER BY {bm25}, rowid LIMIT ?",
+                (expr, *params, top_k),
+            ).fetchall()
+            return self._with_documents(conn, rows)
+
+    def search_many(
+        self, queries: list[str], top_k: int = 10,
+        boosts: dict[str, float] | None = None, filters: dict | None = None,
+    ) -> list[list[dict]]:
+        return [self.search(query, top_k, boosts=boosts, filters=filters) for query in queries]
+
+    def phrase_search(
+        self, phrases: list[str], query: str, top_k: int,
+        boosts: dict[str, float] | None = None, filters: dict | None = None,
+    ) -> list[dict]:
+        """Experiments matching every phrase (and ``filters``); ranked by ``query`` when given.
+
+        Matches the query does not score follow with score 0; without a
+        query every match scores 1, in id order.
+        """
+        exprs = [self._phrase(p) for p in phrases]
+        if top_k <= 0 or not exprs or None in exprs:
+            return []
+        phrase_expr = " AND ".join(exprs)
+        bm25 = self._bm25(boosts)
+        where, params = self._filter_sql(filters)
+
+        with pooled_connection() as conn:
+            query_expr = self._any_token(conn, query) if query else None
+            rows = []
+            if query_expr is not None:
+                # +rowid: _filter_sql 참고 — 구문 매치는 IN 목록으로 한 번만 구한다
+                rows = conn.execute(
+                    f"SELECT rowid, -{bm25} FROM search_fts WHERE search_fts MATCH ?"
+                    f" AND +rowid IN (SELECT rowid FROM search_fts WHERE search_fts MATCH ?){where}"
+                    f" ORDER BY {bm25}, rowid LIMIT ?",
+                    (query_expr, phrase_expr, *params, top_k),
+                ).fetchall()
+            if len(rows) < top_k:
+                fill = 0 if query else 1
+                ranked = [row[0] for row in rows]
+                rows += [
+                    (row[0], fill)
+                    for row in conn.execute(
+                        f"SELECT rowid FROM search_fts WHERE search_fts MATCH ?{where}"
+                        f" AND rowid NOT IN ({', '.join('?' * len(ranked))}) ORDER BY rowid LIMIT ?",
+                        (phrase_expr, *params, *ranked, top_k - len(rows)),
+                    )
+                ]
+            return self._with_documents(conn, rows)
+
+    def facet_counts(
+        self, query: str, phrases: list[str] = (), filters: dict | None = None, limit: int = FACET_LIMIT,
+    ) -> dict[str, list[dict]]:
+        """Facet value counts over every matching experiment, grouped in SQL."""
+        counts: dict[str, list] = {field: [] for field in FACET_FIELDS + SPLIT_FACET_FIELDS}
+        where, params = self._filter_sql(filters)
+        # 매치 집합을 한 번만 구하고 필드별 GROUP BY 를 UNION ALL 로 묶는다
+        groups = [
+            f"SELECT '{field}', {field}, COUNT(*) FROM m WHERE {field} IS NOT NULL GROUP BY {field}"
+            for field in FACET_FIELDS
+        ] + [
+            f"SELECT '{field}', s.{field}, COUNT(DISTINCT m.id) FROM m JOIN split_tables s ON s.plan_id = m.plan_id"
+            f" WHERE s.{field} IS NOT NULL AND s.{field} != '' GROUP BY s.{field}"
+            for field in SPLIT_FACET_FIELDS
+        ]
+        sql = (
+            f"WITH m AS (SELECT id, plan_id, {', '.join(FACET_FIELDS)} FROM experiments"
+            f" WHERE id IN (SELECT rowid FROM search_fts WHERE search_fts MATCH ?{where})) "
+            + " UNION ALL ".join(groups)
+        )
+        with pooled_connection() as conn:
+            if phrases:
+                exprs = [self._phrase(p) for p in phrases]
+                expr = None if None in exprs else " AND ".join(exprs)
+            else:
+                expr = self._any_token(conn, query)
+            if expr is not None:
+                for field, value, n in conn.execute(sql, (expr, *params)):
+                    counts[field].append((value, n))
+        return {field: ranked_counts(pairs, limit) for field, pairs in counts.items()}
+
+    def _bm25(self, boosts: dict[str, float] | None) -> str:
+        resolved = self._resolve_boosts(boosts) or {g: float(self.FIELD_BOOSTS.get(g, 1.0)) for g in FIELD_GROUPS}
+        # 검증된 유한 float 만 SQL 에 들어간다
+        return f"bm25(search_fts, {', '.join(repr(resolved[g]) for g in FIELD_GROUPS)})"
+
+    @staticmethod
+    def _filter_sql(filters: dict | None) -> tuple[str, list]:
+        """``AND +rowid IN (...)`` over experiments for TfIdfSearchEngine.filter_mask-style filters."""
+        if not filters:
+            return "", []
+        clauses, params = [], []
+        for field, wanted in filters.items():
+            # 필드 이름은 화이트리스트 안에서만 SQL 에 들어간다
+            if field in RANGE_FILTER_FIELDS:
+                if not isinstance(wanted, dict):
+                    raise ValueError(f'{field} filter must be {{"from": ..., "to": ...}}')
+                if wanted.get("from") is not None:
+                    clauses.append(f"{field} >= ?")
+                    params.append(wanted["from"])
+                if wanted.get("to") is not None:
+                    clauses.append(f"{field} <= ?")
+                    params.append(wanted["to"])
+                if wanted.get("from") is None and wanted.get("to") is None:
+                    clauses.append(f"{field} IS NOT NULL")
+            elif field in FILTER_FIELDS:
+                values = wanted if isinstance(wanted, list) else [wanted]
+                clauses.append(f"{field} IN ({', '.join('?' * len(values))})" if values else "0")
+                params += values
+            else:
+                raise ValueError(f"unknown filter field: {field}")
+        # 단항 + 로 rowid 제약을 FTS5 에 넘기지 않는다 — 넘기면 후보 rowid 마다 MATCH 를 다시 평가한다
+        return f" AND +rowid IN (SELECT id FROM experiments WHERE {' AND '.join(clauses)})", params
+
+    def _any_token(self, conn: sqlite3.Connection, query: str) -> str | None:
+        tokens = list(dict.fromkeys(self.tokenize(query)))
+        if not tokens:
+            return None
+        if self.FUZZY_MAX_EXPANSIONS:
+            known = self._known_terms(conn, tokens)
+            expanded = []
+            for t in tokens:
+                # 어휘에 없는 토큰은 가까운 term 으로 바꾼다 (없으면 그대로 — 아무것도 매치하지 않는다)
+                terms = [t] if t in known else [term for term, _ in self.fuzzy_terms(conn, t)] or [t]
+                expanded += terms
+            tokens = list(dict.fromkeys(expanded))
+        # 토큰은 [a-z0-9가-힣ㄱ-ㅎㅏ-ㅣ] 만 남으므로 따옴표로 감싸면 안전하다
+        return " OR ".join(f'"{t}"' for t in tokens)
+
+    def fuzzy_terms(self, conn: sqlite3.Connection, token: str) -> list[tuple[str, int]]:
+        """Nearest vocabulary terms to ``token`` as ``(term, edit distance)`` — see TfIdfSearchEngine.fuzzy_terms."""
+        key = _jamo_key(token)
+        limit = 0 if len(key) < 4 else 1 if len(key) <= 7 else 2
+        if not limit:
+            return []
+        grams = list(_trigrams(key))
+        shared: dict[str, int] = {}
+        for (term,) in conn.execute(
+            f"SELECT term FROM search_fts_grams WHERE gram IN ({', '.join('?' * len(grams))})", grams
+        ):
+            shared[term] = shared.get(term, 0) + 1
+        # 편집 1번은 trigram 을 최대 4개까지 깨뜨린다
+        min_shared = max(1, len(grams) - 4 * limit)
+        close = {}
+        for term, count in shared.items():
+            if count < min_shared:
+                continue
+            distance = _edit_distance(key, _jamo_key(term), limit)
+            if distance <= limit:
+                close[term] = distance
+        if not close:
+            return []
+        terms = list(close)
+        df = {}
+        for i in range(0, len(terms), _IN_CHUNK):
+            chunk = terms[i:i + _IN_CHUNK]
+            df.update(conn.execute(
+                f"SELECT term, doc FROM search_fts_vocab WHERE term IN ({', '.join('?' * len(chunk))})", chunk
+            ).fetchall())
+        # 지운 문서에만 있던 term 은 gram 색인에 남아 있어도 어휘에 없다
+        matches = sorted((distance, -df[term], term) for term, distance in close.items() if term in df)
+        return [(term, distance) for distance, _, term in matches[:self.FUZZY_MAX_EXPANSIONS]]
+
+    def _phrase(self, phrase: str) -> str | None:
+        tokens = self.tokenize(phrase)
+        return f'"{" ".join(tokens)}"*' if tokens else None
+
+    @staticmethod
+    def _with_documents(conn: sqlite3.Connection, rows: list) -> list[dict]:
+        ids = [row[0] for row in rows]
+        docs: dict = {}
+        for i in range(0, len(ids), _IN_CHUNK):
+            chunk = ids[i:i + _IN_CHUNK]
+            for doc in iter_documents(conn, f" WHERE e.id IN ({', '.join('?' * len(chunk))})", chunk):
+                docs[doc["id"]] = doc
+        return [
+            {"score": score, "document": docs[exp_id]}
+            for exp_id, score in rows
+            if exp_id in docs
+        ]
+
+    # ── per-document text ──
+    def doc_text(self, doc: dict) -> str:
+        return self._doc_to_text(doc).lower()
+
+    def doc_tokens(self, doc: dict) -> set[str]:
+        return set(self.tokenize(self._doc_to_text(doc)))
+
+    def doc_contains(self, doc: dict, term: str) -> bool:
+        return term in self.doc_text(doc)
+
+    def documents_by_id(self, ids) -> list[dict]:
+        ids = list(dict.fromkeys(ids))
+        with pooled_connection() as conn:
+            docs = []
+            for i in range(0, len(ids), _IN_CHUNK):
+                chunk = ids[i:i + _IN_CHUNK]
+                docs += iter_documents(conn, f" WHERE e.id IN ({', '.join('?' * len(chunk))})", chunk)
+        # TfIdfSearchEngine.documents_by_id 와 같은 색인 순서 (iter_documents — id 순)
+        return sorted(docs, key=lambda d: d["id"])
@@ -0,0 +1,305 @@
+"""
+Search index manager — background rebuilds with atomic snapshot swap.
+
+Full rebuilds run on a worker thread into a fresh engine which then replaces
+the current snapshot in one assignment. Searches keep reading the previous
+snapshot meanwhile, so they never wait for (or see) a half-built index.
+Small write deltas are applied to the live snapshot in chunks under its write
+lock and replayed onto a rebuild that was already in flight; a delta large
+enough to cost about as much as a rebuild schedules one instead.
+
+With a ``persist_path`` the build first tries the on-disk snapshot written
+for the current DB change marker (see search_snapshot) and writes a new one
+after building from scratch.
+"""
+import logging
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from typing import Callable
+
+from .database import get_connection
+from .search_corpus import iter_documents
+from .search_engine import TfIdfSearchEngine, create_engine
+from .search_snapshot import load_snapshot, read_change_marker, save_snapshot, snapshot_path
+
+_log = logging.getLogger(__name__)
+
+# SQLite 바인딩 변수 한도 안쪽으로 IN (...) 을 나눈다
+_IN_CHUNK = 500
+# refresh 가 쓰기 잠금을 한 번에 잡고 적용하는 문서 수 — 사이사이 검색이 끼어든다
+_APPLY_CHUNK = 64
+# 변경 문서가 이 수와 전체 문서 수 × _REBUILD_RATIO 중 큰 값을 넘으면 증분 대신 재빌드
+_REBUILD_MIN_DOCS = 1000
+_REBUILD_RATIO = 0.2
+
+
+class _ReadWriteLock:
+    """Any number of readers or a single writer; a waiting writer blocks new readers."""
+
+    def __init__(self):
+        self._cond = threading.Condition()
+        self._readers = 0
+        self._writer = False
+        self._writers_waiting = 0
+
+    @contextmanager
+    def read(self):
+        with self._cond:
+            while self._writer or self._writers_waiting:
+                self._cond.wait()
+            self._readers += 1
+        try:
+            yield
+        finally:
+            with self._cond:
+                self._readers -= 1
+                if not self._readers:
+                    self._cond.notify_all()
+
+    @contextmanager
+    def write(self):
+        with self._cond:
+            self._writers_waiting += 1
+            while self._writer or self._readers:
+                self._cond.wait()
+            self._writers_waiting -= 1
+            self._writer = True
+        try:
+            yield
+        finally:
+            with self._cond:
+                self._writer = False
+                self._cond.notify_all()
+
+
+class IndexSnapshot:
+    """A fully built engine; replaced as a whole by the next rebuild."""
+
+    def __init__(self, engine: TfIdfSearchEngine, build_seconds: float, restored: bool = False):
+        self.engine = engine
+        self.built_at = datetime.now(timezone.utc)
+        self.build_seconds = build_seconds
+        # True when mapped from the persisted snapshot file instead of built
+        self.restored = restored
+        self.lock = _ReadWriteLock()
+
+
+class SearchIndexManager:
+    """Owns the current snapshot and the background rebuild worker.
+
+    ``load_documents(conn, where="", params=())`` yields the indexed documents,
+    optionally restricted by a ``WHERE`` clause over the ``e`` (experiments)
+    alias — see ``search_corpus.iter_documents``. ``persist_path()`` names the
+    snapshot file to restore from / write to; None disables persistence.
+    """
+
+    def __init__(
+        self,
+        load_documents: Callable,
+        engine_factory: Callable = create_engine,
+        persist_path: Callable[[], str] | None = None,
+    ):
+        self._load_documents = load_documents
+        self._engine_factory = engine_factory
+        self._persist_path = persist_path
+        self._snapshot: IndexSnapshot | None = None
+        self._cond = threading.Condition()
+        self._rebuild_requested = False
+        self._building = False
+        self._builds_done = 0
+        self._replay: list[dict] = []
+        self._worker: threading.Thread | None = None
+        self.generation = 0
+        self.last_error: Exception | None = None
+
+    # ── readers ──
+    @contextmanager
+    def reader(self):
+        """Yield the current engine; blocks only until the very first build exists."""
+        snapshot = self._snapshot
+        if snapshot is None:
+            snapshot = self._wait_for_first_snapshot()
+        with snapshot.lock.read():
+            yield snapshot.engine
+
+    def _wait_for_first_snapshot(self) -> IndexSnapshot:
+        with self._cond:
+            if self._snapshot is None and not (self._building or self._rebuild_requested):
+                self._request_rebuild()
+            while self._snapshot is None:
+                if not (self._building or self._rebuild_requested):
+                    raise RuntimeError(f"검색 인덱스 빌드 실패: {self.last_error}")
+                self._cond.wait()
+            return self._snapshot
+
+    # ── writers ──
+    def invalidate(self, wait: bool = False):
+        """Schedule a full rebuild; with ``wait`` block until one started after this call finished."""
+        with self._cond:
+            target = self._builds_done + (2 if self._building else 1)
+            self._request_rebuild()
+            if wait:
+                while self._builds_done < target:
+                    self._cond.wait()
+
+    def refresh(self, conn, exp_ids=(), plan_ids=(), project_names=(), removed_ids=()):
+        """Push changed experiments into the live snapshot instead of rebuilding it.
+
+        Experiments matching any of ``exp_ids`` / ``plan_ids`` / ``project_names``
+        are re-read and upserted; ``removed_ids`` (and requested ids that no
+        longer exist) are dropped. Call after the write has been committed.
+
+        The write lock is taken per ``_APPLY_CHUNK`` documents, so searches
+        wait for one chunk rather than the whole delta, and the engine compacts
+        once at the end. Deltas above the rebuild threshold (bulk imports)
+        schedule a background rebuild instead; searches keep the old snapshot
+        until it is swapped in.
+
+        Never raises: the write is already committed, so a delta that fails
+        to apply is logged and a rebuild is scheduled instead.
+        """
+        changes = {
+            "exp_ids": list(exp_ids),
+            "plan_ids": list(plan_ids),
+            "project_names": list(project_names),
+            "removed_ids": list(removed_ids),
+        }
+        with self._cond:
+            snapshot = self._snapshot
+            if self._building or self._rebuild_requested:
+                self._replay.append(changes)
+        if snapshot is None:
+            return  # 첫 빌드가 최신 데이터를 읽는다
+        try:
+            self._apply_delta(snapshot, conn, changes)
+        except Exception:
+            # 일부만 적용됐을 수 있는 스냅샷 — 재빌드가 교체할 때까지 검색은 계속 읽는다
+            _log.exception("search index refresh failed; scheduling a rebuild")
+            self.invalidate()
+
+    def _apply_delta(self, snapshot: IndexSnapshot, conn, changes: dict):
+        docs, removed = self._collect(conn, changes)
+        engine = snapshot.engine
+        if len(docs) + len(removed) > max(_REBUILD_MIN_DOCS, engine.doc_count * _REBUILD_RATIO):
+            self.invalidate()
+            return
+        ops = [(engine.remove, exp_id) for exp_id in removed] + [(engine.upsert, doc) for doc in docs]
+        for i in range(0, len(ops), _APPLY_CHUNK):
+            with snapshot.lock.write():
+                for apply, arg in ops[i:i + _APPLY_CHUNK]:
+                    apply(arg, compact=False)
+            time.sleep(0)  # 깨어난 검색 스레드가 다음 청크보다 먼저 잠금을 잡도록 GIL 을 넘긴다
+        with snapshot.lock.write():
+            engine.compact_if_due()
+        with self._cond:
+            self.generation += 1
+
+    def stats(self) -> dict:
+        snapshot = self._snapshot
+        return {
+            "ready": snapshot is not None,
+            "generation": self.generation,
+            "documentCount": snapshot.engine.doc_count if snapshot else 0,
+            "builtAt": snapshot.built_at.isoformat() if snapshot else None,
+            "buildSeconds": round(snapshot.build_seconds, 3) if snapshot else None,
+            "restoredFromFile": snapshot.restored if snapshot else False,
+            "rebuilding": self._building or self._rebuild_requested,
+            "lastError": str(self.last_error) if self.last_error else None,
+        }
+
+    # ── delta helpers ──
+    def _collect(self, conn, changes: dict) -> tuple[list[dict], list]:
+        docs: dict = {}
+        for column, values in (
+            ("e.id", changes["exp_ids"]),
+            ("e.plan_id", changes["plan_ids"]),
+            ("e.iacpj_nm", changes["project_names"]),
+        ):
+            values = [v for v in dict.fromkeys(values) if v is not None]
+            for i in range(0, len(values), _IN_CHUNK):
+                chunk = values[i:i + _IN_CHUNK]
+                where = f" WHERE {column} IN ({', '.join('?' * len(chunk))})"
+                for doc in self._load_documents(conn, where, chunk):
+                    docs[doc["id"]] = doc
+        removed = list(changes["removed_ids"])
+        removed += [exp_id for exp_id in changes["exp_ids"] if exp_id not in docs]
+        return list(docs.values()), removed
+
+    @staticmethod
+    def _apply(engine: TfIdfSearchEngine, docs: list[dict], removed: list):
+        for exp_id in removed:
+            engine.remove(exp_id, compact=False)
+        for doc in docs:
+            engine.upsert(doc, compact=False)
+        engine.compact_if_due()
+
+    # ── background worker ──
+    def _request_rebuild(self):
+        # caller holds self._cond
+        self._rebuild_requested = True
+        if self._worker is None or not self._worker.is_alive():
+            self._worker = threading.Thread(target=self._run, name="search-index-rebuild", daemon=True)
+            self._worker.start()
+        self._cond.notify_all()
+
+    def _load_or_build(self, engine: TfIdfSearchEngine, conn) -> bool:
+        """Fill ``engine`` from the persisted snapshot if current, else build it; True if restored."""
+        if self._persist_path is None or getattr(engine, "STORED_IN_DB", False):
+            engine.build_index(self._load_documents(conn))
+            return False
+        path = self._persist_path()
+        # 마커는 문서보다 먼저 읽는다 — 그 사이 커밋된 쓰기는 다음 시작 때 재빌드로 이어질 뿐
+        marker = read_change_marker(conn)
+        if load_snapshot(engine, path, marker, lambda: self._load_documents(conn)):
+            return True
+        engine.build_index(self._load_documents(conn))
+        try:
+            save_snapshot(engine, path, marker)
+        except OSError:
+            pass  # 쓸 수 없는 위치면 매 시작마다 빌드한다
+        return False
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while not self._rebuild_requested:
+                    self._cond.wait()
+                self._rebuild_requested = False
+                self._building = True
+                self._replay = []
+
+            snapshot, error, conn = None, None, None
+            try:
+                # 연결 실패도 빌드 실패로 — 스레드가 죽으면 _building 이 남아 대기자가 영영 깨지 않는다
+                conn = get_connection()
+                start = time.perf_counter()
+                engine = self._engine_factory()
+                restored = self._load_or_build(engine, conn)
+                snapshot = IndexSnapshot(engine, time.perf_counter() - start, restored)
+            except Exception as e:
+                error = e
+
+            with self._cond:
+                try:
+                    if snapshot is not None:
+                        # 빌드 중 커밋된 변경을 새 스냅샷에 다시 적용한 뒤 교체
+                        for changes in self._replay:
+                            self._apply(snapshot.engine, *self._collect(conn, changes))
+                        self._snapshot = snapshot
+                        self.generation += 1
+                except Exception as e:
+                    error = e
+                finally:
+                    if conn is not None:
+                        conn.close()
+                    self._replay = []
+                    self._building = False
+                    self._builds_done += 1
+                    self.last_error = error
+                    self._cond.notify_all()
+
+
+# 프로세스 전체 공용 인덱스 — /api/search 와 /api/llm-search 가 같은 스냅샷을 읽는다
+index = SearchIndexManager(iter_documents, persist_path=snapshot_path)
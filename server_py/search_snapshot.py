@@ -0,0 +1,295 @@
+"""
+Persisted search index — versioned binary snapshot file read through mmap.
+
+A built engine's term dictionary, DF/IDF, postings (weights and per-field
+counts), per-document token streams with their positional index and norms
+are written next to
+``lab.db``, keyed by the DB change marker (``search_index_state``) read
+before the build.
+A worker that starts on unchanged data maps the file instead of
+re-tokenising the corpus: postings are decoded per term on first use,
+token streams and positions per read, and the raw pages stay in the OS page cache,
+shared by every worker.
+"""
+import json
+import mmap
+import os
+import sys
+import tempfile
+from array import array
+from collections.abc import MutableMapping
+from typing import Callable, Iterable
+
+from . import database
+from .search_engine import FIELD_GROUPS
+from .search_store import DocumentStore, Posting, TermDictionary
+
+MAGIC = b"LABSIDX\0"
+FORMAT_VERSION = 4
+_ALIGN = 8
+
+
+def snapshot_path() -> str:
+    return os.path.splitext(database.DB_PATH)[0] + ".searchidx"
+
+
+def read_change_marker(conn) -> str | None:
+    """``db_uid:change_seq`` — changes whenever an indexed table is written."""
+    try:
+        row = conn.execute("SELECT db_uid, change_seq FROM search_index_state WHERE id = 1").fetchone()
+    except Exception:
+        return None  # init_db 이전 스키마
+    return f"{row[0]}:{row[1]}" if row else None
+
+
+# ──────────────────────────────────────────────
+# Writing
+# ──────────────────────────────────────────────
+
+def save_snapshot(engine, path: str, marker: str | None) -> bool:
+    """Write ``engine`` to ``path`` atomically; skipped for engines with tombstones."""
+    if marker is None or engine.doc_count != len(engine.documents):
+        return False
+
+    # 스트림이 쓰는 term id 를 그대로 유지한다 (죽은 term 은 df 0, 빈 포스팅)
+    terms = engine.terms.terms
+    post_ptr, post_docs, post_tf, post_cnt = array("q", [0]), array("i"), array("d"), array("H")
+    for t in terms:
+        posting = engine.postings.get(t)
+        if posting is not None:
+            post_docs.extend(posting.docs)
+            post_tf.extend(posting.weights)
+            post_cnt.extend(posting.counts)
+        post_ptr.append(len(post_docs))
+
+    tok_ptr, tok, tok_pos = array("q", [0]), array("i"), array("i")
+    for stream, positions in zip(engine.doc_terms, engine.doc_positions):
+        tok.extend(stream)
+        tok_pos.extend(positions)
+        tok_ptr.append(len(tok))
+
+    sections = {
+        "doc_ids": array("q", (doc["id"] for doc in engine.documents)),
+        "doc_norms": array("d", engine.doc_norms),
+        "terms": "\n".join(terms).encode("utf-8"),  # 토큰에는 공백이 없다
+        "df": array("q", (engine.df_map.get(t, 0) for t in terms)),
+        "idf": array("d", (engine.idf_cache.get(t, 0.0) for t in terms)),
+        "post_ptr": post_ptr, "post_docs": post_docs, "post_tf": post_tf, "post_cnt": post_cnt,
+        "tok_ptr": tok_ptr, "tok": tok, "tok_pos": tok_pos,
+    }
+
+    layout, offset = {}, 0
+    for name, data in sections.items():
+        nbytes = len(data) * getattr(data, "itemsize", 1)
+        layout[name] = [offset, nbytes, getattr(data, "typecode", "B")]
+        offset += _padded(nbytes)
+    header = json.dumps({
+        "marker": marker,
+        "byteorder": sys.byteorder,
+        "engine": type(engine).__name__,
+        # 가중 TF 가 기본 boost 에 따라 달라지므로 설정이 같아야 재사용한다
+        "field_groups": list(FIELD_GROUPS),
+        "field_boosts": engine.FIELD_BOOSTS,
+        "n_docs": len(engine.documents),
+        "n_terms": len(terms),
+        "sections": layout,
+    }).encode("utf-8")
+
+    directory = os.path.dirname(path) or "."
+    fd, tmp_path = tempfile.mkstemp(prefix=".searchidx-", dir=directory)
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(MAGIC)
+            f.write(array("I", [FORMAT_VERSION, len(header)]).tobytes())
+            f.write(header)
+            f.write(b"\0" * (_padded(f.tell()) - f.tell()))
+            for data in sections.values():
+                raw = data.tobytes() if isinstance(data, array) else data
+                f.write(raw)
+                f.write(b"\0" * (_padded(len(raw)) - len(raw)))
+        # 다른 워커가 매핑 중인 이전 파일은 그대로 두고 이름만 교체
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+    return True
+
+
+def _padded(n: int) -> int:
+    return (n + _ALIGN - 1) // _ALIGN * _ALIGN
+
+
+# ──────────────────────────────────────────────
+# Loading
+# ──────────────────────────────────────────────
+
+def load_snapshot(engine, path: str, marker: str | None, load_documents: Callable[[], Iterable[dict]]) -> bool:
+    """Restore ``engine`` from ``path`` if it was written for ``marker``.
+
+    ``load_documents()`` supplies the stored documents themselves (the file
+    only keeps their ids). Returns False — leaving ``engine`` untouched —
+    when the file is missing, stale or unreadable; the caller then builds.
+    """
+    if marker is None:
+        return False
+    try:
+        with open(path, "rb") as f:
+            mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    except (OSError, ValueError):
+        return False
+
+    view = memoryview(mm)
+    try:
+        if bytes(view[:len(MAGIC)]) != MAGIC:
+            return False
+        version, header_len = view[len(MAGIC):len(MAGIC) + 8].cast("I")
+        if version != FORMAT_VERSION:
+            return False
+        start = len(MAGIC) + 8
+        header = json.loads(bytes(view[start:start + header_len]))
+        if (header["marker"] != marker or header["byteorder"] != sys.byteorder
+                or header["engine"] != type(engine).__name__
+                or header["field_groups"] != list(FIELD_GROUPS)
+                or header["field_boosts"] != engine.FIELD_BOOSTS):
+            return False
+        data_start = _padded(start + header_len)
+    except (ValueError, KeyError, TypeError):
+        return False
+
+    def section(name):
+        offset, nbytes, typecode = header["sections"][name]
+        raw = view[data_start + offset:data_start + offset + nbytes]
+        return raw if typecode == "B" else raw.cast(typecode)
+
+    doc_ids = section("doc_ids")
+    by_id = {doc["id"]: doc for doc in load_documents()}
+    if len(by_id) != len(doc_ids) or not all(doc_id in by_id for doc_id in doc_ids):
+        return False
+    documents = [by_id[doc_id] for doc_id in doc_ids]
+
+    terms = bytes(section("terms")).decode("utf-8").split("\n") if header["n_terms"] else []
+    dfs = section("df").tolist()
+    live_ids = {t: j for j, t in enumerate(terms) if dfs[j]}
+    stride = len(FIELD_GROUPS)
+    post_ptr, post_docs, post_tf, post_cnt = (
+        section("post_ptr"), section("post_docs"), section("post_tf"), section("post_cnt")
+    )
+    tok_ptr, tok, tok_pos = section("tok_ptr"), section("tok"), section("tok_pos")
+
+    def decode_posting(j: int) -> Posting:
+        lo, hi = post_ptr[j], post_ptr[j + 1]
+        return Posting.from_buffers(stride, post_docs[lo:hi], post_tf[lo:hi], post_cnt[lo * stride:hi * stride])
+
+    def decode_rows(data):
+        def decode(idx: int) -> array:
+            row = array("i")
+            row.frombytes(data[tok_ptr[idx]:tok_ptr[idx + 1]].cast("B"))
+            return row
+        return decode
+
+    # 엔진 내부 상태를 직접 채운다 — build_index 와 같은 불변식 (묘비 없음)
+    engine.documents = DocumentStore(documents)
+    engine._id_to_idx = {doc["id"]: idx for idx, doc in enumerate(documents)}
+    engine.doc_count = len(documents)
+    engine.doc_norms = section("doc_norms").tolist()
+    engine.terms = TermDictionary(terms)
+    engine.df_map = {t: dfs[j] for t, j in live_ids.items()}
+    idf = section("idf")
+    engine.idf_cache = {t: idf[j] for t, j in live_ids.items()}
+    engine.postings = MappedTermTable(live_ids, decode_posting)
+    engine.doc_terms = MappedDocTable(len(documents), decode_rows(tok))
+    engine.doc_positions = MappedDocTable(len(documents), decode_rows(tok_pos))
+    engine.doc_texts = [None] * len(documents)
+    engine._changes = 0
+    engine._boost_cache = {}
+    engine._after_load()
+    return True
+
+
+class MappedTermTable(MutableMapping):
+    """term → Posting read from the mapped file on first access.
+
+    Decoded entries are kept in an overlay so the engine can mutate them in
+    place exactly like freshly built ones; untouched terms cost nothing.
+    """
+
+    def __init__(self, term_ids: dict[str, int], decode: Callable[[int], Posting]):
+        self._term_ids = term_ids
+        self._decode = decode
+        self._overlay: dict[str, Posting] = {}
+        self._deleted: set[str] = set()
+
+    def __getitem__(self, term):
+        value = self._overlay.get(term)
+        if value is None:
+            if term in self._deleted or term not in self._term_ids:
+                raise KeyError(term)
+            value = self._overlay[term] = self._decode(self._term_ids[term])
+        return value
+
+    def __setitem__(self, term, value):
+        self._overlay[term] = value
+        self._deleted.discard(term)
+
+    def __delitem__(self, term):
+        if term not in self:
+            raise KeyError(term)
+        self._overlay.pop(term, None)
+        if term in self._term_ids:
+            self._deleted.add(term)
+
+    def __contains__(self, term):
+        return term in self._overlay or (term in self._term_ids and term not in self._deleted)
+
+    def __iter__(self):
+        for term in self._term_ids:
+            if term not in self._deleted:
+                yield term
+        for term in self._overlay:
+            if term not in self._term_ids:
+                yield term
+
+    def __len__(self):
+        added = sum(1 for term in self._overlay if term not in self._term_ids)
+        return len(self._term_ids) - len(self._deleted) + added
+
+
+class MappedDocTable:
+    """List-like doc_idx → token stream (or positions); mapped rows are re-sliced on every read.
+
+    The engine only ever replaces rows (upsert / remove), never edits one in
+    place, so decoded rows need not be kept.
+    """
+
+    def __init__(self, n_rows: int, decode: Callable[[int], object]):
+        self._n_mapped = n_rows
+        self._decode = decode
+        self._overlay: dict[int, object] = {}
+        self._len = n_rows
+
+    def __len__(self):
+        return self._len
+
+    def __getitem__(self, idx: int):
+        if idx < 0:
+            idx += self._len
+        if idx in self._overlay:
+            return self._overlay[idx]
+        if not 0 <= idx < self._n_mapped:
+            raise IndexError(idx)
+        return self._decode(idx)
+
+    def __setitem__(self, idx: int, value):
+        if idx < 0:
+            idx += self._len
+        if not 0 <= idx < self._len:
+            raise IndexError(idx)
+        self._overlay[idx] = value
+
+    def __iter__(self):
+        for idx in range(self._len):
+            yield self[idx]
+
+    def append(self, value):
+        self._overlay[self._len] = value
+        self._len += 1
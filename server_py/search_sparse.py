@@ -0,0 +1,206 @@
+"""
+Vectorised TF-IDF backend — sparse matrix scoring with NumPy (SciPy optional).
+
+Selected with ``SEARCH_ENGINE=sparse`` (see search_engine.create_engine).
+Scores are the same cosine similarities as TfIdfSearchEngine; only the
+scoring loop moves from Python dicts to array operations.
+"""
+try:
+    import numpy as np
+except ImportError:  # optional dependency
+    np = None
+
+try:
+    from scipy import sparse as sp
+except ImportError:  # optional — batched scoring falls back to NumPy
+    sp = None
+
+from .search_engine import TfIdfSearchEngine
+
+
+class SparseTfIdfSearchEngine(TfIdfSearchEngine):
+    """TfIdfSearchEngine that scores through a CSR matrix over an interned vocabulary.
+
+    Entries are the raw normalised tf; the current idf of each query term
+    scales the query vector and rows are divided by their doc norm after the
+    product, so idf changes from later upserts reach the matrix rows the
+    same way they reach the dict path. The matrix covers the documents
+    present at the last build / compaction: rows removed since are masked
+    out and documents added since are scored by the dict path.
+    The matrix holds FIELD_BOOSTS weights; queries with their own ``boosts``
+    are scored by the dict path.
+    """
+
+    def __init__(self):
+        if np is None:
+            raise RuntimeError("SparseTfIdfSearchEngine requires numpy")
+        super().__init__()
+        self.vocab: dict[str, int] = {}
+        # CSR (docs × terms)
+        self._indptr = np.zeros(1, dtype=np.int64)
+        self._indices = np.zeros(0, dtype=np.int32)
+        self._data = np.zeros(0)
+        # Same matrix term-major, for single-query scoring
+        self._col_ptr = np.zeros(1, dtype=np.int64)
+        self._col_rows = np.zeros(0, dtype=np.int32)
+        self._col_data = np.zeros(0)
+        self._csr = None  # scipy.sparse matrix when SciPy is installed
+        self._inv_norms = np.zeros(0)  # 1 / doc norm per matrix row (0 for empty rows)
+        self._n_rows = 0
+        self._dead_rows: list[int] = []
+
+    # ── matrix maintenance ──
+    def build_index(self, documents):
+        super().build_index(documents)
+        self._build_matrix()
+
+    def compact(self):
+        super().compact()
+        self._build_matrix()
+
+    def _after_load(self):
+        super()._after_load()
+        self._build_matrix()
+
+    def _drop(self, idx: int):
+        super()._drop(idx)
+        if idx < self._n_rows:
+            self._dead_rows.append(idx)
+
+    def _build_matrix(self):
+        self.vocab = {t: j for j, t in enumerate(self.postings)}
+        n_rows, n_terms = len(self.documents), len(self.vocab)
+        postings = list(self.postings.values())
+
+        # 포스팅 배열을 이어 붙이면 그대로 term-major (열 순서) 행렬이 된다
+        lengths = np.fromiter((len(p) for p in postings), dtype=np.int64, count=n_terms)
+        self._col_ptr = np.zeros(n_terms + 1, dtype=np.int64)
+        np.cumsum(lengths, out=self._col_ptr[1:])
+        col_rows = np.frombuffer(b"".join(p.docs.tobytes() for p in postings), dtype=np.int32)
+        col_tf = np.frombuffer(b"".join(p.weights.tobytes() for p in postings), dtype=np.float64)
+        col_terms = np.repeat(np.arange(n_terms, dtype=np.int32), lengths)
+        # idf 는 행렬에 굽지 않는다 — 빌드 뒤 upsert 로 바뀐 idf 를 질의 시점에 곱한다
+        norms = np.asarray(self.doc_norms, dtype=np.float64)
+        self._inv_norms = np.divide(1.0, norms, out=np.zeros(n_rows), where=norms > 0)
+        self._col_rows = col_rows
+        self._col_data = col_tf
+
+        order = np.argsort(col_rows, kind="stable")
+        self._indices = col_terms[order]
+        self._data = self._col_data[order]
+        self._indptr = np.zeros(n_rows + 1, dtype=np.int64)
+        np.cumsum(np.bincount(col_rows, minlength=n_rows), out=self._indptr[1:])
+
+        self._csr = (
+            sp.csr_matrix((self._data, self._indices, self._indptr), shape=(n_rows, n_terms))
+            if sp is not None else None
+        )
+        self._n_rows = n_rows
+        self._dead_rows = []
+
+    # ── search ──
+    def search(
+        self,
+        query: str,
+        top_k: int = 10,
+        candidates: set[int] | None = None,
+        boosts: dict[str, float] | None = None,
+        filters: dict | None = None,
+    ) -> list[dict]:
+        if self._resolve_boosts(boosts) is not None:
+            return super().search(query, top_k, candidates, boosts, filters)
+        allowed = self._filter_rows(filters)
+        query_vec, query_norm = self._query_vector(query)
+        if query_norm == 0 or allowed is not None and not allowed.any():
+            return []
+        matrix_scores = np.zeros(self._n_rows)
+        for t, qw in query_vec.items():
+            j = self.vocab.get(t)
+            idf = self.idf_cache.get(t)
+            if j is None or idf is None:  # idf 가 없으면 빌드 뒤 모든 문서에서 빠진 term
+                continue
+            lo, hi = self._col_ptr[j], self._col_ptr[j + 1]
+            # 한 열 안의 행 번호는 중복이 없으므로 fancy-index += 가 안전하다
+            matrix_scores[self._col_rows[lo:hi]] += self._col_data[lo:hi] * (qw * idf / query_norm)
+        matrix_scores *= self._inv_norms
+        scores = self._full_scores(matrix_scores, query_vec, query_norm)
+        if allowed is not None:
+            scores[~allowed] = 0.0
+        return self._top_k(scores, top_k, candidates)
+
+    def search_many(
+        self, queries: list[str], top_k: int = 10,
+        boosts: dict[str, float] | None = None, filters: dict | None = None,
+    ) -> list[list[dict]]:
+        """Score a batch of queries with one sparse mat-mat product (SciPy) or per-query NumPy."""
+        if sp is None or self._csr is None or self._resolve_boosts(boosts) is not None:
+            return super().search_many(queries, top_k, boosts, filters)
+        allowed = self._filter_rows(filters)
+
+        vectors = [self._query_vector(q) for q in queries]
+        rows: list[int] = []
+        cols: list[int] = []
+        vals: list[float] = []
+        for b, (query_vec, query_norm) in enumerate(vectors):
+            if query_norm == 0:
+                continue
+            for t, qw in query_vec.items():
+                j = self.vocab.get(t)
+                idf = self.idf_cache.get(t)
+                if j is not None and idf is not None:
+                    rows.append(j)
+                    cols.append(b)
+                    vals.append(qw * idf / query_norm)
+        q_matrix = sp.csc_matrix((vals, (rows, cols)), shape=(len(self.vocab), len(queries)))
+        batch_scores = (self._csr @ q_matrix).toarray() * self._inv_norms[:, None]
+
+        results = []
+        for b, (query_vec, query_norm) in enumerate(vectors):
+            if query_norm == 0:
+                results.append([])
+                continue
+            scores = self._full_scores(batch_scores[:, b], query_vec, query_norm)
+            if allowed is not None:
+                scores[~allowed] = 0.0
+            results.append(self._top_k(scores, top_k))
+        return results
+
+    def _filter_rows(self, filters: dict | None):
+        """Boolean row mask for ``filters`` — the bitset unpacked without a Python set."""
+        if not filters:
+            return None
+        n = len(self.documents)
+        raw = self.filter_mask(filters).to_bytes((n + 7) // 8, "little")
+        return np.unpackbits(np.frombuffer(raw, dtype=np.uint8), count=n, bitorder="little").astype(bool)
+
+    def _full_scores(self, matrix_scores, query_vec: dict[str, float], query_norm: float):
+        """Matrix scores with removed rows masked and post-build documents appended."""
+        scores = np.zeros(len(self.documents))
+        scores[:self._n_rows] = matrix_scores
+        if self._dead_rows:
+            scores[self._dead_rows] = 0.0
+        for t, qw in query_vec.items():
+            posting = self.postings.get(t)
+            if posting is None:
+                continue
+            idf = self.idf_cache[t]
+            for idx, w in posting.items_from(self._n_rows):
+                scores[idx] += qw * (w * idf) / (query_norm * self.doc_norms[idx])
+        return scores
+
+    def _top_k(self, scores, top_k: int, candidates: set[int] | None = None) -> list[dict]:
+        if candidates is not None:
+            mask = np.zeros(len(scores), dtype=bool)
+            mask[list(candidates)] = True
+            scores = np.where(mask, scores, 0.0)
+        if top_k <= 0:
+            return []
+        hits = np.flatnonzero(scores > 0)
+        if top_k < len(hits):
+            hits = hits[np.argpartition(-scores[hits], top_k - 1)[:top_k]]
+        # 점수 내림차순, 동점은 문서 순서대로
+        hits = hits[np.lexsort((hits, -scores[hits]))]
+        return [
+            {"index": int(idx), "score": float(scores[idx]), "document": self.documents[idx]}
+            for idx in hits
+        ]
@@ -0,0 +1,207 @@
+"""
+Compact in-memory storage for the TF-IDF engine.
+
+- ``TermDictionary`` interns every vocabulary term once and gives it an
+  integer id; per-document token streams are ``array('i')`` of those ids.
+- ``Posting`` keeps one term's documents as sorted parallel arrays (doc
+  index, weighted tf, raw count per field group). It answers only the
+  lookups the engine makes (``idx in p``, ``p[idx]``, ``p.items()``), not a
+  full mapping interface.
+- ``DocumentStore`` keeps documents as tuples with shared key tuples and
+  interned short strings (module, team, fac_id, ...), and hands out a
+  fresh dict per read.
+
+Plain dicts per document / posting cost ~100 bytes per entry; the arrays
+here cost 4–12.
+"""
+import sys
+from array import array
+from bisect import bisect_left
+from typing import Iterable
+
+# 이 길이 이하 문자열 값은 intern — 반복되는 코드성 값(모듈, 팀, 설비 ...)을 공유한다
+_INTERN_MAX_LEN = 64
+
+
+class TermDictionary:
+    """term ↔ integer id; ids are never reused until the engine compacts."""
+
+    __slots__ = ("ids", "terms")
+
+    def __init__(self, terms: Iterable[str] = ()):
+        self.terms: list[str] = list(terms)
+        self.ids: dict[str, int] = {t: j for j, t in enumerate(self.terms)}
+
+    def __len__(self):
+        return len(self.terms)
+
+    def intern(self, term: str) -> int:
+        tid = self.ids.get(term)
+        if tid is None:
+            tid = self.ids[term] = len(self.terms)
+            self.terms.append(term)
+        return tid
+
+
+class Posting:
+    """doc_idx → weighted tf for one term, sorted by doc_idx.
+
+    ``counts`` holds ``stride`` raw per-field-group counts per document
+    (flattened), for scoring with per-request boosts.
+    """
+
+    __slots__ = ("docs", "weights", "counts", "stride")
+
+    def __init__(self, stride: int, docs=None, weights=None, counts=None):
+        self.stride = stride
+        self.docs = docs if docs is not None else array("i")
+        self.weights = weights if weights is not None else array("d")
+        self.counts = counts if counts is not None else array("H")
+
+    @classmethod
+    def from_buffers(cls, stride: int, docs, weights, counts) -> "Posting":
+        """Copy typed buffers (e.g. memoryview slices of a mapped file) into a new Posting."""
+        posting = cls(stride)
+        posting.docs.frombytes(memoryview(docs).cast("B"))
+        posting.weights.frombytes(memoryview(weights).cast("B"))
+        posting.counts.frombytes(memoryview(counts).cast("B"))
+        return posting
+
+    def __len__(self):
+        return len(self.docs)
+
+    def __iter__(self):
+        return iter(self.docs)
+
+    def __contains__(self, idx: int) -> bool:
+        return self._find(idx) >= 0
+
+    def __getitem__(self, idx: int) -> float:
+        k = self._find(idx)
+        if k < 0:
+            raise KeyError(idx)
+        return self.weights[k]
+
+    def items(self):
+        return zip(self.docs, self.weights)
+
+    def items_from(self, start: int):
+        """``(doc_idx, weight)`` for doc indices ≥ ``start``."""
+        k = bisect_left(self.docs, start)
+        return zip(self.docs[k:], self.weights[k:])
+
+    def group_counts(self, idx: int):
+        k = self._find(idx)
+        if k < 0:
+            raise KeyError(idx)
+        return self.counts[k * self.stride:(k + 1) * self.stride]
+
+    def add(self, idx: int, weight: float, counts):
+        """Insert ``idx`` (new documents always get the largest index, so this appends)."""
+        try:
+            packed = array("H", counts)
+        except OverflowError:  # 필드별 count 는 'H' — 한 문서·한 그룹에서 65535 회를 넘으면 자른다
+            packed = array("H", [min(c, 0xFFFF) for c in counts])
+        docs = self.docs
+        if not docs or docs[-1] < idx:
+            docs.append(idx)
+            self.weights.append(weight)
+            self.counts.extend(packed)
+            return
+        k = bisect_left(docs, idx)
+        docs.insert(k, idx)
+        self.weights.insert(k, weight)
+        self.counts[k * self.stride:k * self.stride] = packed
+
+    def __delitem__(self, idx: int):
+        k = self._find(idx)
+        if k < 0:
+            raise KeyError(idx)
+        del self.docs[k]
+        del self.weights[k]
+        del self.counts[k * self.stride:(k + 1) * self.stride]
+
+    def remapped(self, remap: dict[int, int]) -> "Posting":
+        """Copy with doc indices renumbered by ``remap`` (order-preserving, e.g. compaction)."""
+        return Posting(
+            self.stride, array("i", [remap[idx] for idx in self.docs]),
+            array("d", self.weights), array("H", self.counts),
+        )
+
+    def _find(self, idx: int) -> int:
+        docs = self.docs
+        k = bisect_left(docs, idx)
+        return k if k < len(docs) and docs[k] == idx else -1
+
+
+class StoredDocument(dict):
+    """A document decoded from a DocumentStore; ``row`` identifies the stored row."""
+
+    __slots__ = ("row",)
+
+
+class DocumentStore:
+    """List-like doc_idx → document, stored as interned tuples; removed slots are None."""
+
+    def __init__(self, documents: Iterable[dict | None] = ()):
+        self._rows: list[tuple | None] = []
+        self._schemas: dict[tuple, tuple] = {}
+        for doc in documents:
+            self.append(doc)
+
+    def __len__(self):
+        return len(self._rows)
+
+    def __getitem__(self, idx):
+        if isinstance(idx, slice):
+            return [self._decode(row) if row is not None else None for row in self._rows[idx]]
+        row = self._rows[idx]
+        return self._decode(row) if row is not None else None
+
+    def __setitem__(self, idx: int, doc: dict | None):
+        self._rows[idx] = self._encode(doc) if doc is not None else None
+
+    def __iter__(self):
+        for row in self._rows:
+            yield self._decode(row) if row is not None else None
+
+    def append(self, doc: dict | None):
+        self._rows.append(self._encode(doc) if doc is not None else None)
+
+    def row(self, idx: int) -> tuple | None:
+        return self._rows[idx]
+
+    def live_indices(self) -> list[int]:
+        return [idx for idx, row in enumerate(self._rows) if row is not None]
+
+    def select(self, idxs: Iterable[int]) -> "DocumentStore":
+        """Store holding only the rows at ``idxs``, in that order (rows are shared)."""
+        store = DocumentStore()
+        store._schemas = self._schemas
+        store._rows = [self._rows[idx] for idx in idxs]
+        return store
+
+    # ── row encoding ──
+    def _encode(self, doc: dict) -> tuple:
+        splits = doc.get("_splits")
+        keys, values = self._pack({k: v for k, v in doc.items() if k != "_splits"})
+        packed_splits = tuple(self._pack(s) for s in splits) if splits is not None else None
+        return keys, values, packed_splits
+
+    def _pack(self, record: dict) -> tuple[tuple, tuple]:
+        keys = tuple(record)
+        keys = self._schemas.setdefault(keys, keys)
+        values = tuple(
+            sys.intern(v) if isinstance(v, str) and len(v) <= _INTERN_MAX_LEN else v
+            for v in record.values()
+        )
+        return keys, values
+
+    @staticmethod
+    def _decode(row: tuple) -> StoredDocument:
+        keys, values, splits = row
+        doc = StoredDocument(zip(keys, values))
+        if splits is not None:
+            doc["_splits"] = [dict(zip(k, v)) for k, v in splits]
+        doc.row = row
+        return doc
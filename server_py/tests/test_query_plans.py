@@ -0,0 +1,46 @@
+"""
+Query-plan regression check (server_py.bench.plans) against a generated 10k corpus.
+"""
+import pytest
+
+from server_py.bench.corpus import SCALES, generate
+from server_py.bench.plans import check, collect_statements, prepare
+
+
+@pytest.fixture(scope="module")
+def corpus_path(tmp_path_factory):
+    path = tmp_path_factory.mktemp("plans") / "bench-10k-s1.db"
+    generate(str(path), SCALES["10k"], seed=1)
+    return str(path)
+
+
+@pytest.fixture
+def corpus(corpus_path):
+    # 테스트마다 새 연결 — 캐시된 EXPLAIN 문이 다른 테스트의 스키마 변경 전 계획을 돌려주지 않게 한다
+    conn = prepare(corpus_path)
+    yield conn
+    conn.close()
+
+
+def _describe(results: list[dict]) -> str:
+    lines = []
+    for r in results:
+        lines.append(f"{r['path']}:{r['line']} {r['function']}() {r.get('error') or 'full scan: ' + ', '.join(r['scans'])}")
+        lines.append(f"    {(r['sql'] or '<unresolved>')[:200]}")
+    return "\n".join(lines)
+
+
+def test_every_execute_call_is_resolved():
+    unresolved = [s for s in collect_statements() if s["sql"] is None and not s["unchecked"]]
+    assert not unresolved, _describe([dict(s, scans=[]) for s in unresolved])
+
+
+def test_no_unintended_full_scans(corpus):
+    failures = [r for r in check(corpus, collect_statements()) if r["status"] == "fail"]
+    assert not failures, _describe(failures)
+
+
+def test_dropped_index_is_reported(corpus):
+    corpus.execute("DROP INDEX idx_line_lots_status_arrival")
+    failures = [r for r in check(corpus, collect_statements()) if r["status"] == "fail"]
+    assert any("line_lots" in r["scans"] for r in failures)
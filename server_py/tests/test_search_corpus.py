@@ -0,0 +1,35 @@
+"""
+iter_documents streams experiments in id order with their split rows attached,
+the same documents a per-experiment split query would produce.
+"""
+import pytest
+
+from server_py.bench.corpus import generate
+from server_py.database import _connect
+from server_py.search_corpus import SPLIT_FIELDS, iter_documents
+
+
+@pytest.fixture(scope="module")
+def conn(tmp_path_factory):
+    path = tmp_path_factory.mktemp("corpus") / "corpus.db"
+    generate(str(path), 500, seed=1)
+    conn = _connect(str(path), read_only=True)
+    yield conn
+    conn.close()
+
+
+def test_documents_are_in_id_order_with_their_splits(conn):
+    docs = list(iter_documents(conn))
+    ids = [row["id"] for row in conn.execute("SELECT id FROM experiments ORDER BY id")]
+    assert [d["id"] for d in docs] == ids
+    columns = ", ".join(SPLIT_FIELDS)
+    for doc in docs:
+        rows = conn.execute(
+            f"SELECT {columns} FROM split_tables WHERE plan_id = ? ORDER BY id", (doc["plan_id"],)
+        )
+        assert doc["_splits"] == [dict(zip(SPLIT_FIELDS, tuple(r))) for r in rows]
+
+
+def test_filtered_documents_keep_id_order(conn):
+    docs = list(iter_documents(conn, " WHERE e.id IN (?, ?, ?)", (40, 3, 17)))
+    assert [d["id"] for d in docs] == [3, 17, 40]
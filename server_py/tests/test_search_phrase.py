@@ -0,0 +1,47 @@
+"""
+Quoted phrases match exactly like the substring test over the document text —
+the positional index only narrows the candidates.
+"""
+import pytest
+
+from server_py.bench.corpus import generate
+from server_py.database import _connect
+from server_py.search_corpus import iter_documents
+from server_py.search_engine import TfIdfSearchEngine
+
+PHRASES = [
+    "3%", "1.5%", "p30", "W plug", "w-plug", "30s", "lot 13", "via open", "산화막 두께",
+    "cmp 개선", "etch", "-", "(", "막 두",
+]
+
+
+@pytest.fixture(scope="module")
+def engine(tmp_path_factory):
+    path = tmp_path_factory.mktemp("phrase") / "corpus.db"
+    generate(str(path), 3000, seed=1)
+    conn = _connect(str(path), read_only=True)
+    try:
+        engine = TfIdfSearchEngine()
+        engine.build_index(list(iter_documents(conn)))
+    finally:
+        conn.close()
+    return engine
+
+
+def _substring_matches(engine: TfIdfSearchEngine, phrase: str) -> set[int]:
+    needle = phrase.lower()
+    return {
+        idx for idx in engine.documents.live_indices()
+        if needle in engine._doc_to_text(engine.documents[idx]).lower()
+    }
+
+
+@pytest.mark.parametrize("phrase", PHRASES)
+def test_match_phrase_equals_substring_test(engine, phrase):
+    assert engine.match_phrase(phrase) == _substring_matches(engine, phrase)
+
+
+def test_phrase_search_without_query_is_in_document_order(engine):
+    expected = sorted(_substring_matches(engine, "3%") & _substring_matches(engine, "etch"))
+    hits = engine.phrase_search(["3%", "etch"], "", top_k=len(expected) + 10)
+    assert [h["index"] for h in hits] == expected
@@ -0,0 +1,50 @@
+"""
+SparseTfIdfSearchEngine must score exactly like TfIdfSearchEngine, also after
+incremental upserts shift the idf of terms already in the matrix.
+"""
+import pytest
+
+pytest.importorskip("numpy")
+
+from server_py.bench.corpus import generate
+from server_py.database import _connect
+from server_py.search_corpus import iter_documents
+from server_py.search_engine import TfIdfSearchEngine
+from server_py.search_sparse import SparseTfIdfSearchEngine
+
+QUERIES = ["산화막 두께", "dishing", "CMP 개선 recipe", "via open 저항 저항", "zzsparse 산화막"]
+
+
+@pytest.fixture(scope="module")
+def documents(tmp_path_factory):
+    path = tmp_path_factory.mktemp("sparse") / "corpus.db"
+    generate(str(path), 2000, seed=1)
+    conn = _connect(str(path), read_only=True)
+    try:
+        return list(iter_documents(conn))
+    finally:
+        conn.close()
+
+
+def _ranked(hits: list[dict]) -> list[tuple[int, float]]:
+    return [(h["index"], round(h["score"], 9)) for h in hits]
+
+
+def test_scores_match_dict_engine_after_upserts(documents):
+    dict_engine, sparse_engine = TfIdfSearchEngine(), SparseTfIdfSearchEngine()
+    dict_engine.build_index(documents)
+    sparse_engine.build_index(documents)
+
+    # compaction 전 — 새 term 과 기존 term 의 df 가 바뀌어 matrix 행의 idf 도 달라진다
+    for doc in documents[:50]:
+        changed = dict(doc, eval_item="zzsparse 산화막 dishing")
+        dict_engine.upsert(changed, compact=False)
+        sparse_engine.upsert(changed, compact=False)
+    dict_engine.remove(documents[100]["id"], compact=False)
+    sparse_engine.remove(documents[100]["id"], compact=False)
+
+    for query in QUERIES:
+        assert _ranked(sparse_engine.search(query, 200)) == _ranked(dict_engine.search(query, 200)), query
+    batch = sparse_engine.search_many(QUERIES, 50)
+    for query, hits in zip(QUERIES, batch):
+        assert _ranked(hits) == _ranked(dict_engine.search(query, 50)), query